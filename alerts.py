@@ -0,0 +1,195 @@
+import ast
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from screener import ScreenerError, compile_filter
+from transport import HttpTransport, TransportError
+
+# Features set by the analysis rather than compute_features (see FeatureMatrix.set_extra)
+EXTRA_FIELDS = ("master_score", "bullish")
+
+
+@lru_cache(maxsize=4096)
+def condition_fields(condition: str) -> Tuple[str, ...]:
+    """Field names a condition reads, e.g. ('rsi', 'sma200') for 'rsi < 30 and close > sma200'."""
+    try:
+        tree = ast.parse(condition.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ScreenerError(f"Invalid condition: {e.msg}")
+    return tuple(sorted({node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}))
+
+
+def validate_condition(condition: str, columns: Iterable[str]):
+    """Raises ScreenerError unless `condition` compiles against the feature columns."""
+    compile_filter(condition, list(columns) + [f for f in EXTRA_FIELDS if f not in columns])
+
+
+class WebhookSink:
+    """
+    Delivers alerts as POST {"alerts": [...]} batches, one per webhook URL, on a small
+    thread pool so evaluation never waits on the network. Keeps the most recent alerts
+    for /api/alerts. A rule without its own URL uses default_url; with neither, alerts
+    are only kept in the recent list.
+    """
+
+    def __init__(self, default_url: Optional[str] = None, transport: Optional[HttpTransport] = None,
+                 workers: int = 2, keep: int = 200, timeout: float = 5):
+        self.default_url = default_url
+        self.transport = transport or HttpTransport(pool_maxsize=workers, max_retries=2)
+        self.timeout = timeout
+        self.recent = deque(maxlen=keep)
+        self.delivered = 0
+        self.failed = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="alert-sink")
+        self._lock = threading.Lock()
+
+    def deliver(self, alerts: List[Dict[str, Any]]):
+        by_url: Dict[str, List[Dict[str, Any]]] = {}
+        for alert in alerts:
+            self.recent.append(alert)
+            url = alert.get("webhook_url") or self.default_url
+            if url:
+                by_url.setdefault(url, []).append(alert)
+        for url, batch in by_url.items():
+            self._pool.submit(self._post, url, batch)
+
+    def _post(self, url: str, batch: List[Dict[str, Any]]):
+        try:
+            self.transport.post_json(url, {"alerts": batch}, timeout=self.timeout)
+            with self._lock:
+                self.delivered += len(batch)
+        except (TransportError, ValueError) as e:
+            with self._lock:
+                self.failed += len(batch)
+            print(f"Alert webhook delivery failed ({len(batch)} alerts): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"delivered": self.delivered, "failed": self.failed, "recent": len(self.recent)}
+
+
+class AlertEngine:
+    """
+    Edge-triggered alert rules over the screener's feature matrix.
+
+    A rule is a screener condition ('rsi < 30', 'bars_since_squeeze_fired == 0',
+    'master_score >= 80', 'bullish == 1') optionally limited to some tickers. It fires
+    when its condition turns true for a ticker, not while it stays true: each rule keeps
+    the set of tickers currently matching. evaluate() only looks at rows that changed
+    since the last pass, and rules sharing a condition share one vectorized mask.
+    """
+
+    def __init__(self, sink: Optional[WebhookSink] = None):
+        self.sink = sink or WebhookSink()
+        self._rules: Dict[int, Dict[str, Any]] = {}
+        self._matching: Dict[int, Set[str]] = {}
+        self._by_condition: Dict[str, List[int]] = {}
+        self._masks: Dict[str, Callable] = {}
+        self._seen_version = 0
+        self.evaluations = 0
+        self.fired = 0
+        self._lock = threading.Lock()
+
+    def set_rules(self, rules: List[Dict[str, Any]], frame: Optional[pd.DataFrame] = None):
+        """
+        Replaces the rule set. Unchanged rules keep their state; new or edited rules are
+        primed against `frame` so conditions that already hold do not fire on the next pass.
+        """
+        with self._lock:
+            matching = {}
+            for rule in rules:
+                old = self._rules.get(rule["id"])
+                if old is not None and old["condition"] == rule["condition"] and old["tickers"] == rule["tickers"]:
+                    matching[rule["id"]] = self._matching[rule["id"]]
+                else:
+                    matching[rule["id"]] = self._initial_matches(rule, frame)
+            self._rules = {rule["id"]: rule for rule in rules}
+            self._matching = matching
+            self._by_condition = {}
+            for rule in rules:
+                self._by_condition.setdefault(rule["condition"], []).append(rule["id"])
+
+    def _initial_matches(self, rule: Dict[str, Any], frame: Optional[pd.DataFrame]) -> Set[str]:
+        if frame is None or frame.empty:
+            return set()
+        scoped = frame if not rule["tickers"] else frame.loc[frame.index.intersection(rule["tickers"])]
+        mask = self._mask(rule["condition"], scoped)
+        return set(scoped.index[mask]) if mask is not None else set()
+
+    def _mask(self, condition: str, frame: pd.DataFrame) -> Optional[np.ndarray]:
+        """Boolean mask of `frame` rows matching `condition`; fields not computed yet are NaN (never match)."""
+        fields = condition_fields(condition)
+        missing = [f for f in fields if f not in frame.columns]
+        if missing:
+            frame = frame.reindex(columns=list(frame.columns) + missing)
+        key = f"{condition}|{','.join(frame.columns)}"
+        mask_fn = self._masks.get(key)
+        if mask_fn is None:
+            try:
+                mask_fn = compile_filter(condition, list(frame.columns))
+            except ScreenerError as e:
+                print(f"Skipping alert condition '{condition}': {e}")
+                return None
+            self._masks[key] = mask_fn
+        return mask_fn(frame)
+
+    def evaluate(self, feature_matrix) -> List[Dict[str, Any]]:
+        """Checks every rule against the tickers whose features changed; delivers and returns new alerts."""
+        with self._lock:
+            changed, version = feature_matrix.changed_since(self._seen_version)
+            self._seen_version = version
+            if not changed or not self._rules:
+                return []
+            frame = feature_matrix.frame
+            rows = frame.loc[frame.index.intersection(changed)]
+            changed = set(changed)
+            now = time.time()
+
+            alerts = []
+            for condition, rule_ids in self._by_condition.items():
+                mask = self._mask(condition, rows)
+                if mask is None:
+                    continue
+                matched = set(rows.index[mask])
+                fields = [f for f in condition_fields(condition) if f in rows.columns]
+                # Field values per matching ticker, shared by every rule with this condition
+                values = rows.loc[list(matched), fields].round(2).astype(object)
+                values = values.where(values.notna(), None).to_dict(orient="index")
+                for rule_id in rule_ids:
+                    rule = self._rules[rule_id]
+                    scope = changed if not rule["tickers"] else changed.intersection(rule["tickers"])
+                    if not scope:
+                        continue
+                    now_matching = matched & scope
+                    previous = self._matching[rule_id]
+                    for ticker in sorted(now_matching - previous):
+                        alerts.append({
+                            "rule_id": rule_id,
+                            "name": rule["name"],
+                            "condition": condition,
+                            "ticker": ticker,
+                            "values": values[ticker],
+                            "webhook_url": rule.get("webhook_url"),
+                            "fired_at": now
+                        })
+                    self._matching[rule_id] = (previous - scope) | now_matching
+            self.evaluations += 1
+            self.fired += len(alerts)
+
+        if alerts:
+            self.sink.deliver(alerts)
+        return alerts
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rules": len(self._rules), "conditions": len(self._by_condition),
+                "evaluations": self.evaluations, "fired": self.fired, **self.sink.stats()
+            }
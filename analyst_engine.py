@@ -2,6 +2,10 @@ import pandas as pd
 import json
 import os
 from typing import Dict, List, Any
+from ohlcv import widen_ohlcv
+from patterns import PatternEngine
+from events import price_events, bars_since, event_timeline
+from metrics import STAGE_LATENCY
 
 class AnalystEngine:
     def __init__(self, books_db_path: str = "books_db.json"):
@@ -17,55 +21,123 @@ class AnalystEngine:
             "Macro Strategist": self._analyze_macro,
             "News Watch": self._analyze_news
         }
-
-    def analyze_ticker(self, ticker: str, df: pd.DataFrame, news: List[Dict[str, Any]] = None, options: Dict[str, Any] = None, benchmark_df: pd.DataFrame = None) -> Dict[str, Any]:
+        self.pattern_engine = PatternEngine()
+
+    # Analysis sections and the sections each one is derived from
+    SECTION_DEPENDENCIES = {
+        "consensus": ("personas",),
+        "priority": ("personas", "actionable_strategies"),
+        "master_score": ("personas", "actionable_strategies", "options_intel"),
+        "trade_plan": ("consensus",),
+        "technical_indicators": (),
+        "personas": (),
+        "actionable_strategies": (),
+        "recent_news": (),
+        "options_intel": (),
+        "market_climate": (),
+        "vpa_analysis": (),
+        "patterns": (),
+        "events": (),
+        "chart_data": ()
+    }
+    # What the scout and scanner need: scores and ratings, no charts or patterns
+    SUMMARY_SECTIONS = ("master_score", "consensus", "personas")
+
+    def resolve_sections(self, sections=None) -> List[str]:
+        """Expands requested sections with their dependencies, in evaluation order."""
+        if sections is None:
+            sections = list(self.SECTION_DEPENDENCIES)
+
+        unknown = set(sections) - set(self.SECTION_DEPENDENCIES)
+        if unknown:
+            raise ValueError(f"Unknown analysis sections: {', '.join(sorted(unknown))}")
+
+        order = []
+        def visit(name):
+            if name in order:
+                return
+            for dep in self.SECTION_DEPENDENCIES[name]:
+                visit(dep)
+            order.append(name)
+        for name in sections:
+            visit(name)
+        return order
+
+    def analyze_ticker(self, ticker: str, df: pd.DataFrame, news: List[Dict[str, Any]] = None, options: Dict[str, Any] = None, benchmark_df: pd.DataFrame = None, market_context=None, sections=None) -> Dict[str, Any]:
         """
         Runs the full council analysis on a ticker, including news, options, and benchmark.
+        A shared MarketContext supplies the benchmark and the precomputed market climate.
+        `sections` limits the output to those keys; only they and their dependencies are evaluated.
         """
         if df.empty or len(df) < 50:
             return {"error": "Insufficient data"}
 
+        if market_context is not None and benchmark_df is None:
+            benchmark_df = market_context.spy_df
+        # Frames are stored compact (float32/uint32); analysis runs on float64/int64
+        df = widen_ohlcv(df)
+        benchmark_df = widen_ohlcv(benchmark_df)
+
+        # VPA/squeeze event series over the whole history, built once for every section that reads them
+        memo = {}
+        def events():
+            if "events" not in memo:
+                memo["events"] = price_events(df)
+            return memo["events"]
+
+        stages = {
+            "personas": lambda: self._run_personas(df, news),
+            "actionable_strategies": lambda: self._detect_specific_strategies(df, news),
+            "options_intel": lambda: self._analyze_options(options) if options else {"has_options": False},
+            "consensus": lambda: self._calculate_consensus(out["personas"]),
+            "priority": lambda: self._generate_priority(out["personas"], out["actionable_strategies"]),
+            "master_score": lambda: self._calculate_master_score(out["personas"], out["actionable_strategies"], out["options_intel"]),
+            "trade_plan": lambda: self._generate_trade_plan(df, out["consensus"], df['Close'].iloc[-1]),
+            "technical_indicators": lambda: self._calculate_technical_indicators(df, benchmark_df, events()),
+            "recent_news": lambda: news[:5] if news else [],
+            "market_climate": lambda: market_context.climate if market_context is not None else self._analyze_market_climate(benchmark_df),
+            "vpa_analysis": lambda: self._detect_vpa_patterns(df, events()),
+            "patterns": lambda: self._detect_chart_patterns(df, ticker),
+            "events": lambda: self._summarize_events(events()),
+            "chart_data": lambda: self._prepare_chart_data(df)
+        }
+
+        out = {}
+        for name in self.resolve_sections(sections):
+            with STAGE_LATENCY.time(name):
+                out[name] = stages[name]()
+
+        requested = self.SECTION_DEPENDENCIES if sections is None else sections
+        result = {
+            "ticker": ticker,
+            "current_price": round(df['Close'].iloc[-1], 2)
+        }
+        result.update({name: out[name] for name in self.SECTION_DEPENDENCIES if name in requested})
+        return result
+
+    def _run_personas(self, df: pd.DataFrame, news: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         results = {}
         for persona, func in self.personas.items():
             if persona == "News Watch":
                 results[persona] = func(news) if news else {"rating": "Hold", "score": 0, "reasons": ["No recent news found."], "details": "No news catalysts detected to influence short-term direction.", "books": []}
             else:
                 results[persona] = func(df)
+        return results
 
-        actionable_strategies = self._detect_specific_strategies(df, news)
-        options_intel = self._analyze_options(options) if options else {"has_options": False}
-        
-        consensus_str = self._calculate_consensus(results)
-        
+    def _calculate_technical_indicators(self, df: pd.DataFrame, benchmark_df: pd.DataFrame = None, events: pd.DataFrame = None) -> Dict[str, Any]:
         return {
-            "ticker": ticker,
-            "current_price": round(df['Close'].iloc[-1], 2),
-            "consensus": consensus_str,
-            "priority": self._generate_priority(results, actionable_strategies),
-            "master_score": self._calculate_master_score(results, actionable_strategies, options_intel),
-            "trade_plan": self._generate_trade_plan(df, consensus_str, df['Close'].iloc[-1]),
-            "technical_indicators": {
-                "squeeze": self._calculate_squeeze(df),
-                "rsi": self._calculate_rsi(df),
-                "macd": self._calculate_macd(df),
-                "atr": {"value": round(self._calculate_atr(df), 2), "history": [round(v, 2) for v in self._calculate_atr_history(df).tail(20).tolist()]},
-                "adx": self._calculate_adx(df),
-                "vwap": self._calculate_vwap(df),
-                "rel_volume": {
-                    "value": round(df['Volume'].iloc[-1] / df['Volume'].tail(20).mean(), 2),
-                    "history": [round(v, 2) for v in (df['Volume'] / df['Volume'].rolling(20).mean()).tail(20).tolist()]
-                },
-                "relative_strength": self._calculate_relative_strength(df, benchmark_df),
-                "mtf_alignment": self._calculate_mtf_alignment(df)
+            "squeeze": self._calculate_squeeze(df, events),
+            "rsi": self._calculate_rsi(df),
+            "macd": self._calculate_macd(df),
+            "atr": {"value": round(self._calculate_atr(df), 2), "history": [round(v, 2) for v in self._calculate_atr_history(df).tail(20).tolist()]},
+            "adx": self._calculate_adx(df),
+            "vwap": self._calculate_vwap(df),
+            "rel_volume": {
+                "value": round(df['Volume'].iloc[-1] / df['Volume'].tail(20).mean(), 2),
+                "history": [round(v, 2) for v in (df['Volume'] / df['Volume'].rolling(20).mean()).tail(20).tolist()]
             },
-            "personas": results,
-            "actionable_strategies": actionable_strategies,
-            "recent_news": news[:5] if news else [],
-            "options_intel": options_intel,
-            "market_climate": self._analyze_market_climate(benchmark_df, df),
-            "vpa_analysis": self._detect_vpa_patterns(df),
-            "patterns": self._detect_chart_patterns(df),
-            "chart_data": self._prepare_chart_data(df)
+            "relative_strength": self._calculate_relative_strength(df, benchmark_df),
+            "mtf_alignment": self._calculate_mtf_alignment(df)
         }
 
     def _prepare_chart_data(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
@@ -623,48 +695,21 @@ class AnalystEngine:
             "full_history": [{"time": t, "value": round(v, 2)} for t, v in zip(dates, vwap)] # For plotting line
         }
 
-    def _calculate_squeeze(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _calculate_squeeze(self, df: pd.DataFrame, events: pd.DataFrame = None) -> Dict[str, Any]:
         """
-        Detects if TTM Squeeze is On, Off, or Firing.
+        Detects if TTM Squeeze is On, Off, or Firing on the last bar of the squeeze event series.
         """
-        # 20 SMA
-        sma20 = df['Close'].rolling(window=20).mean()
-        
-        # Bollinger Bands (2.0 std dev)
-        std_dev = df['Close'].rolling(window=20).std()
-        upper_bb = sma20 + (2.0 * std_dev)
-        lower_bb = sma20 - (2.0 * std_dev)
-        
-        # Keltner Channels (1.5 ATR)
-        atr = (df['High'] - df['Low']).rolling(window=20).mean() # Simple ATR approximation
-        upper_kc = sma20 + (1.5 * atr)
-        lower_kc = sma20 - (1.5 * atr)
-        
-        # Current status
-        curr_upper_bb = upper_bb.iloc[-1]
-        curr_lower_bb = lower_bb.iloc[-1]
-        curr_upper_kc = upper_kc.iloc[-1]
-        curr_lower_kc = lower_kc.iloc[-1]
-        
-        # Squeeze IS ON if BB are INSIDE KC
-        is_squeezing = (curr_upper_bb < curr_upper_kc) and (curr_lower_bb > curr_lower_kc)
-        
-        # Momentum (Linear Reg or just Delta Price for simplicity proxy)
-        # Using simple Delta relative to ATR for color
-        momentum = df['Close'].iloc[-1] - sma20.iloc[-1]
-        
-        if is_squeezing:
-            return {"status": "Squeeze ON", "color": "orange", "detail": "Volatility Compression", "history": [round(v, 2) for v in (df['Close'] - sma20).tail(20).tolist()]}
-        else:
-            # Check previous candle to see if it JUST fired
-            prev_upper_bb = upper_bb.iloc[-2]
-            prev_upper_kc = upper_kc.iloc[-2]
-            was_squeezing = (prev_upper_bb < prev_upper_kc)
-            
-            if was_squeezing:
-                return {"status": "Fired!", "color": "green" if momentum > 0 else "red", "detail": "Explosive Move Started", "history": [round(v, 2) for v in (df['Close'] - sma20).tail(20).tolist()]}
-            
-            return {"status": "Squeeze Off", "color": "gray", "detail": "Normal Volatility", "history": [round(v, 2) for v in (df['Close'] - sma20).tail(20).tolist()]}
+        if events is None:
+            events = price_events(df)
+        # Momentum proxy: distance from the 20 SMA
+        momentum = df['Close'] - df['Close'].rolling(window=20).mean()
+        history = [round(v, 2) for v in momentum.tail(20).tolist()]
+        
+        if events['squeeze_on'].iloc[-1]:
+            return {"status": "Squeeze ON", "color": "orange", "detail": "Volatility Compression", "history": history}
+        if events['squeeze_fired'].iloc[-1]:
+            return {"status": "Fired!", "color": "green" if momentum.iloc[-1] > 0 else "red", "detail": "Explosive Move Started", "history": history}
+        return {"status": "Squeeze Off", "color": "gray", "detail": "Normal Volatility", "history": history}
 
     def _calculate_macd(self, df: pd.DataFrame) -> Dict[str, Any]:
         # EMA 12, 26
@@ -769,45 +814,13 @@ class AnalystEngine:
         
         return {"daily": daily, "weekly": weekly, "monthly": monthly}
 
-    def _detect_chart_patterns(self, df: pd.DataFrame) -> List[Dict[str, str]]:
-        """Detects classic chart patterns like Double Bottom, Cup & Handle, etc."""
-        patterns = []
-        if len(df) < 100: return []
-        
-        sub_df = df.tail(60)
-        min1 = sub_df['Low'].iloc[0:20].min()
-        min2 = sub_df['Low'].iloc[-20:].min()
-        current = df['Close'].iloc[-1]
-        
-        # Double Bottom
-        if abs(min1 - min2) / min1 < 0.03 and current > min2 * 1.05:
-            patterns.append({
-                "name": "Double Bottom",
-                "status": "Bullish",
-                "description": "Verified support at major level. Momentum is shifting up."
-            })
-
-        # Double Top
-        max1 = sub_df['High'].iloc[0:20].max()
-        max2 = sub_df['High'].iloc[-20:].max()
-        if abs(max1 - max2) / max1 < 0.03 and current < max2 * 0.95:
-             patterns.append({
-                "name": "Double Top",
-                "status": "Bearish",
-                "description": "Rejected twice at major resistance. High supply zone."
-            })
-
-        # Cup and Handle
-        lowest_60 = sub_df['Low'].min()
-        start_60 = df['Close'].iloc[-60]
-        if lowest_60 < start_60 * 0.85 and current > lowest_60 * 1.15 and current < start_60:
-            patterns.append({
-                "name": "Cup and Handle",
-                "status": "Breakout Potential",
-                "description": "Deep accumulation bowl detected. Consolidation handle forming."
-            })
-
-        return patterns
+    def _detect_chart_patterns(self, df: pd.DataFrame, ticker: str = None) -> List[Dict[str, Any]]:
+        """
+        Chart patterns (double tops/bottoms, head and shoulders, flags, cup and handle)
+        that ended or broke out within the last few weeks, newest first. The full-history
+        scan behind it is cached per ticker and last bar.
+        """
+        return self.pattern_engine.recent(ticker, df)
 
     def _analyze_market_climate(self, spy_df: pd.DataFrame, vix_data: pd.DataFrame = None) -> Dict[str, Any]:
         """
@@ -816,6 +829,8 @@ class AnalystEngine:
         """
         if spy_df is None or spy_df.empty:
             return {"status": "Unknown", "color": "grey", "reason": "Market Data Unavailable"}
+        spy_df = widen_ohlcv(spy_df)
+        vix_data = widen_ohlcv(vix_data)
 
         current_price = spy_df['Close'].iloc[-1]
         sma50 = spy_df['Close'].rolling(window=50).mean().iloc[-1]
@@ -849,22 +864,16 @@ class AnalystEngine:
                 "details": f"SPY between SMAs or VIX elevated ({vix_val:.2f})"
             }
 
-    def _detect_vpa_patterns(self, df: pd.DataFrame) -> List[Dict[str, str]]:
-        """Detects Volume Price Analysis (VPA) anomalies."""
+    def _detect_vpa_patterns(self, df: pd.DataFrame, events: pd.DataFrame = None) -> List[Dict[str, str]]:
+        """Detects Volume Price Analysis (VPA) anomalies on the last bar of the event series."""
         signals = []
         if len(df) < 20: return []
-        
-        current = df.iloc[-1]
-        prev = df.iloc[-2]
-        avg_vol = df['Volume'].tail(20).mean()
-        
-        # Calculate Spread (End - Low vs High - Low) relative to body size
-        spread = current['High'] - current['Low']
-        body = abs(current['Close'] - current['Open'])
+        if events is None:
+            events = price_events(df)
+        current = events.iloc[-1]
         
         # 1. Churning (High Effort, No Result)
-        # High Volume (> 1.5x avg), Small Spread (Doji-like or small body), at Highs
-        if current['Volume'] > avg_vol * 1.5 and spread < (df['High'].tail(10).mean() - df['Low'].tail(10).mean()) * 0.6:
+        if current['churning']:
             signals.append({
                 "name": "Churning",
                 "bias": "Bearish",
@@ -873,20 +882,16 @@ class AnalystEngine:
             })
             
         # 2. Stopping Volume (High Effort to Stop Downmove)
-        # Down day, High Volume, Long lower wick (Hammer) or Small Spread after drop
-        if current['Close'] < prev['Close'] and current['Volume'] > avg_vol * 1.5:
-            # Check for Hammer candle (Lower wick > 2x body)
-            lower_wick = min(current['Open'], current['Close']) - current['Low']
-            if lower_wick > body * 2:
-                signals.append({
-                    "name": "Stopping Volume",
-                    "bias": "Bullish",
-                    "color": "green",
-                    "description": "High volume absorption on weakness. Smart money buying the dip."
-                })
+        if current['stopping_volume']:
+            signals.append({
+                "name": "Stopping Volume",
+                "bias": "Bullish",
+                "color": "green",
+                "description": "High volume absorption on weakness. Smart money buying the dip."
+            })
         
         # 3. No Demand (Up Candle, Low Vol)
-        if current['Close'] > prev['Close'] and current['Volume'] < avg_vol * 0.7:
+        if current['no_demand']:
              signals.append({
                 "name": "No Demand (Risky Reversal)",
                 "bias": "Bearish",
@@ -896,6 +901,15 @@ class AnalystEngine:
 
         return signals
 
+    def _summarize_events(self, events: pd.DataFrame) -> Dict[str, Any]:
+        """Event timelines (dates, or runs for squeeze_on) with counts and bars since each last fired."""
+        since = bars_since(events)
+        return {
+            "timeline": event_timeline(events),
+            "counts": {name: int(events[name].sum()) for name in events.columns},
+            "bars_since": {name: (int(v) if v == v else None) for name, v in since.items()}
+        }
+
 if __name__ == "__main__":
     import sys
     sys.path.append('.')
@@ -18,6 +18,7 @@ document.addEventListener('DOMContentLoaded', () => {
     let analysisHistory = [];
     let bullishRadar = [];
     let personaWatchlists = {}; // We'll fetch this on demand for the modal
+    let liveFeedOpen = false; // /api/stream pushes shared-list changes while connected
 
     // We no longer update local watchlists, the server handles persistence during /api/analyze
 
@@ -120,7 +121,7 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             renderDashboard(data);
-            fetchSharedContent(); // Refresh shared lists
+            if (!liveFeedOpen) fetchSharedContent(); // Refresh shared lists (pushed when the live feed is up)
         } catch (err) {
             console.error(err);
             alert("Failed to reach the consulting spirits. Is the server running?");
@@ -785,10 +786,70 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // Live updates: the server pushes {upsert, remove, order} diffs for each shared list
+    const liveKeys = {
+        history: item => `${item.ticker}|${item.timestamp}`,
+        radar: item => item.ticker,
+        intelligence: item => item.ticker
+    };
+    const liveLists = { history: [], radar: [], intelligence: [] };
+
+    const applyDiff = (channel, diff) => {
+        const key = liveKeys[channel];
+        const byKey = new Map(liveLists[channel].map(item => [key(item), item]));
+        diff.remove.forEach(k => byKey.delete(k));
+        diff.upsert.forEach(item => byKey.set(key(item), item));
+        liveLists[channel] = diff.order.map(k => byKey.get(k)).filter(Boolean);
+
+        if (channel === 'history') {
+            analysisHistory = liveLists.history;
+            renderHistory();
+        } else if (channel === 'radar') {
+            bullishRadar = liveLists.radar;
+            renderBullishRadar();
+        } else {
+            renderIntelligence(liveLists.intelligence);
+        }
+    };
+
+    let fallbackPoll = null;
+    const startFallbackPolling = () => {
+        if (fallbackPoll) return;
+        fallbackPoll = setInterval(() => {
+            fetchSharedContent();
+            fetchIntelligence();
+        }, 30000);
+    };
+
+    const connectLiveFeed = () => {
+        if (!window.EventSource) return false;
+        const source = new EventSource('/api/stream');
+        Object.keys(liveKeys).forEach(channel => {
+            source.addEventListener(channel, (e) => applyDiff(channel, JSON.parse(e.data)));
+        });
+        source.onopen = () => {
+            liveFeedOpen = true;
+            if (fallbackPoll) {
+                clearInterval(fallbackPoll);
+                fallbackPoll = null;
+            }
+        };
+        // EventSource reconnects by itself; poll slowly only while it is down
+        source.onerror = () => {
+            liveFeedOpen = false;
+            startFallbackPolling();
+            // A refused stream (503 when the server is at its stream cap) is not retried by the browser
+            if (source.readyState === EventSource.CLOSED) setTimeout(connectLiveFeed, 60000);
+        };
+        return true;
+    };
+
     // Initial Render
-    fetchSharedContent();
-    fetchIntelligence();
-    setInterval(fetchIntelligence, 30000); // Polling intelligence every 30s
+    if (!connectLiveFeed()) {
+        fetchSharedContent();
+        fetchIntelligence();
+        startFallbackPolling();
+    }
 });
 
 function updatePositionSizer(tradePlan) {
@@ -0,0 +1,107 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analyst_engine import AnalystEngine
+from market_context import MarketContext
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+# Warm engine per worker process, created once by the pool initializer
+_worker_engine: Optional[AnalystEngine] = None
+
+
+def pack_frame(df: Optional[pd.DataFrame]) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Compact wire format: int64 epoch-ns dates, one contiguous OHLC block and the volume
+    column, both in the frame's own dtypes (float32/uint32 frames stay compact).
+    """
+    if df is None or df.empty:
+        return None
+    dates = df.index.values.astype('datetime64[ns]').view('int64')
+    prices = np.ascontiguousarray(df[PRICE_COLUMNS].to_numpy())
+    return dates, prices, df['Volume'].to_numpy()
+
+
+def unpack_frame(packed: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> Optional[pd.DataFrame]:
+    if packed is None:
+        return None
+    dates, prices, volume = packed
+    index = pd.DatetimeIndex(dates.view('datetime64[ns]'), name='Date')
+    df = pd.DataFrame(prices, index=index, columns=PRICE_COLUMNS, copy=False)
+    df['Volume'] = volume
+    return df
+
+
+def _init_worker(books_db_path: str):
+    global _worker_engine
+    _worker_engine = AnalystEngine(books_db_path)
+
+
+def _analyze_packed(task) -> Dict[str, Any]:
+    ticker, packed, news, options, packed_benchmark, climate, sections = task
+    try:
+        context = None
+        if packed_benchmark is not None:
+            context = MarketContext(unpack_frame(packed_benchmark), None, climate, {}, 0)
+        return _worker_engine.analyze_ticker(ticker, unpack_frame(packed), news, options,
+                                             market_context=context, sections=sections)
+    except Exception as e:
+        return {"ticker": ticker, "error": str(e)}
+
+
+class BatchAnalyzer:
+    """
+    Runs analyze_ticker for many tickers. With processes > 1 the work is spread over a
+    persistent process pool so pandas-heavy analysis is not serialized by the GIL;
+    frames travel as NumPy buffers rather than pickled DataFrames and results come back
+    in input order. processes <= 1 runs in-process on the caller's engine.
+    """
+
+    def __init__(self, engine: AnalystEngine, books_db_path: str = "books_db.json", processes: int = 0):
+        self.engine = engine
+        self.books_db_path = os.path.abspath(books_db_path)
+        self.processes = processes
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # forkserver/spawn: forking a threaded gunicorn worker is unsafe
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context(method),
+                initializer=_init_worker,
+                initargs=(self.books_db_path,)
+            )
+        return self._pool
+
+    def analyze_many(self, items: List[Tuple[str, pd.DataFrame, Any, Any]], market_context: MarketContext = None,
+                     sections=None) -> List[Dict[str, Any]]:
+        """items: (ticker, df, news, options) tuples. Returns one analysis per item, in order."""
+        if self.processes <= 1 or len(items) < 2:
+            return [self._analyze_local(t, df, news, options, market_context, sections) for t, df, news, options in items]
+
+        packed_benchmark = pack_frame(market_context.spy_df) if market_context is not None else None
+        climate = market_context.climate if market_context is not None else None
+        tasks = [(t, pack_frame(df), news, options, packed_benchmark, climate, sections) for t, df, news, options in items]
+
+        # A few chunks per worker balances scheduling overhead against stragglers
+        chunksize = max(1, math.ceil(len(tasks) / (self.processes * 4)))
+        return list(self._get_pool().map(_analyze_packed, tasks, chunksize=chunksize))
+
+    def _analyze_local(self, ticker, df, news, options, market_context, sections) -> Dict[str, Any]:
+        try:
+            return self.engine.analyze_ticker(ticker, df, news, options, market_context=market_context, sections=sections)
+        except Exception as e:
+            return {"ticker": ticker, "error": str(e)}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+TMP_SUFFIX = ".tmp"
+
+
+class CacheManager:
+    """
+    Flat directory of cache files with atomic writes and a size budget.
+
+    Writes go to a temp file that is renamed over the entry, so a reader in any process
+    sees either the old or the new file, never a partial one. An in-memory index
+    (name -> size, mtime) is built from one directory scan at startup and kept current
+    by this process's writes; ages come from the index instead of a stat per lookup.
+    When the directory exceeds max_bytes or max_entries, least recently used entries
+    are deleted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, max_entries: int = 5000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        # name -> [size, mtime]; order is least to most recently used
+        self._index: "OrderedDict[str, list]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        now = time.time()
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                if entry.name.endswith(TMP_SUFFIX):
+                    # Left behind by a writer that died mid-write
+                    if now - st.st_mtime > 60:
+                        self._remove(entry.name)
+                    continue
+                entries.append((st.st_atime, entry.name, st.st_size, st.st_mtime))
+        # Seed recency from atime so a restart keeps roughly the same eviction order
+        for _, name, size, mtime in sorted(entries):
+            self._index[name] = [size, mtime]
+            self._bytes += size
+        self._evict()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def mtime(self, name: str, recheck_after: Optional[float] = None) -> Optional[float]:
+        """
+        When `name` was written, or None if absent. The index answers directly; the file
+        is only stat'ed when the index has no entry or the indexed age exceeds
+        `recheck_after`, since another worker may have rewritten it since.
+        """
+        with self._lock:
+            entry = self._index.get(name)
+        if entry is not None and (recheck_after is None or time.time() - entry[1] < recheck_after):
+            return entry[1]
+        try:
+            st = os.stat(self.path(name))
+        except OSError:
+            self._forget(name)
+            return None
+        self._record(name, st.st_size, st.st_mtime)
+        return st.st_mtime
+
+    def age(self, name: str, recheck_after: Optional[float] = None) -> Optional[float]:
+        """Seconds since `name` was written, or None if absent (see mtime)."""
+        mtime = self.mtime(name, recheck_after)
+        return None if mtime is None else time.time() - mtime
+
+    def read_text(self, name: str) -> Optional[str]:
+        try:
+            with open(self.path(name), 'r') as f:
+                text = f.read()
+        except OSError:
+            self._forget(name)
+            return None
+        with self._lock:
+            if name in self._index:
+                self._index.move_to_end(name)
+        return text
+
+    def read_json(self, name: str) -> Optional[Any]:
+        text = self.read_text(name)
+        if text is None:
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    def write_text(self, name: str, text: str):
+        tmp_path = self.path(f".{name}.{os.getpid()}.{threading.get_ident()}{TMP_SUFFIX}")
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, self.path(name))
+        # The file's own mtime, so this index agrees with what other workers stat
+        st = os.stat(self.path(name))
+        self._record(name, st.st_size, st.st_mtime)
+        with self._lock:
+            self._evict()
+
+    def write_json(self, name: str, data: Any):
+        self.write_text(name, json.dumps(data))
+
+    def _record(self, name: str, size: int, mtime: float):
+        with self._lock:
+            previous = self._index.pop(name, None)
+            if previous is not None:
+                self._bytes -= previous[0]
+            self._index[name] = [size, mtime]
+            self._bytes += size
+
+    def _forget(self, name: str):
+        with self._lock:
+            entry = self._index.pop(name, None)
+            if entry is not None:
+                self._bytes -= entry[0]
+
+    def _evict(self):
+        # Caller holds the lock (or is __init__)
+        while self._index and (self._bytes > self.max_bytes or len(self._index) > self.max_entries):
+            name, (size, _) = self._index.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            self._remove(name)
+
+    def _remove(self, name: str):
+        try:
+            os.remove(self.path(name))
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._index), "bytes": self._bytes, "evictions": self.evictions,
+                "max_entries": self.max_entries, "max_bytes": self.max_bytes
+            }
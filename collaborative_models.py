@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+import json
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -66,3 +67,54 @@ class MarketIntelligence(db.Model):
             'date': self.timestamp.strftime('%m/%d/%Y %I:%M %p'),
             'timestamp': self.timestamp.timestamp() * 1000
         }
+
+
+class AlertRule(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    condition = db.Column(db.String(500), nullable=False)
+    tickers = db.Column(db.String(1000), default="")  # comma-separated; empty = whole universe
+    webhook_url = db.Column(db.String(500))
+    active = db.Column(db.Boolean, default=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'condition': self.condition,
+            'tickers': [t for t in (self.tickers or "").split(",") if t],
+            'webhook_url': self.webhook_url,
+            'active': self.active,
+            'date': self.timestamp.strftime('%m/%d/%Y'),
+            'timestamp': self.timestamp.timestamp() * 1000
+        }
+
+
+class TickerScore(db.Model):
+    """Latest analysis score per ticker, written by whichever worker analyzed it and read by the alert evaluator."""
+    ticker = db.Column(db.String(20), primary_key=True)
+    master_score = db.Column(db.Float, default=0)
+    bullish = db.Column(db.Boolean, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class FiredAlert(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    rule_id = db.Column(db.Integer, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    condition = db.Column(db.String(500), nullable=False)
+    ticker = db.Column(db.String(20), nullable=False)
+    values = db.Column(db.Text, default="{}")  # JSON of the condition's field values
+    fired_at = db.Column(db.Float, nullable=False)  # Unix seconds, as the alert engine reports it
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'rule_id': self.rule_id,
+            'name': self.name,
+            'condition': self.condition,
+            'ticker': self.ticker,
+            'values': json.loads(self.values or "{}"),
+            'fired_at': self.fired_at
+        }
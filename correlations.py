@@ -0,0 +1,168 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# scipy gives proper average-linkage clustering; without it we fall back to single linkage
+try:
+    from scipy.cluster.hierarchy import linkage, fcluster
+    from scipy.spatial.distance import squareform
+except ImportError:
+    linkage = None
+
+CORRELATION_WINDOW = 63
+MIN_COVERAGE = 0.8
+
+
+class CorrelationEngine:
+    """
+    Rolling return correlation/covariance across the universe.
+    Keeps the window of daily log returns plus running sums (S = sum r, P = R'R) so a
+    new bar costs one rank-1 update instead of a full recompute; a full resync runs when
+    the ticker set changes or every `resync_every` updates to shed floating-point drift.
+    """
+
+    def __init__(self, window: int = CORRELATION_WINDOW, resync_every: int = 50):
+        self.window = window
+        self.resync_every = resync_every
+        self.tickers: List[str] = []
+        self._returns: Optional[np.ndarray] = None
+        self._dates: List[pd.Timestamp] = []
+        self._sum: Optional[np.ndarray] = None
+        self._cross: Optional[np.ndarray] = None
+        self._updates_since_resync = 0
+        self._corr: Optional[pd.DataFrame] = None
+        self._clusters: Dict[float, List[List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _returns_panel(self, frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        closes = {t: df['Close'] for t, df in frames.items() if df is not None and len(df) > self.window}
+        if not closes:
+            return pd.DataFrame()
+        panel = pd.concat(closes, axis=1).sort_index().astype('float64').ffill(limit=5)
+        returns = np.log(panel).diff().iloc[-self.window:]
+        coverage = returns.notna().mean()
+        # Missing returns inside the window count as flat days
+        return returns.loc[:, coverage >= MIN_COVERAGE].fillna(0.0)
+
+    def update(self, frames: Dict[str, pd.DataFrame]) -> bool:
+        """Folds new bars into the window. Returns True if the matrices changed."""
+        returns = self._returns_panel(frames)
+        if returns.empty or len(returns) < self.window:
+            return False
+
+        tickers = list(returns.columns)
+        dates = list(returns.index)
+        with self._lock:
+            if dates == self._dates and tickers == self.tickers:
+                return False
+
+            new_dates = [d for d in dates if not self._dates or d > self._dates[-1]]
+            incremental = (
+                tickers == self.tickers
+                and self._updates_since_resync + len(new_dates) < self.resync_every
+                and 0 < len(new_dates) < self.window
+                and dates[:-len(new_dates)] == self._dates[len(new_dates):]
+            )
+
+            if incremental:
+                matrix = returns.to_numpy()
+                for i in range(len(new_dates)):
+                    incoming = matrix[self.window - len(new_dates) + i]
+                    outgoing = self._returns[i]
+                    self._sum += incoming - outgoing
+                    self._cross += np.outer(incoming, incoming) - np.outer(outgoing, outgoing)
+                self._updates_since_resync += len(new_dates)
+            else:
+                matrix = returns.to_numpy()
+                self._sum = matrix.sum(axis=0)
+                self._cross = matrix.T @ matrix
+                self._updates_since_resync = 0
+
+            self._returns = matrix
+            self._dates = dates
+            self.tickers = tickers
+            self._corr = None
+            self._clusters = {}
+        return True
+
+    def covariance(self) -> pd.DataFrame:
+        with self._lock:
+            if self._cross is None:
+                return pd.DataFrame()
+            n = self.window
+            cov = (self._cross - np.outer(self._sum, self._sum) / n) / (n - 1)
+            return pd.DataFrame(cov, index=self.tickers, columns=self.tickers)
+
+    def correlation(self) -> pd.DataFrame:
+        if self._corr is not None:
+            return self._corr
+        cov = self.covariance()
+        if cov.empty:
+            return cov
+        values = cov.to_numpy()
+        std = np.sqrt(np.clip(np.diag(values), 0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = values / np.outer(std, std)
+        corr = np.clip(np.nan_to_num(corr), -1.0, 1.0)
+        np.fill_diagonal(corr, 1.0)
+        # float32 halves the footprint for a few-thousand-ticker matrix
+        self._corr = pd.DataFrame(corr.astype(np.float32), index=self.tickers, columns=self.tickers)
+        return self._corr
+
+    def clusters(self, threshold: float = 0.7) -> List[List[str]]:
+        """Groups tickers whose returns move together (correlation >= threshold), largest first."""
+        threshold = round(threshold, 3)
+        if threshold in self._clusters:
+            return self._clusters[threshold]
+
+        corr = self.correlation()
+        if corr.empty:
+            return []
+        values = corr.to_numpy().astype(np.float64)
+
+        if linkage is not None and len(values) > 1:
+            distance = np.clip(1 - values, 0, 2)
+            np.fill_diagonal(distance, 0)
+            tree = linkage(squareform(distance, checks=False), method="average")
+            labels = fcluster(tree, t=1 - threshold, criterion="distance")
+        else:
+            labels = self._single_linkage(values, threshold)
+
+        groups: Dict[int, List[str]] = {}
+        for ticker, label in zip(self.tickers, labels):
+            groups.setdefault(int(label), []).append(ticker)
+        result = sorted(groups.values(), key=len, reverse=True)
+        self._clusters[threshold] = result
+        return result
+
+    def _single_linkage(self, values: np.ndarray, threshold: float) -> np.ndarray:
+        """Connected components of the corr >= threshold graph (single-linkage cut)."""
+        parent = np.arange(len(values))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        rows, cols = np.nonzero(np.triu(values >= threshold, k=1))
+        for i, j in zip(rows, cols):
+            parent[find(i)] = find(j)
+        return np.array([find(i) for i in range(len(values))])
+
+    def crowded_pairs(self, tickers: List[str], threshold: float = 0.8) -> List[Dict[str, Any]]:
+        """Pairs among `tickers` that are highly correlated, i.e. effectively the same bet."""
+        corr = self.correlation()
+        present = [t for t in dict.fromkeys(tickers) if t in corr.index]
+        if len(present) < 2:
+            return []
+        sub = corr.loc[present, present].to_numpy()
+        rows, cols = np.nonzero(np.triu(sub >= threshold, k=1))
+        pairs = [{"a": present[i], "b": present[j], "correlation": round(float(sub[i, j]), 3)} for i, j in zip(rows, cols)]
+        return sorted(pairs, key=lambda p: p["correlation"], reverse=True)
+
+    @property
+    def as_of(self) -> Optional[str]:
+        return self._dates[-1].strftime('%Y-%m-%d') if self._dates else None
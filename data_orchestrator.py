@@ -1,9 +1,19 @@
 import pandas as pd
 import datetime
-import requests
+import io
 import os
-import json
-from typing import Optional, List, Dict, Any
+import math
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from transport import HttpTransport, build_transport_from_env
+from price_panel import SharedPricePanel
+from quota import QuotaManager
+from cache_manager import CacheManager
+from ohlcv import normalize_ohlcv, widen_ohlcv, frame_memory
+from metrics import provider_call, CACHE_LOOKUPS
 
 # Try to import keys from local config if available, otherwise use environment variables
 try:
@@ -13,130 +23,305 @@ except ImportError:
     TWELVE_DATA_API_KEY = os.getenv("TWELVE_DATA_API_KEY")
     ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
 
+# Provider endpoints; overridable so every tier can point at fake_provider_server.py
+YAHOO_DEFAULT_BASE_URL = "https://query1.finance.yahoo.com"
+FMP_BASE_URL = os.getenv("FMP_BASE_URL", "https://financialmodelingprep.com")
+TWELVE_DATA_BASE_URL = os.getenv("TWELVE_DATA_BASE_URL", "https://api.twelvedata.com")
+ALPHA_VANTAGE_BASE_URL = os.getenv("ALPHA_VANTAGE_BASE_URL", "https://www.alphavantage.co")
+YAHOO_BASE_URL = os.getenv("YAHOO_BASE_URL", YAHOO_DEFAULT_BASE_URL)
+
+# Cache lifetimes (minutes). Past the TTL an entry is still served while one background
+# refresh runs, up to the max-staleness bound; past that, callers wait for a refetch.
+PRICE_TTL_MINUTES = 60
+NEWS_TTL_MINUTES = 15
+PRICE_MAX_STALE_MINUTES = max(PRICE_TTL_MINUTES, int(os.getenv("PRICE_MAX_STALE_MINUTES", 240)))
+NEWS_MAX_STALE_MINUTES = max(NEWS_TTL_MINUTES, int(os.getenv("NEWS_MAX_STALE_MINUTES", 60)))
+# XFetch beta: higher refreshes hot keys earlier before their TTL runs out
+CACHE_EARLY_EXPIRY_BETA = float(os.getenv("CACHE_EARLY_EXPIRY_BETA", 1.0))
+
 class DataOrchestrator:
     """
     Handles multi-tier stock data fetching with automatic fallbacks and caching.
     Tiers: FMP -> Twelve Data -> Alpha Vantage -> Yahoo Finance
     """
+
+    # Maximum symbols per multi-symbol request, per provider endpoint
+    BATCH_SIZES = {
+        "fmp_price": 5,
+        "fmp_news": 25,
+        "twelve_data": 50,
+        "yahoo": 100
+    }
     
-    def __init__(self, cache_dir: str = "cache"):
+    def __init__(self, cache_dir: str = "cache", transport: Optional[HttpTransport] = None, price_panel: Optional[SharedPricePanel] = None,
+                 quota: Optional[QuotaManager] = None):
         self.fmp_key = FMP_API_KEY
         self.td_key = TWELVE_DATA_API_KEY
         self.av_key = ALPHA_VANTAGE_API_KEY
         self.cache_dir = cache_dir
-        
-        if not os.path.exists(self.cache_dir):
-            os.makedirs(self.cache_dir)
+        self.transport = transport or build_transport_from_env()
+        # Optional shared mmap panel; cached bars are read from it before re-parsing JSON
+        self.price_panel = price_panel
+        # Daily provider budgets are counted in a ledger under the cache dir, shared by every worker
+        self.quota = quota or QuotaManager.from_env(os.path.join(cache_dir, "quota"))
+        # yfinance owns its own HTTP stack, so Yahoo only goes through the transport
+        # (via the raw JSON endpoints) when recording, replaying or pointed at a fake server
+        self.yahoo_via_transport = self.transport.mode != "live" or YAHOO_BASE_URL != YAHOO_DEFAULT_BASE_URL
+        self._gather_pool = ThreadPoolExecutor(max_workers=int(os.getenv("GATHER_WORKERS", 16)), thread_name_prefix="gather")
+        # Background revalidation of stale entries, kept off the gather pool
+        self._revalidate_pool = ThreadPoolExecutor(max_workers=int(os.getenv("REVALIDATE_WORKERS", 4)), thread_name_prefix="revalidate")
+        # (kind, ticker) -> Future of the one fetch in flight for that cache key
+        self._in_flight: Dict[Tuple[str, str], Future] = {}
+        self._flight_lock = threading.Lock()
+        self._fetch_seconds: Dict[Tuple[str, str], float] = {}
+        # Rows/bytes of the last frame seen per ticker, for the memory report
+        self._frame_memory: Dict[str, Dict[str, Any]] = {}
+        # Atomic writes, byte/entry budget with LRU eviction, and an in-memory index of entries
+        self.cache = CacheManager(cache_dir, max_bytes=int(os.getenv("CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+                                  max_entries=int(os.getenv("CACHE_MAX_ENTRIES", 5000)))
+
+    def _cache_name(self, ticker: str, type: str) -> str:
+        return f"{ticker}_{type}.json"
+
+    def _is_cache_valid(self, name: str, expiry_minutes: int) -> bool:
+        age = self.cache.age(name, recheck_after=expiry_minutes * 60)
+        return age is not None and age < expiry_minutes * 60
+
+    def _cache_state(self, key: Tuple[str, str], name: str, ttl_minutes: int, max_stale_minutes: int) -> str:
+        """
+        'fresh' (serve), 'stale' (serve and refresh in the background) or 'miss' (fetch now).
+        Fresh entries go stale early with a probability that rises towards the TTL and with
+        how slow the key is to refetch (XFetch), so hot keys are refreshed before anyone waits.
+        """
+        # Past the TTL the file is re-stat'ed in case another worker already refreshed it
+        age = self.cache.age(name, recheck_after=ttl_minutes * 60)
+        if age is None or age >= max_stale_minutes * 60:
+            return "miss"
+        if age >= ttl_minutes * 60:
+            return "stale"
+        delta = self._fetch_seconds.get(key, 1.0)
+        if age - delta * CACHE_EARLY_EXPIRY_BETA * math.log(1.0 - random.random()) >= ttl_minutes * 60:
+            return "stale"
+        return "fresh"
 
-    def _get_cache_path(self, ticker: str, type: str) -> str:
-        return os.path.join(self.cache_dir, f"{ticker}_{type}.json")
+    def _claim(self, key: Tuple[str, str]) -> Tuple[Future, bool]:
+        """Returns the key's in-flight Future and whether the caller now owns the fetch."""
+        with self._flight_lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future, False
+            future = self._in_flight[key] = Future()
+            return future, True
 
-    def _is_cache_valid(self, cache_path: str, expiry_minutes: int) -> bool:
-        if not os.path.exists(cache_path):
-            return False
-        mtime = os.path.getmtime(cache_path)
-        return (datetime.datetime.now().timestamp() - mtime) < (expiry_minutes * 60)
+    def _run_claimed_many(self, kind: str, claimed: List[Tuple[str, Future]], fetch_many: Callable[[List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        start = time.time()
+        try:
+            results = fetch_many([ticker for ticker, _ in claimed])
+        except Exception as e:
+            print(f"{kind} refresh failed: {e}")
+            results = {}
+        finally:
+            elapsed = time.time() - start
+            with self._flight_lock:
+                for ticker, _ in claimed:
+                    self._in_flight.pop((kind, ticker), None)
+                    self._fetch_seconds[(kind, ticker)] = elapsed
+        for ticker, future in claimed:
+            future.set_result(results.get(ticker))
+        return results
+
+    def _single_flight_many(self, kind: str, tickers: List[str], fetch_many: Callable[[List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+        """Fetches the keys nobody else is fetching and waits on the rest, so a miss never stampedes."""
+        owned, waiting = [], []
+        for ticker in tickers:
+            future, owner = self._claim((kind, ticker))
+            (owned if owner else waiting).append((ticker, future))
+        results = self._run_claimed_many(kind, owned, fetch_many) if owned else {}
+        for ticker, future in waiting:
+            results[ticker] = future.result()
+        return results
+
+    def _revalidate_many(self, kind: str, tickers: List[str], fetch_many: Callable[[List[str]], Dict[str, Any]]):
+        """Refreshes stale keys in one background task, skipping keys already being refreshed."""
+        claimed = []
+        for ticker in tickers:
+            future, owner = self._claim((kind, ticker))
+            if owner:
+                claimed.append((ticker, future))
+        if claimed:
+            self._revalidate_pool.submit(self._run_claimed_many, kind, claimed, fetch_many)
 
     def get_stock_data(self, ticker: str, period: str = "1y", interval: str = "1d", force_refresh: bool = False) -> pd.DataFrame:
         """
         Public method to get stock data with all fallbacks and 1-hour caching.
+        Stale entries are served while a background refresh runs (stale-while-revalidate).
         """
-        cache_path = self._get_cache_path(ticker, "price")
-        
-        if not force_refresh and self._is_cache_valid(cache_path, 60):
-            try:
-                df = pd.read_json(cache_path)
-                if not df.empty:
-                    print(f"Loading {ticker} price from cache...")
-                    return df
-            except:
-                pass
-
-        # Tier 1: Financial Modeling Prep
-        df = self._fetch_fmp(ticker, period, interval)
-        if df is None or df.empty:
-            # Tier 2: Twelve Data
-            df = self._fetch_twelve_data(ticker, period, interval)
-        if df is None or df.empty:
-            # Tier 3: Alpha Vantage
-            df = self._fetch_alpha_vantage(ticker, period, interval)
-        if df is None or df.empty:
-            # Tier 4: Yahoo Finance (Final Fallback)
-            df = self._fetch_yahoo_finance(ticker, period, interval)
+        return self._get_many_prices([ticker], period, interval, force_refresh, verbose=True)[ticker]
 
-        if df is not None and not df.empty:
-            df.to_json(cache_path)
-            
-        return df if df is not None else pd.DataFrame()
+    def _load_cached_price(self, ticker: str, expiry_minutes: Optional[int] = 60) -> Optional[pd.DataFrame]:
+        """expiry_minutes=None accepts a cache entry of any age."""
+        name = self._cache_name(ticker, "price")
+        if expiry_minutes is None:
+            if self.cache.age(name) is None:
+                return None
+        elif not self._is_cache_valid(name, expiry_minutes):
+            return None
+        try:
+            df = self._read_price_cache(ticker, name)
+            return df if df is not None and not df.empty else None
+        except:
+            return None
+
+    def _read_price_cache(self, ticker: str, name: str) -> Optional[pd.DataFrame]:
+        if self.price_panel is not None:
+            # The panel copy is only used if it is at least as new as the cache file
+            df = self.price_panel.get(ticker, not_before=self.cache.mtime(name) or 0.0)
+            if df is not None:
+                return df
+        text = self.cache.read_text(name)
+        if text is None:
+            return None
+        df = normalize_ohlcv(pd.read_json(io.StringIO(text)))
+        self._frame_memory[ticker] = frame_memory(df)
+        return df
+
+    def _write_price_cache(self, ticker: str, df: pd.DataFrame):
+        # Widened first so float32 prices are stored as 123.46, not 123.4599990845
+        self.cache.write_text(self._cache_name(ticker, "price"), widen_ohlcv(df).to_json())
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Footprint of the normalized price frames this process has loaded or fetched."""
+        sizes = dict(self._frame_memory)
+        total = sum(m["bytes"] for m in sizes.values())
+        largest = sorted(sizes.items(), key=lambda item: item[1]["bytes"], reverse=True)[:5]
+        return {
+            "frames": len(sizes), "bytes": total,
+            "avg_bytes": int(total / len(sizes)) if sizes else 0,
+            "largest": [{"ticker": t, **m} for t, m in largest]
+        }
+
+    def publish_price_panel(self, frames: Dict[str, pd.DataFrame]) -> int:
+        """Writes `frames` to the shared panel if this process is its writer. Returns tickers written."""
+        if self.price_panel is None or not self.price_panel.is_writer:
+            return 0
+        fetched_at = {}
+        for ticker in frames:
+            mtime = self.cache.mtime(self._cache_name(ticker, "price"))
+            if mtime is not None:
+                fetched_at[ticker] = mtime
+        try:
+            return self.price_panel.publish({t: df for t, df in frames.items() if t in fetched_at}, fetched_at)
+        except Exception as e:
+            print(f"Price panel publish failed: {e}")
+            return 0
+
+    def _load_cached_news(self, ticker: str, expiry_minutes: Optional[int] = 15) -> Optional[List[Dict[str, Any]]]:
+        name = self._cache_name(ticker, "news")
+        if expiry_minutes is None:
+            if self.cache.age(name) is None:
+                return None
+        elif not self._is_cache_valid(name, expiry_minutes):
+            return None
+        return self.cache.read_json(name)
+
+    def _spend(self, provider: str, endpoint: str, cost: float = 1) -> bool:
+        """Takes quota for one provider call; False means reroute to the next tier."""
+        if self.quota.acquire(provider, endpoint, cost):
+            return True
+        print(f"{provider} {endpoint} quota exhausted, rerouting...")
+        return False
+
+    def _keyed_providers(self) -> List[str]:
+        return [name for name, key in (("fmp", self.fmp_key), ("twelve_data", self.td_key), ("alpha_vantage", self.av_key)) if key]
+
+    def _keyed_tiers_exhausted(self, endpoint: str) -> bool:
+        providers = self._keyed_providers()
+        if endpoint == "news":
+            providers = [p for p in providers if p == "fmp"]
+        return self.quota.exhausted(providers, endpoint)
+
+    def quota_low(self) -> bool:
+        """True when every configured keyed provider is below its low-budget watermark."""
+        return self.quota.is_low(self._keyed_providers())
+
+    def quota_status(self) -> Dict[str, Any]:
+        return {**self.quota.snapshot(), "providers": self._keyed_providers(), "low": self.quota_low()}
 
     def _fetch_fmp(self, ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
-        if not self.fmp_key:
+        if not self.fmp_key or not self._spend("fmp", "price"):
             return None
         
         print(f"Fetching {ticker} from FMP...")
         try:
-            url = f"https://financialmodelingprep.com/api/v3/historical-price-full/{ticker}?apikey={self.fmp_key}"
-            response = requests.get(url, timeout=10)
-            data = response.json()
+            url = f"{FMP_BASE_URL}/api/v3/historical-price-full/{ticker}?apikey={self.fmp_key}"
+            with provider_call("fmp", "price"):
+                data = self.transport.get_json(url, timeout=10)
             
             if "historical" not in data:
                 return None
                 
-            df = pd.DataFrame(data["historical"])
-            df = df.iloc[::-1].reset_index(drop=True)
-            df = df.rename(columns={
-                "date": "Date", "open": "Open", "high": "High", 
-                "low": "Low", "close": "Close", "volume": "Volume"
-            })
-            df['Date'] = pd.to_datetime(df['Date'])
-            df.set_index('Date', inplace=True)
-            
-            if period == "1y":
-                start_date = datetime.datetime.now() - datetime.timedelta(days=365)
-                df = df[df.index >= start_date]
-                
-            return df
+            return self._parse_fmp_historical(data["historical"])
         except Exception as e:
             print(f"FMP failed: {e}")
             return None
 
+    def _parse_fmp_historical(self, historical: List[Dict[str, Any]]) -> Optional[pd.DataFrame]:
+        if not historical:
+            return None
+
+        df = pd.DataFrame(historical)
+        df = df.iloc[::-1].reset_index(drop=True)
+        df = df.rename(columns={
+            "date": "Date", "open": "Open", "high": "High", 
+            "low": "Low", "close": "Close", "volume": "Volume"
+        })
+        df['Date'] = pd.to_datetime(df['Date'])
+        df.set_index('Date', inplace=True)
+        return df
+
     def _fetch_twelve_data(self, ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
-        if not self.td_key:
+        if not self.td_key or not self._spend("twelve_data", "price"):
             return None
             
         print(f"Falling back to Twelve Data for {ticker}...")
         try:
             td_interval = "1day" if interval == "1d" else interval
-            url = f"https://api.twelvedata.com/time_series?symbol={ticker}&interval={td_interval}&outputsize=5000&apikey={self.td_key}&order=ASC"
+            url = f"{TWELVE_DATA_BASE_URL}/time_series?symbol={ticker}&interval={td_interval}&outputsize=5000&apikey={self.td_key}&order=ASC"
             
-            resp = requests.get(url, timeout=10)
-            data = resp.json()
+            with provider_call("twelve_data", "price"):
+                data = self.transport.get_json(url, timeout=10)
             
             if "values" in data:
-                df = pd.DataFrame(data["values"])
-                df = df.rename(columns={
-                    "datetime": "Date", "open": "Open", "high": "High", 
-                    "low": "Low", "close": "Close", "volume": "Volume"
-                })
-                for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
-                    df[col] = pd.to_numeric(df[col])
-                df['Date'] = pd.to_datetime(df['Date'])
-                df.set_index('Date', inplace=True)
-                return df
+                return self._parse_twelve_data_values(data["values"])
             return None
         except Exception as e:
             print(f"Twelve Data failed: {e}")
             return None
 
+    def _parse_twelve_data_values(self, values: List[Dict[str, Any]]) -> Optional[pd.DataFrame]:
+        if not values:
+            return None
+
+        df = pd.DataFrame(values)
+        df = df.rename(columns={
+            "datetime": "Date", "open": "Open", "high": "High", 
+            "low": "Low", "close": "Close", "volume": "Volume"
+        })
+        for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
+            df[col] = pd.to_numeric(df[col])
+        df['Date'] = pd.to_datetime(df['Date'])
+        df.set_index('Date', inplace=True)
+        return df
+
     def _fetch_alpha_vantage(self, ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
-        if not self.av_key:
+        if not self.av_key or not self._spend("alpha_vantage", "price"):
             return None
             
         print(f"Falling back to Alpha Vantage for {ticker}...")
         try:
-            url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={ticker}&outputsize=full&apikey={self.av_key}"
-            resp = requests.get(url, timeout=15)
-            data = resp.json()
+            url = f"{ALPHA_VANTAGE_BASE_URL}/query?function=TIME_SERIES_DAILY&symbol={ticker}&outputsize=full&apikey={self.av_key}"
+            with provider_call("alpha_vantage", "price"):
+                data = self.transport.get_json(url, timeout=15)
             
             if "Time Series (Daily)" in data:
                 df = pd.DataFrame(data["Time Series (Daily)"]).T
@@ -158,62 +343,83 @@ class DataOrchestrator:
     def _fetch_yahoo_finance(self, ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
         print(f"Final fallback to Yahoo Finance for {ticker}...")
         try:
-            import yfinance as yf
             yf_interval = "1d" if interval == "1d" else interval
+            if self.yahoo_via_transport:
+                return self._fetch_yahoo_chart(ticker, period, yf_interval)
+
+            import yfinance as yf
             ticker_obj = yf.Ticker(ticker)
-            df = ticker_obj.history(period=period, interval=yf_interval)
-            
-            if df.empty:
-                return None
-            
-            df = df[['Open', 'High', 'Low', 'Close', 'Volume']].copy()
-            if df.index.tz is not None:
-                df.index = df.index.tz_localize(None)
-            df.index.name = 'Date'
-            return df
+            with provider_call("yahoo", "price"):
+                df = ticker_obj.history(period=period, interval=yf_interval)
+            return self._normalize_yahoo_frame(df)
         except Exception as e:
             print(f"Yahoo Finance failed: {e}")
             return None
 
+    def _fetch_yahoo_chart(self, ticker: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+        """Reads the raw Yahoo chart JSON through the transport (record/replay/fake server)."""
+        url = f"{YAHOO_BASE_URL}/v8/finance/chart/{ticker}?range={period}&interval={interval}"
+        with provider_call("yahoo", "price"):
+            data = self.transport.get_json(url, timeout=10)
+        result = (data.get("chart", {}).get("result") or [None])[0]
+        if not result or not result.get("timestamp"):
+            return None
+
+        quote = result["indicators"]["quote"][0]
+        df = pd.DataFrame({
+            "Open": quote.get("open"), "High": quote.get("high"), "Low": quote.get("low"),
+            "Close": quote.get("close"), "Volume": quote.get("volume")
+        }, index=pd.to_datetime(result["timestamp"], unit="s"))
+        return self._normalize_yahoo_frame(df)
+
+    def _normalize_yahoo_frame(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+        if df is None or df.empty:
+            return None
+
+        df = df[['Open', 'High', 'Low', 'Close', 'Volume']].dropna(how='all').copy()
+        if df.empty:
+            return None
+        if df.index.tz is not None:
+            df.index = df.index.tz_localize(None)
+        df.index.name = 'Date'
+        return df
+
     def get_ticker_news(self, ticker: str, limit: int = 5, force_refresh: bool = False) -> List[Dict[str, Any]]:
         """
         Fetches latest news for a specific ticker with 15-minute caching.
+        Stale entries are served while a background refresh runs (stale-while-revalidate).
         """
-        cache_path = self._get_cache_path(ticker, "news")
-        
-        if not force_refresh and self._is_cache_valid(cache_path, 15):
-            try:
-                with open(cache_path, 'r') as f:
-                    print(f"Loading {ticker} news from cache...")
-                    return json.load(f)
-            except:
-                pass
+        return self._get_many_news([ticker], limit, force_refresh, verbose=True)[ticker]
 
+    def _fetch_news(self, ticker: str, limit: int) -> List[Dict[str, Any]]:
+        """Per-symbol news chain (FMP, then Yahoo); non-empty results are cached."""
+        cache_name = self._cache_name(ticker, "news")
         news = []
         # Try FMP first
-        if self.fmp_key:
+        if self.fmp_key and self._spend("fmp", "news"):
             try:
-                url = f"https://financialmodelingprep.com/api/v3/stock_news?tickers={ticker}&limit={limit}&apikey={self.fmp_key}"
-                resp = requests.get(url, timeout=10)
-                data = resp.json()
+                url = f"{FMP_BASE_URL}/api/v3/stock_news?tickers={ticker}&limit={limit}&apikey={self.fmp_key}"
+                with provider_call("fmp", "news"):
+                    data = self.transport.get_json(url, timeout=10)
                 if isinstance(data, list):
-                    for item in data:
-                        news.append({
-                            "title": item.get("title"),
-                            "summary": item.get("text"),
-                            "url": item.get("url"),
-                            "date": item.get("publishedDate"),
-                            "source": item.get("site")
-                        })
+                    news = [self._format_fmp_news_item(item) for item in data]
+                    if news:
+                        self.cache.write_json(cache_name, news)
                     return news
             except Exception as e:
                 print(f"FMP News failed: {e}")
 
         # Fallback to Yahoo Finance (via yfinance)
         try:
-            import yfinance as yf
-            ticker_obj = yf.Ticker(ticker)
-            yf_news = ticker_obj.news
+            if self.yahoo_via_transport:
+                url = f"{YAHOO_BASE_URL}/v1/finance/search?q={ticker}&quotesCount=0&newsCount={limit}"
+                with provider_call("yahoo", "news"):
+                    yf_news = self.transport.get_json(url, timeout=10).get("news", [])
+            else:
+                import yfinance as yf
+                ticker_obj = yf.Ticker(ticker)
+                with provider_call("yahoo", "news"):
+                    yf_news = ticker_obj.news
             if yf_news:
                 for item in yf_news[:limit]:
                     # Support new yfinance schema
@@ -247,63 +453,378 @@ class DataOrchestrator:
                         "source": "Yahoo Finance"
                     })
                 if news:
-                    with open(cache_path, 'w') as f:
-                        json.dump(news, f)
+                    self.cache.write_json(cache_name, news)
                 return news
         except Exception as e:
             print(f"Yahoo News failed: {e}")
             
         if news:
-            with open(cache_path, 'w') as f:
-                json.dump(news, f)
+            self.cache.write_json(cache_name, news)
         return news
 
+    def _format_fmp_news_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "title": item.get("title"),
+            "summary": item.get("text"),
+            "url": item.get("url"),
+            "date": item.get("publishedDate"),
+            "source": item.get("site")
+        }
+
     def get_options_intel(self, ticker: str) -> Dict[str, Any]:
         """
         Fetches high-level option chain metrics for institutional sentiment analysis.
         """
         print(f"Fetching Options Intelligence for {ticker}...")
         try:
+            if self.yahoo_via_transport:
+                return self._fetch_yahoo_options(ticker)
+
             import yfinance as yf
             ticker_obj = yf.Ticker(ticker)
             
-            expirations = ticker_obj.options
+            with provider_call("yahoo", "options"):
+                expirations = ticker_obj.options
             if not expirations:
                 return {"has_options": False}
                 
             # Get the first available expiration (near-term sentiment)
-            opt_chain = ticker_obj.option_chain(expirations[0])
-            calls = opt_chain.calls
-            puts = opt_chain.puts
-            
-            total_call_vol = int(calls['volume'].sum())
-            total_put_vol = int(puts['volume'].sum())
-            avg_iv = round(float(calls['impliedVolatility'].mean() * 100), 1)
-            
-            # Absolute highest Open Interest strike across both sides
-            max_oi_call = calls.loc[calls['openInterest'].idxmax()]
-            max_oi_put = puts.loc[puts['openInterest'].idxmax()]
-            
-            if max_oi_call['openInterest'] >= max_oi_put['openInterest']:
-                top_strike = float(max_oi_call['strike'])
-                top_type = "Call Wall"
-            else:
-                top_strike = float(max_oi_put['strike'])
-                top_type = "Put Wall"
-            
-            return {
-                "has_options": True,
-                "expiration": expirations[0],
-                "put_call_ratio": round(total_put_vol / total_call_vol if total_call_vol > 0 else 0, 2),
-                "avg_iv": avg_iv,
-                "max_oi_strike": top_strike,
-                "strike_label": top_type,
-                "total_volume": int(total_call_vol + total_put_vol)
-            }
+            with provider_call("yahoo", "options"):
+                opt_chain = ticker_obj.option_chain(expirations[0])
+            return self._summarize_option_chain(expirations[0], opt_chain.calls, opt_chain.puts)
         except Exception as e:
             print(f"Options Intel failed for {ticker}: {e}")
             return {"has_options": False}
 
+    def _fetch_yahoo_options(self, ticker: str) -> Dict[str, Any]:
+        """Reads the raw Yahoo option chain JSON through the transport (record/replay/fake server)."""
+        url = f"{YAHOO_BASE_URL}/v7/finance/options/{ticker}"
+        with provider_call("yahoo", "options"):
+            data = self.transport.get_json(url, timeout=10)
+        result = (data.get("optionChain", {}).get("result") or [None])[0]
+        if not result or not result.get("options"):
+            return {"has_options": False}
+
+        chain = result["options"][0]
+        expiration = datetime.datetime.fromtimestamp(chain["expirationDate"], datetime.timezone.utc).strftime("%Y-%m-%d")
+        columns = ['strike', 'volume', 'openInterest', 'impliedVolatility']
+        calls = pd.DataFrame(chain.get("calls", []), columns=columns).fillna(0)
+        puts = pd.DataFrame(chain.get("puts", []), columns=columns).fillna(0)
+        if calls.empty or puts.empty:
+            return {"has_options": False}
+        return self._summarize_option_chain(expiration, calls, puts)
+
+    def _summarize_option_chain(self, expiration: str, calls: pd.DataFrame, puts: pd.DataFrame) -> Dict[str, Any]:
+        total_call_vol = int(calls['volume'].sum())
+        total_put_vol = int(puts['volume'].sum())
+        avg_iv = round(float(calls['impliedVolatility'].mean() * 100), 1)
+        
+        # Absolute highest Open Interest strike across both sides
+        max_oi_call = calls.loc[calls['openInterest'].idxmax()]
+        max_oi_put = puts.loc[puts['openInterest'].idxmax()]
+        
+        if max_oi_call['openInterest'] >= max_oi_put['openInterest']:
+            top_strike = float(max_oi_call['strike'])
+            top_type = "Call Wall"
+        else:
+            top_strike = float(max_oi_put['strike'])
+            top_type = "Put Wall"
+        
+        return {
+            "has_options": True,
+            "expiration": expiration,
+            "put_call_ratio": round(total_put_vol / total_call_vol if total_call_vol > 0 else 0, 2),
+            "avg_iv": avg_iv,
+            "max_oi_strike": top_strike,
+            "strike_label": top_type,
+            "total_volume": int(total_call_vol + total_put_vol)
+        }
+
+    # --- CONCURRENT GATHERING ---
+
+    def gather(self, tasks: Dict[str, Callable[[], Any]], timeout: float = 10.0, defaults: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Runs independent fetches concurrently under one shared deadline.
+        Any task that fails or is still running at the deadline gets its default (None if
+        not given) and is reported in the returned `degraded` list. Late tasks keep running
+        in the background, so their results still land in the cache for the next request.
+        """
+        defaults = defaults or {}
+        start = time.monotonic()
+        futures = {name: self._gather_pool.submit(fn) for name, fn in tasks.items()}
+        wait(futures.values(), timeout=timeout)
+
+        results, degraded = {}, []
+        for name, future in futures.items():
+            if not future.done():
+                print(f"Gather: '{name}' missed the {timeout}s deadline, degrading")
+                results[name] = defaults.get(name)
+                degraded.append(name)
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"Gather: '{name}' failed: {e}")
+                results[name] = defaults.get(name)
+                degraded.append(name)
+
+        print(f"Gathered {len(tasks)} inputs in {time.monotonic() - start:.2f}s")
+        return results, degraded
+
+    # --- BATCH FETCHING ---
+
+    def get_many(self, tickers: List[str], kinds: tuple = ("price",), period: str = "1y", interval: str = "1d", news_limit: int = 5, force_refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Batch version of the single-ticker getters for universe-wide work.
+        Symbols are grouped into provider-sized batches and the responses are
+        split back into the same per-ticker cache entries the single getters use.
+        Returns {ticker: {kind: data}} for kinds in ("price", "news", "options").
+        """
+        tickers = list(dict.fromkeys(t.upper().strip() for t in tickers if t))
+        results = {t: {} for t in tickers}
+
+        if "price" in kinds:
+            for ticker, df in self._get_many_prices(tickers, period, interval, force_refresh).items():
+                results[ticker]["price"] = df
+        if "news" in kinds:
+            for ticker, news in self._get_many_news(tickers, news_limit, force_refresh).items():
+                results[ticker]["news"] = news
+        if "options" in kinds:
+            # No provider offers multi-symbol option chains
+            for ticker in tickers:
+                results[ticker]["options"] = self.get_options_intel(ticker)
+
+        return results
+
+    def _get_many_prices(self, tickers: List[str], period: str, interval: str, force_refresh: bool, verbose: bool = False) -> Dict[str, pd.DataFrame]:
+        frames = {}
+        pending = []
+        stale = []
+        for ticker in tickers:
+            name = self._cache_name(ticker, "price")
+            state = "miss" if force_refresh else self._cache_state(("price", ticker), name, PRICE_TTL_MINUTES, PRICE_MAX_STALE_MINUTES)
+            df = self._load_cached_price(ticker, expiry_minutes=None) if state != "miss" else None
+            if df is None:
+                CACHE_LOOKUPS.inc("price", "miss")
+                pending.append(ticker)
+                continue
+            CACHE_LOOKUPS.inc("price", "stale" if state == "stale" else "hit")
+            frames[ticker] = df
+            if state == "stale":
+                stale.append(ticker)
+            elif verbose:
+                print(f"Loading {ticker} price from cache...")
+
+        fetch_many = lambda batch: self._fetch_price_batch(batch, period, interval)
+        if stale:
+            self._revalidate_many("price", stale, fetch_many)
+
+        # With every keyed tier out of budget, an expired cache beats hours of slow Yahoo
+        if pending and not force_refresh and self._keyed_tiers_exhausted("price"):
+            for ticker in pending:
+                df = self._load_cached_price(ticker, expiry_minutes=None)
+                if df is not None:
+                    print(f"Provider quota exhausted, serving stale {ticker} price from cache...")
+                    frames[ticker] = df
+            pending = [t for t in pending if t not in frames]
+
+        if pending:
+            if len(pending) > 1:
+                print(f"Batch fetching prices for {len(pending)} tickers ({len(frames)} cached)...")
+            frames.update(self._single_flight_many("price", pending, fetch_many))
+
+        return {t: frames[t] if frames.get(t) is not None else pd.DataFrame() for t in tickers}
+
+    def _fetch_price_batch(self, tickers: List[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+        """Runs the provider tiers for `tickers` and writes every frame fetched to the cache."""
+        frames = {}
+        pending = list(tickers)
+        # FMP -> Twelve Data -> Alpha Vantage -> Yahoo; a one-symbol chunk uses the per-symbol
+        # endpoint, and Alpha Vantage has no batch endpoint so it always runs per symbol
+        for fetch in (self._fetch_fmp_batch, self._fetch_twelve_data_batch, self._fetch_alpha_vantage_each, self._fetch_yahoo_batch):
+            if not pending:
+                break
+            fetched = fetch(pending, period, interval)
+            for ticker, df in fetched.items():
+                # Every tier lands in the same compact schema, trimmed to the same period
+                try:
+                    df = normalize_ohlcv(df, period)
+                except Exception as e:
+                    print(f"Dropping malformed {ticker} frame: {e}")
+                    continue
+                if df is not None and not df.empty:
+                    self._write_price_cache(ticker, df)
+                    self._frame_memory[ticker] = frame_memory(df)
+                    frames[ticker] = df
+            pending = [t for t in pending if t not in frames]
+        return frames
+
+    def _chunks(self, items: List[str], size: int) -> List[List[str]]:
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def _fetch_fmp_batch(self, tickers: List[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+        if not self.fmp_key:
+            return {}
+
+        frames = {}
+        for batch in self._chunks(tickers, self.BATCH_SIZES["fmp_price"]):
+            if len(batch) == 1:
+                frames[batch[0]] = self._fetch_fmp(batch[0], period, interval)
+                continue
+
+            if not self._spend("fmp", "price"):
+                break
+            print(f"Fetching {len(batch)} tickers from FMP (batch)...")
+            try:
+                url = f"{FMP_BASE_URL}/api/v3/historical-price-full/{','.join(batch)}?apikey={self.fmp_key}"
+                with provider_call("fmp", "price_batch"):
+                    data = self.transport.get_json(url, timeout=15)
+
+                # Multi-symbol responses are wrapped in historicalStockList
+                for entry in data.get("historicalStockList", []):
+                    symbol = str(entry.get("symbol", "")).upper()
+                    if symbol in batch:
+                        frames[symbol] = self._parse_fmp_historical(entry.get("historical", []))
+            except Exception as e:
+                print(f"FMP batch failed: {e}. Retrying per symbol.")
+                for ticker in batch:
+                    frames[ticker] = self._fetch_fmp(ticker, period, interval)
+        return frames
+
+    def _fetch_twelve_data_batch(self, tickers: List[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+        if not self.td_key:
+            return {}
+
+        frames = {}
+        td_interval = "1day" if interval == "1d" else interval
+        # Twelve Data bills one credit per symbol, so a batch can't exceed the per-minute budget
+        batch_size = int(min(self.BATCH_SIZES["twelve_data"], self.quota.max_cost("twelve_data", "price")))
+        for batch in self._chunks(tickers, max(1, batch_size)):
+            if len(batch) == 1:
+                frames[batch[0]] = self._fetch_twelve_data(batch[0], period, interval)
+                continue
+            if not self._spend("twelve_data", "price", cost=len(batch)):
+                break
+
+            print(f"Falling back to Twelve Data for {len(batch)} tickers (batch)...")
+            try:
+                url = f"{TWELVE_DATA_BASE_URL}/time_series?symbol={','.join(batch)}&interval={td_interval}&outputsize=5000&apikey={self.td_key}&order=ASC"
+                with provider_call("twelve_data", "price_batch"):
+                    data = self.transport.get_json(url, timeout=20)
+
+                # Multi-symbol responses are keyed by symbol, each with its own status
+                for ticker in batch:
+                    entry = data.get(ticker)
+                    if isinstance(entry, dict) and "values" in entry:
+                        frames[ticker] = self._parse_twelve_data_values(entry["values"])
+            except Exception as e:
+                print(f"Twelve Data batch failed: {e}. Retrying per symbol.")
+                for ticker in batch:
+                    frames[ticker] = self._fetch_twelve_data(ticker, period, interval)
+        return frames
+
+    def _fetch_alpha_vantage_each(self, tickers: List[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+        if not self.av_key:
+            return {}
+        return {ticker: self._fetch_alpha_vantage(ticker, period, interval) for ticker in tickers}
+
+    def _fetch_yahoo_batch(self, tickers: List[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+        frames = {}
+        for batch in self._chunks(tickers, self.BATCH_SIZES["yahoo"]):
+            if len(batch) == 1:
+                frames[batch[0]] = self._fetch_yahoo_finance(batch[0], period, interval)
+                continue
+
+            if self.yahoo_via_transport:
+                # The raw chart endpoint is single-symbol
+                for ticker in batch:
+                    frames[ticker] = self._fetch_yahoo_finance(ticker, period, interval)
+                continue
+
+            print(f"Final fallback to Yahoo Finance for {len(batch)} tickers (batch)...")
+            try:
+                import yfinance as yf
+                yf_interval = "1d" if interval == "1d" else interval
+                with provider_call("yahoo", "price_batch"):
+                    data = yf.download(batch, period=period, interval=yf_interval, group_by='ticker',
+                                       auto_adjust=False, threads=True, progress=False)
+                for ticker in batch:
+                    if ticker in data.columns.get_level_values(0):
+                        frames[ticker] = self._normalize_yahoo_frame(data[ticker])
+            except Exception as e:
+                print(f"Yahoo batch failed: {e}. Retrying per symbol.")
+                for ticker in batch:
+                    frames[ticker] = self._fetch_yahoo_finance(ticker, period, interval)
+        return frames
+
+    def _get_many_news(self, tickers: List[str], limit: int, force_refresh: bool, verbose: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+        results = {}
+        pending = []
+        stale = []
+        for ticker in tickers:
+            name = self._cache_name(ticker, "news")
+            state = "miss" if force_refresh else self._cache_state(("news", ticker), name, NEWS_TTL_MINUTES, NEWS_MAX_STALE_MINUTES)
+            news = self._load_cached_news(ticker, expiry_minutes=None) if state != "miss" else None
+            if news is None:
+                CACHE_LOOKUPS.inc("news", "miss")
+                pending.append(ticker)
+                continue
+            CACHE_LOOKUPS.inc("news", "stale" if state == "stale" else "hit")
+            results[ticker] = news
+            if state == "stale":
+                stale.append(ticker)
+            elif verbose:
+                print(f"Loading {ticker} news from cache...")
+
+        fetch_many = lambda batch: self._fetch_news_batch(batch, limit)
+        if stale:
+            self._revalidate_many("news", stale, fetch_many)
+
+        if pending and not force_refresh and self._keyed_tiers_exhausted("news"):
+            for ticker in pending:
+                news = self._load_cached_news(ticker, expiry_minutes=None)
+                if news is not None:
+                    print(f"Provider quota exhausted, serving stale {ticker} news from cache...")
+                    results[ticker] = news
+            pending = [t for t in pending if t not in results]
+
+        if pending:
+            results.update(self._single_flight_many("news", pending, fetch_many))
+        return {t: results[t] if results.get(t) is not None else [] for t in tickers}
+
+    def _fetch_news_batch(self, tickers: List[str], limit: int) -> Dict[str, List[Dict[str, Any]]]:
+        results = {}
+        if self.fmp_key and len(tickers) > 1:
+            for batch in self._chunks(tickers, self.BATCH_SIZES["fmp_news"]):
+                if not self._spend("fmp", "news"):
+                    break
+                print(f"Fetching news for {len(batch)} tickers from FMP (batch)...")
+                try:
+                    # The stock_news limit is global, so request enough rows to cover every symbol
+                    url = f"{FMP_BASE_URL}/api/v3/stock_news?tickers={','.join(batch)}&limit={limit * len(batch) * 2}&apikey={self.fmp_key}"
+                    with provider_call("fmp", "news_batch"):
+                        data = self.transport.get_json(url, timeout=15)
+                    if not isinstance(data, list):
+                        continue
+
+                    grouped = {t: [] for t in batch}
+                    for item in data:
+                        symbol = str(item.get("symbol", "")).upper()
+                        if symbol in grouped and len(grouped[symbol]) < limit:
+                            grouped[symbol].append(self._format_fmp_news_item(item))
+                    for ticker, news in grouped.items():
+                        if news:
+                            self.cache.write_json(self._cache_name(ticker, "news"), news)
+                            results[ticker] = news
+                except Exception as e:
+                    print(f"FMP batch news failed: {e}")
+
+        # Symbols the batch did not cover go through the regular per-symbol chain
+        for ticker in tickers:
+            if ticker not in results:
+                results[ticker] = self._fetch_news(ticker, limit)
+        return results
+
 if __name__ == "__main__":
     orchestrator = DataOrchestrator()
     sample_data = orchestrator.get_stock_data("AAPL")
@@ -0,0 +1,23 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+from ohlcv import normalize_ohlcv
+from relative_strength import RS_HORIZONS, RelativeStrengthEngine
+
+# A realistic 1y daily frame: providers return ~250 trading days for 365 calendar days
+dates = pd.bdate_range(end=datetime.datetime.now(), periods=300)
+rng = np.random.default_rng(0)
+
+def frame(drift):
+    close = 100 * np.cumprod(1 + drift + rng.normal(0, 0.01, len(dates)))
+    df = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close, 'Volume': 1e6}, index=dates)
+    return normalize_ohlcv(df, "1y").tail(250)
+
+spy = frame(0.0003)
+table = RelativeStrengthEngine().compute({"LEAD": frame(0.002), "LAG": frame(-0.001)}, spy)
+print(f"{len(spy)} bars")
+print(table.to_string())
+for h in RS_HORIZONS:
+    assert table[f"rs_{h}"].notna().all(), f"rs_{h} is empty for a 1y frame"
+assert table.index[0] == "LEAD"
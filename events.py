@@ -0,0 +1,87 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Point events fire on single bars; state events (squeeze_on) span runs of bars
+VPA_EVENTS = ["churning", "stopping_volume", "no_demand"]
+SQUEEZE_EVENTS = ["squeeze_on", "squeeze_fired"]
+EVENT_COLUMNS = VPA_EVENTS + SQUEEZE_EVENTS
+STATE_EVENTS = ("squeeze_on",)
+
+
+def price_events(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Boolean event series for every bar of `df` in one vectorized pass, using the same
+    rules AnalystEngine applies to the last bar:
+
+    churning         volume > 1.5x its 20-bar average on a range < 60% of the 10-bar average range
+    stopping_volume  down close on > 1.5x volume with a lower wick over twice the body
+    no_demand        up close on < 0.7x average volume
+    squeeze_on       Bollinger Bands (20, 2.0) inside Keltner Channels (20, 1.5 x range)
+    squeeze_fired    first bar out of a squeeze (prior upper band inside the channel)
+
+    Bars without enough history for the rolling windows are False.
+    """
+    high = df['High'].to_numpy(dtype='float64')
+    low = df['Low'].to_numpy(dtype='float64')
+    open_ = df['Open'].to_numpy(dtype='float64')
+    close = df['Close'].to_numpy(dtype='float64')
+    volume = df['Volume'].to_numpy(dtype='float64')
+
+    def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+        return pd.Series(values).rolling(window).mean().to_numpy()
+
+    prev_close = np.r_[np.nan, close[:-1]]
+    avg_volume = rolling_mean(volume, 20)
+    spread = high - low
+    body = np.abs(close - open_)
+    heavy = volume > avg_volume * 1.5
+
+    churning = heavy & (spread < (rolling_mean(high, 10) - rolling_mean(low, 10)) * 0.6)
+    stopping = (close < prev_close) & heavy & (np.minimum(open_, close) - low > body * 2)
+    no_demand = (close > prev_close) & (volume < avg_volume * 0.7)
+
+    sma20 = rolling_mean(close, 20)
+    std20 = pd.Series(close).rolling(20).std().to_numpy()
+    atr = rolling_mean(spread, 20)
+    upper_inside = sma20 + 2.0 * std20 < sma20 + 1.5 * atr
+    squeeze_on = upper_inside & (sma20 - 2.0 * std20 > sma20 - 1.5 * atr)
+    squeeze_fired = ~squeeze_on & np.r_[False, upper_inside[:-1]]
+
+    return pd.DataFrame({
+        "churning": churning,
+        "stopping_volume": stopping,
+        "no_demand": no_demand,
+        "squeeze_on": squeeze_on,
+        "squeeze_fired": squeeze_fired
+    }, index=df.index)
+
+
+def bars_since(events: pd.DataFrame) -> Dict[str, float]:
+    """Bars since each event last fired (0 = the last bar), NaN if it never did."""
+    values = events.to_numpy()
+    if not len(values):
+        return {name: np.nan for name in events.columns}
+    last = len(values) - 1 - np.argmax(values[::-1], axis=0)
+    fired = values.any(axis=0)
+    return {name: float(len(values) - 1 - last[i]) if fired[i] else np.nan for i, name in enumerate(events.columns)}
+
+
+def event_timeline(events: pd.DataFrame, limit: Optional[int] = None) -> Dict[str, List[Any]]:
+    """
+    Dates each point event fired and [start, end] runs for state events, oldest first,
+    keeping the last `limit` entries per event.
+    """
+    dates = events.index.strftime('%Y-%m-%d')
+    timeline = {}
+    for name in events.columns:
+        flags = events[name].to_numpy()
+        if name in STATE_EVENTS:
+            edges = np.diff(np.r_[0, flags.astype(np.int8), 0])
+            starts, ends = np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0] - 1
+            entries = [{"start": dates[s], "end": dates[e]} for s, e in zip(starts, ends)]
+        else:
+            entries = list(dates[flags])
+        timeline[name] = entries[-limit:] if limit else entries
+    return timeline
@@ -0,0 +1,263 @@
+"""
+Local stand-in for every DataOrchestrator provider tier (FMP, Twelve Data, Alpha Vantage, Yahoo).
+
+Serves deterministic synthetic OHLCV, news and option chains in each provider's JSON shape so
+benchmarks and load tests run offline. Point the orchestrator at it with:
+
+    FMP_BASE_URL=http://127.0.0.1:8765/fmp
+    TWELVE_DATA_BASE_URL=http://127.0.0.1:8765/twelvedata
+    ALPHA_VANTAGE_BASE_URL=http://127.0.0.1:8765/alphavantage
+    YAHOO_BASE_URL=http://127.0.0.1:8765/yahoo
+
+(plus any non-empty API keys). See fake_provider_env().
+
+It also stands in for an alert webhook: POSTs to /webhook are recorded in server.webhooks
+(ALERT_WEBHOOK_URL=http://127.0.0.1:8765/webhook).
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+TIERS = ("fmp", "twelvedata", "alphavantage", "yahoo")
+HISTORY_DAYS = 400
+
+
+def fake_provider_env(host: str = "127.0.0.1", port: int = 8765) -> Dict[str, str]:
+    """Environment variables that route every orchestrator tier to a fake server."""
+    base = f"http://{host}:{port}"
+    return {
+        "FMP_BASE_URL": f"{base}/fmp",
+        "TWELVE_DATA_BASE_URL": f"{base}/twelvedata",
+        "ALPHA_VANTAGE_BASE_URL": f"{base}/alphavantage",
+        "YAHOO_BASE_URL": f"{base}/yahoo",
+        "ALERT_WEBHOOK_URL": f"{base}/webhook",
+        "FMP_API_KEY": "fake",
+        "TWELVE_DATA_API_KEY": "fake",
+        "ALPHA_VANTAGE_API_KEY": "fake"
+    }
+
+
+def _seed(symbol: str) -> int:
+    return int(hashlib.md5(symbol.encode()).hexdigest()[:8], 16)
+
+
+def synthetic_ohlcv(symbol: str, days: int = HISTORY_DAYS) -> pd.DataFrame:
+    """Deterministic random-walk daily bars ending on the last business day."""
+    rng = np.random.default_rng(_seed(symbol))
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    start = 20 + (_seed(symbol) % 400)
+    close = start * np.exp(np.cumsum(rng.normal(0.0004, 0.02, days)))
+    open_ = close * (1 + rng.normal(0, 0.005, days))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, days)))
+    volume = rng.integers(500_000, 5_000_000, days)
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=dates).round(4)
+
+
+def synthetic_news(symbol: str, limit: int) -> List[Dict[str, Any]]:
+    headlines = ["{s} beats earnings estimates", "Analyst upgrade lifts {s}", "{s} announces partnership",
+                 "{s} faces investigation", "{s} shares drift in quiet session"]
+    rng = random.Random(_seed(symbol))
+    now = datetime.datetime.now()
+    return [{
+        "symbol": symbol,
+        "title": rng.choice(headlines).format(s=symbol),
+        "text": f"Synthetic news item {i} for {symbol}.",
+        "url": f"https://example.invalid/{symbol}/{i}",
+        "publishedDate": (now - datetime.timedelta(hours=6 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+        "site": "Fake Wire"
+    } for i in range(limit)]
+
+
+def synthetic_option_chain(symbol: str) -> Dict[str, Any]:
+    rng = np.random.default_rng(_seed(symbol) + 1)
+    spot = float(synthetic_ohlcv(symbol)["Close"].iloc[-1])
+    strikes = np.round(spot * np.linspace(0.8, 1.2, 9), 2)
+
+    def side():
+        return [{
+            "strike": float(k),
+            "volume": int(rng.integers(0, 5000)),
+            "openInterest": int(rng.integers(0, 20000)),
+            "impliedVolatility": float(rng.uniform(0.2, 1.2))
+        } for k in strikes]
+
+    expiry = int((pd.Timestamp.today().normalize() + pd.Timedelta(days=7)).timestamp())
+    return {"optionChain": {"result": [{"expirationDates": [expiry], "options": [
+        {"expirationDate": expiry, "calls": side(), "puts": side()}
+    ]}]}}
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    server_version = "FakeProvider/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self.server.count_request()
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+
+        parts = urlsplit(self.path)
+        segments = [s for s in parts.path.split("/") if s]
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        tier = segments[0] if segments else ""
+
+        if tier not in TIERS:
+            return self._send(404, {"error": f"Unknown tier '{tier}'"})
+        if tier in self.server.disabled_tiers or self.server.should_fail():
+            return self._send(503, {"error": "Simulated provider outage"})
+
+        try:
+            body = getattr(self, f"_route_{tier}")(segments[1:], query)
+        except Exception as e:
+            return self._send(500, {"error": str(e)})
+        if body is None:
+            return self._send(404, {"error": "Unknown endpoint"})
+        return self._send(200, body)
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip("/") != "/webhook":
+            return self._send(404, {"error": "Unknown endpoint"})
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            return self._send(400, {"error": "Invalid JSON"})
+        self.server.record_webhook(body)
+        if self.server.verbose:
+            print(f"Webhook: {json.dumps(body)[:500]}")
+        return self._send(200, {"received": True})
+
+    def _send(self, status: int, body: Any):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    # --- Tier routes (paths below the tier prefix) ---
+
+    def _route_fmp(self, segments: List[str], query: Dict[str, str]) -> Optional[Any]:
+        if segments[:3] == ["api", "v3", "historical-price-full"] and len(segments) == 4:
+            symbols = segments[3].split(",")
+            entries = [{"symbol": s, "historical": self._fmp_rows(s)} for s in symbols]
+            return entries[0] if len(entries) == 1 else {"historicalStockList": entries}
+        if segments[:3] == ["api", "v3", "stock_news"]:
+            symbols = query.get("tickers", "").split(",")
+            limit = int(query.get("limit", 5))
+            per_symbol = max(1, limit // max(1, len(symbols)))
+            return [item for s in symbols for item in synthetic_news(s, per_symbol)][:limit]
+        return None
+
+    def _fmp_rows(self, symbol: str) -> List[Dict[str, Any]]:
+        df = synthetic_ohlcv(symbol).iloc[::-1]
+        return [{"date": d.strftime("%Y-%m-%d"), "open": r.Open, "high": r.High, "low": r.Low,
+                 "close": r.Close, "volume": int(r.Volume)} for d, r in zip(df.index, df.itertuples())]
+
+    def _route_twelvedata(self, segments: List[str], query: Dict[str, str]) -> Optional[Any]:
+        if segments != ["time_series"]:
+            return None
+        symbols = query.get("symbol", "").split(",")
+        entries = {s: {"meta": {"symbol": s}, "values": self._td_rows(s), "status": "ok"} for s in symbols}
+        return entries[symbols[0]] if len(symbols) == 1 else entries
+
+    def _td_rows(self, symbol: str) -> List[Dict[str, str]]:
+        df = synthetic_ohlcv(symbol)
+        return [{"datetime": d.strftime("%Y-%m-%d"), "open": str(r.Open), "high": str(r.High), "low": str(r.Low),
+                 "close": str(r.Close), "volume": str(int(r.Volume))} for d, r in zip(df.index, df.itertuples())]
+
+    def _route_alphavantage(self, segments: List[str], query: Dict[str, str]) -> Optional[Any]:
+        if segments != ["query"] or query.get("function") != "TIME_SERIES_DAILY":
+            return None
+        df = synthetic_ohlcv(query.get("symbol", ""))
+        series = {d.strftime("%Y-%m-%d"): {"1. open": str(r.Open), "2. high": str(r.High), "3. low": str(r.Low),
+                                           "4. close": str(r.Close), "5. volume": str(int(r.Volume))}
+                  for d, r in zip(df.index, df.itertuples())}
+        return {"Meta Data": {"2. Symbol": query.get("symbol")}, "Time Series (Daily)": series}
+
+    def _route_yahoo(self, segments: List[str], query: Dict[str, str]) -> Optional[Any]:
+        if segments[:3] == ["v8", "finance", "chart"] and len(segments) == 4:
+            df = synthetic_ohlcv(segments[3])
+            return {"chart": {"result": [{
+                "meta": {"symbol": segments[3]},
+                "timestamp": [int(d.timestamp()) for d in df.index],
+                "indicators": {"quote": [{
+                    "open": df["Open"].tolist(), "high": df["High"].tolist(), "low": df["Low"].tolist(),
+                    "close": df["Close"].tolist(), "volume": df["Volume"].astype(int).tolist()
+                }]}
+            }], "error": None}}
+        if segments[:3] == ["v1", "finance", "search"]:
+            symbol = query.get("q", "")
+            return {"news": [{
+                "title": item["title"], "publisher": item["site"], "link": item["url"],
+                "providerPublishTime": int(datetime.datetime.strptime(item["publishedDate"], "%Y-%m-%d %H:%M:%S").timestamp())
+            } for item in synthetic_news(symbol, int(query.get("newsCount", 5)))]}
+        if segments[:3] == ["v7", "finance", "options"] and len(segments) == 4:
+            return synthetic_option_chain(segments[3])
+        return None
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms: float = 0, error_rate: float = 0.0, disabled_tiers=(), verbose: bool = False, seed: int = 0):
+        super().__init__(address, FakeProviderHandler)
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.disabled_tiers = set(disabled_tiers)
+        self.verbose = verbose
+        self.request_count = 0
+        self.webhooks: List[Any] = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def record_webhook(self, body: Any):
+        with self._lock:
+            self.webhooks.append(body)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+
+def start_fake_server(host: str = "127.0.0.1", port: int = 0, **kwargs) -> FakeProviderServer:
+    """Starts the fake server on a daemon thread. port=0 picks a free port (see server.server_port)."""
+    server = FakeProviderServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline stand-in for all DataOrchestrator provider tiers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503")
+    parser.add_argument("--disable", default="", help=f"Comma-separated tiers to fail outright ({', '.join(TIERS)})")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeProviderServer((args.host, args.port), latency_ms=args.latency_ms, error_rate=args.error_rate,
+                                disabled_tiers=[t for t in args.disable.split(",") if t], verbose=args.verbose)
+    print(f"Fake provider server on http://{args.host}:{args.port}")
+    for key, value in fake_provider_env(args.host, args.port).items():
+        print(f"  export {key}={value}")
+    server.serve_forever()
@@ -0,0 +1,239 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# name -> (loader returning the list the matching /api endpoint serves, key of one item)
+Channel = Tuple[Callable[[], List[Dict[str, Any]]], Callable[[Dict[str, Any]], str]]
+
+
+def diff_items(old: List[Dict[str, Any]], new: List[Dict[str, Any]], key: Callable) -> Optional[Dict[str, Any]]:
+    """
+    Changes between two snapshots of a list: items added or changed, keys removed, and
+    the new key order. None if nothing changed.
+    """
+    old_by_key = {key(item): item for item in old}
+    new_keys = [key(item) for item in new]
+    upsert = [item for k, item in zip(new_keys, new) if old_by_key.get(k) != item]
+    remove = [k for k in old_by_key if k not in set(new_keys)]
+    if not upsert and not remove and new_keys == list(old_by_key):
+        return None
+    return {"upsert": upsert, "remove": remove, "order": new_keys}
+
+
+class LiveFeed:
+    """
+    Server-sent events for the shared lists (radar, market intelligence, history).
+
+    SQLAlchemy session hooks note which watched models a transaction touched, and on
+    commit touch one stamp file per channel. Every gunicorn worker runs a single watcher
+    thread that stats those files; when one changes it reloads that channel once,
+    diffs it against the last snapshot and pushes the diff to this worker's subscribers.
+    Database reads scale with writes, not with connected clients or a poll interval.
+    """
+
+    def __init__(self, app, directory: str, channels: Dict[str, Channel], poll_interval: float = 0.25,
+                 heartbeat: float = 15, max_queue: int = 100, max_streams: int = 8):
+        self.app = app
+        self.directory = directory
+        self.channels = channels
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.max_queue = max_queue
+        # Each stream holds a server thread for its whole life, so cap them below the thread count
+        self.max_streams = max_streams
+        self._streams = 0
+        self._models: Dict[type, str] = {}
+        self._snapshots: Dict[str, List[Dict[str, Any]]] = {}
+        self._stamps: Dict[str, Optional[int]] = {}
+        self._subscribers: List[queue.Queue] = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    # --- Change capture ---
+
+    def watch(self, model: type, channel: str):
+        """Commits that insert, update or delete `model` rows publish `channel`."""
+        if not self._models:
+            event.listen(Session, "after_flush", self._after_flush)
+            event.listen(Session, "do_orm_execute", self._on_execute)
+            event.listen(Session, "after_commit", self._after_commit)
+            event.listen(Session, "after_rollback", self._after_rollback)
+        self._models[model] = channel
+
+    def _mark(self, session, model: type):
+        channel = self._models.get(model)
+        if channel is not None:
+            session.info.setdefault("live_feed_channels", set()).add(channel)
+
+    def _after_flush(self, session, flush_context):
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            self._mark(session, type(obj))
+
+    def _on_execute(self, state):
+        # Bulk query.delete()/update() bypass the unit of work, so catch them here
+        if (state.is_delete or state.is_update) and state.bind_mapper is not None:
+            self._mark(state.session, state.bind_mapper.class_)
+
+    def _after_commit(self, session):
+        for channel in session.info.pop("live_feed_channels", ()):
+            self.notify(channel)
+
+    def _after_rollback(self, session):
+        session.info.pop("live_feed_channels", None)
+
+    def notify(self, channel: str):
+        """Tells every worker's watcher that `channel` changed."""
+        path = self._stamp_path(channel)
+        now = time.time_ns()
+        try:
+            with open(path, 'a'):
+                pass
+            os.utime(path, ns=(now, now))
+        except OSError as e:
+            print(f"Live feed notify failed for {channel}: {e}")
+        self._wake.set()
+
+    def _stamp_path(self, channel: str) -> str:
+        return os.path.join(self.directory, f"{channel}.stamp")
+
+    # --- Watcher ---
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True, name="live-feed")
+        # Load every channel before the first client reads its snapshots
+        self._check_all()
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            self._check_all()
+            self._wake.wait(self.poll_interval)
+
+    def _check_all(self):
+        for channel in self.channels:
+            try:
+                self._check(channel)
+            except Exception as e:
+                print(f"Live feed refresh failed for {channel}: {e}")
+
+    def _check(self, channel: str):
+        try:
+            stamp = os.stat(self._stamp_path(channel)).st_mtime_ns
+        except OSError:
+            stamp = None
+        if channel in self._snapshots and stamp == self._stamps.get(channel):
+            return
+        loader, key = self.channels[channel]
+        with self.app.app_context():
+            items = loader()
+        with self._lock:
+            changes = diff_items(self._snapshots.get(channel, []), items, key)
+            self._snapshots[channel] = items
+            self._stamps[channel] = stamp
+            if changes is not None:
+                self._publish(channel, changes)
+
+    def _publish(self, channel: str, changes: Dict[str, Any]):
+        # Caller holds the lock
+        self._sequence += 1
+        message = self._format(channel, changes, self._sequence)
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # A client that stopped reading: drop its backlog and end its stream (EventSource reconnects)
+                self._subscribers.remove(subscriber)
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+
+    @staticmethod
+    def _format(channel: str, data: Any, sequence: Optional[int] = None) -> str:
+        prefix = f"id: {sequence}\n" if sequence is not None else ""
+        return f"{prefix}event: {channel}\ndata: {json.dumps(data)}\n\n"
+
+    # --- Subscribers ---
+
+    def open_stream(self, max_seconds: float = 300) -> Optional["_Stream"]:
+        """An SSE body for one client, or None if this worker already serves max_streams."""
+        with self._lock:
+            if self._streams >= self.max_streams:
+                return None
+            self._streams += 1
+        return _Stream(self.stream(max_seconds), self._release_stream)
+
+    def _release_stream(self):
+        with self._lock:
+            self._streams -= 1
+
+    @property
+    def open_streams(self) -> int:
+        return self._streams
+
+    def stream(self, max_seconds: float = 300) -> Iterator[str]:
+        """
+        SSE text for one client: the full current lists first, then diffs as they happen,
+        with comment heartbeats. Ends after max_seconds so threads recycle; EventSource
+        reconnects on its own and receives fresh snapshots.
+        """
+        self._ensure_running()
+        subscriber = queue.Queue(maxsize=self.max_queue)
+        deadline = time.monotonic() + max_seconds
+        with self._lock:
+            self._subscribers.append(subscriber)
+            snapshots = dict(self._snapshots)
+        try:
+            yield "retry: 2000\n\n"
+            for channel, items in snapshots.items():
+                key = self.channels[channel][1]
+                yield self._format(channel, {"upsert": items, "remove": [], "order": [key(i) for i in items], "snapshot": True})
+            while time.monotonic() < deadline:
+                try:
+                    message = subscriber.get(timeout=min(self.heartbeat, max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+
+class _Stream:
+    """
+    Iterable response body that gives its stream slot back when the server closes it,
+    even if the client disconnects before the generator ever started.
+    """
+
+    def __init__(self, generator: Iterator[str], release: Callable[[], None]):
+        self._generator = generator
+        self._release = release
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._generator)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._generator.close()
+            self._release()
@@ -0,0 +1,289 @@
+"""
+Load generator for the Flask API.
+
+Drives /api/analyze, /api/sector_scout, /api/radar and /api/history with a weighted mix at a
+fixed concurrency and reports p50/p95/p99 latency, throughput and error rate per endpoint.
+
+By default it boots its own stack: fake_provider_server.py for every data tier, a scratch
+SQLite database and cache directory, and the app under gunicorn (scanner thread included),
+so results are reproducible on an offline box. Pass --url to target a server you started.
+
+    python load_test.py --workers 4 --concurrency 16 --duration 60
+    python load_test.py --mix analyze=70,radar=20,history=10 --compare loadtest_results/previous.json
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from fake_provider_server import start_fake_server, fake_provider_env
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_MIX = "analyze=50,radar=20,history=25,sector_scout=5"
+DEFAULT_TICKERS = "AAPL,MSFT,NVDA,TSLA,AMD,PLTR,COIN,META,AMZN,GOOGL"
+ENDPOINTS = {
+    "analyze": "/api/analyze",
+    "sector_scout": "/api/sector_scout",
+    "radar": "/api/radar",
+    "history": "/api/history"
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    lo = int(rank)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (rank - lo)
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    def stats(rows):
+        latencies = sorted(r["latency_ms"] for r in rows)
+        errors = sum(1 for r in rows if not r["ok"])
+        return {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(latencies[-1], 1) if latencies else 0.0
+        }
+
+    by_endpoint = {}
+    for name in sorted({s["endpoint"] for s in samples}):
+        by_endpoint[name] = stats([s for s in samples if s["endpoint"] == name])
+    return {"overall": stats(samples), "endpoints": by_endpoint}
+
+
+class LoadRunner:
+    def __init__(self, base_url: str, weights: Dict[str, float], tickers: List[str], concurrency: int,
+                 duration: float, max_requests: Optional[int], timeout: float, seed: int):
+        self.base_url = base_url.rstrip("/")
+        self.names = list(weights)
+        self.weights = [weights[n] for n in self.names]
+        self.tickers = tickers
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_requests = max_requests
+        self.timeout = timeout
+        self.seed = seed
+        self.samples = []
+        self._issued = 0
+        self._lock = threading.Lock()
+
+    def _next_slot(self) -> bool:
+        with self._lock:
+            if self.max_requests is not None and self._issued >= self.max_requests:
+                return False
+            self._issued += 1
+            return True
+
+    def _worker(self, worker_id: int, deadline: float):
+        rng = random.Random(self.seed + worker_id)
+        session = requests.Session()
+        while time.perf_counter() < deadline and self._next_slot():
+            name = rng.choices(self.names, self.weights)[0]
+            params = {"ticker": rng.choice(self.tickers)} if name == "analyze" else None
+            start = time.perf_counter()
+            try:
+                resp = session.get(self.base_url + ENDPOINTS[name], params=params, timeout=self.timeout)
+                ok, status = resp.status_code < 400, resp.status_code
+            except requests.RequestException as e:
+                ok, status = False, type(e).__name__
+            latency_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.samples.append({"endpoint": name, "latency_ms": latency_ms, "ok": ok, "status": status})
+
+    def run(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        deadline = start + self.duration
+        threads = [threading.Thread(target=self._worker, args=(i, deadline), daemon=True) for i in range(self.concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return summarize(self.samples, time.perf_counter() - start)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_ready(base_url: str, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(base_url + ENDPOINTS["history"], timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"App at {base_url} did not become ready within {timeout}s")
+
+
+def _procfile_worker_args() -> List[str]:
+    """--worker-class/--threads from the Procfile's web process, so the stack under test matches production."""
+    try:
+        with open(os.path.join(BASE_DIR, "Procfile"), "r") as f:
+            web = next(line.split(":", 1)[1] for line in f if line.startswith("web:"))
+    except (OSError, StopIteration):
+        return []
+    args = shlex.split(web)
+    picked = []
+    for flag in ("--worker-class", "--threads"):
+        if flag in args and args.index(flag) + 1 < len(args):
+            picked += [flag, args[args.index(flag) + 1]]
+    return picked
+
+
+def start_offline_stack(workers: int, provider_latency_ms: float, provider_error_rate: float, run_scanner: bool):
+    """Boots fake providers + gunicorn against a scratch DB/cache. Returns (base_url, cleanup)."""
+    provider = start_fake_server(latency_ms=provider_latency_ms, error_rate=provider_error_rate)
+    scratch = tempfile.mkdtemp(prefix="loadtest_")
+    port = _free_port()
+
+    env = dict(os.environ)
+    env.update(fake_provider_env(port=provider.server_port))
+    env.update({
+        "DATA_TRANSPORT": "live",
+        "DATA_CACHE_DIR": os.path.join(scratch, "cache"),
+        "DATABASE_URL": f"sqlite:///{os.path.join(scratch, 'hub.db')}",
+        "RUN_SCANNER": "true" if run_scanner else "false"
+    })
+    cmd = [sys.executable, "-m", "gunicorn", "main:app", "--workers", str(workers), *_procfile_worker_args(),
+           "--bind", f"127.0.0.1:{port}", "--timeout", "300", "--log-level", "warning"]
+    app = subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL)
+
+    def cleanup():
+        app.terminate()
+        try:
+            app.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            app.kill()
+        provider.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_ready(base_url)
+    except Exception:
+        cleanup()
+        raise
+    return base_url, cleanup
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    header = f"{'endpoint':<14}{'reqs':>7}{'err%':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("OVERALL", report["overall"])]
+    for name, s in rows:
+        print(f"{name:<14}{s['requests']:>7}{s['error_rate'] * 100:>6.1f}%{s['throughput_rps']:>8.1f}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+        if baseline:
+            base = baseline["overall"] if name == "OVERALL" else baseline["endpoints"].get(name)
+            if base:
+                deltas = [f"{k}: {(s[k] - base[k]) / base[k] * 100:+.1f}%" for k in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps") if base[k]]
+                print(f"{'':<14}  vs baseline -> {', '.join(deltas)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Flask API with latency percentiles.")
+    parser.add_argument("--url", help="Target an already running server instead of booting the offline stack")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--tickers", default=DEFAULT_TICKERS, help="Tickers used for /api/analyze")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=0, help="Requests per endpoint issued before measuring")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers for the offline stack")
+    parser.add_argument("--provider-latency-ms", type=float, default=50)
+    parser.add_argument("--provider-error-rate", type=float, default=0.0)
+    parser.add_argument("--no-scanner", action="store_true", help="Disable the background scanner thread")
+    parser.add_argument("--output", help="Results file (default: loadtest_results/<timestamp>_<rev>.json)")
+    parser.add_argument("--compare", help="Previous results file to diff against")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+
+    cleanup = None
+    base_url = args.url
+    if not base_url:
+        print(f"Booting offline stack ({args.workers} gunicorn workers, fake providers at {args.provider_latency_ms}ms)...")
+        base_url, cleanup = start_offline_stack(args.workers, args.provider_latency_ms, args.provider_error_rate, not args.no_scanner)
+
+    try:
+        if args.warmup:
+            print(f"Warming up ({args.warmup} requests per endpoint)...")
+            LoadRunner(base_url, {n: 1 for n in weights}, tickers, len(weights), float("inf"),
+                       args.warmup * len(weights), args.timeout, args.seed).run()
+
+        print(f"Running mix {weights} at concurrency {args.concurrency} for {args.duration}s against {base_url}")
+        report = LoadRunner(base_url, weights, tickers, args.concurrency, args.duration, args.requests, args.timeout, args.seed).run()
+    finally:
+        if cleanup:
+            cleanup()
+
+    result = {
+        "revision": _git_revision(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        **report
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(BASE_DIR, "loadtest_results", f"{datetime.datetime.now():%Y%m%d_%H%M%S}_{result['revision']}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
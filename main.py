@@ -1,13 +1,35 @@
 import os
 import re
-from flask import Flask, request, jsonify, send_from_directory
-from collaborative_models import db, SharedHistory, BullishRadar, PersonaPick, MarketIntelligence
+from flask import Flask, Response, request, jsonify, send_from_directory, g
+from collaborative_models import db, SharedHistory, BullishRadar, PersonaPick, MarketIntelligence, AlertRule, TickerScore, FiredAlert
 from analyst_engine import AnalystEngine
 from data_orchestrator import DataOrchestrator
+from screener import FeatureMatrix, ScreenerError
+from relative_strength import RelativeStrengthEngine
+from correlations import CorrelationEngine
+from market_context import MarketContextProvider
+from batch_analysis import BatchAnalyzer
+from price_panel import SharedPricePanel
+from patterns import PATTERN_KEYS
+from alerts import AlertEngine, WebhookSink, validate_condition
+from live_feed import LiveFeed
+from metrics import (REGISTRY, SCANNER_CYCLE, SCANNER_LAST_CYCLE, SCANNER_LAG, SCANNER_QUEUE,
+                     BACKGROUND_QUEUE, HTTP_LATENCY, SLOW_REQUESTS, instrument_sqlalchemy)
+from profiler import RequestProfiler
+from snapshot_store import SnapshotStore, AGGREGATIONS
+import atexit
+import hmac
+import json
 import threading
 import time
+from datetime import datetime
+from urllib.parse import urlparse
+import pandas as pd
 
 app = Flask(__name__, static_folder='.', static_url_path='')
+# With `python main.py`, ANALYSIS_PROCESSES pool processes (forkserver/spawn) re-import this file as
+# __mp_main__; they only run batch_analysis, so none of the background work below starts there
+POOL_PROCESS = __name__ == '__mp_main__'
 
 # Database Configuration
 basedir = os.path.abspath(os.path.dirname(__file__))
@@ -19,12 +41,60 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f'sqlite:
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
+instrument_sqlalchemy()
 
-with app.app_context():
-    db.create_all()
+if not POOL_PROCESS:
+    with app.app_context():
+        db.create_all()
 
-orchestrator = DataOrchestrator()
+cache_dir = os.environ.get('DATA_CACHE_DIR', 'cache')
+# One mmap-backed copy of the universe's bars shared by every worker (PRICE_PANEL_DIR=/dev/shm/... for tmpfs)
+price_panel = SharedPricePanel(os.environ.get('PRICE_PANEL_DIR', os.path.join(cache_dir, 'panel')))
+orchestrator = DataOrchestrator(cache_dir=cache_dir, price_panel=price_panel)
 engine = AnalystEngine("books_db.json")
+feature_matrix = FeatureMatrix(engine)
+rs_engine = RelativeStrengthEngine()
+correlation_engine = CorrelationEngine()
+# ANALYSIS_PROCESSES > 1 moves universe-wide analysis (sector scout) onto a process pool
+batch_analyzer = BatchAnalyzer(engine, "books_db.json", processes=int(os.environ.get('ANALYSIS_PROCESSES', 0)))
+market_context = MarketContextProvider(orchestrator, engine, refresh_seconds=int(os.environ.get('MARKET_CONTEXT_REFRESH_SECONDS', 300)))
+# Each worker writes its metrics here so one /metrics scrape sums every worker
+if not POOL_PROCESS:
+    REGISTRY.share(os.environ.get('METRICS_DIR', os.path.join(cache_dir, 'metrics')), interval=float(os.environ.get('METRICS_FLUSH_SECONDS', 5)))
+BACKGROUND_QUEUE.set_function(lambda: {
+    ("gather",): orchestrator._gather_pool._work_queue.qsize(),
+    ("revalidate",): orchestrator._revalidate_pool._work_queue.qsize()
+})
+ANALYZE_DEADLINE_SECONDS = float(os.environ.get('ANALYZE_DEADLINE_SECONDS', 15))
+SCREENER_REFRESH_SECONDS = int(os.environ.get('SCREENER_REFRESH_SECONDS', 300))
+# Alert rules fire on changed feature rows; ALERT_WEBHOOK_URL receives rules without their own URL
+alert_engine = AlertEngine(WebhookSink(os.environ.get('ALERT_WEBHOOK_URL')))
+ALERT_RULES_RELOAD_SECONDS = int(os.environ.get('ALERT_RULES_RELOAD_SECONDS', 30))
+# The evaluator also picks up scores other workers published at this interval
+ALERT_EVALUATE_SECONDS = int(os.environ.get('ALERT_EVALUATE_SECONDS', 15))
+ALERT_HISTORY_KEEP = int(os.environ.get('ALERT_HISTORY_KEEP', 1000))
+# Hosts a rule may name as its own webhook without the admin token (comma-separated)
+ALERT_WEBHOOK_HOSTS = {h.strip().lower() for h in os.environ.get('ALERT_WEBHOOK_HOSTS', '').split(',') if h.strip()}
+alert_rules_loaded_at = 0.0
+scores_seen_at = None
+# Set by analyze/scanner/refresh to have the evaluator thread run ahead of its timer
+alerts_due = threading.Event()
+# Rules are only primed once the universe's features (and RS table) are in, so a restart
+# doesn't fire every condition that already held
+analytics_ready = False
+# Append-only per-ticker analysis history (Parquet with pyarrow, .npz otherwise); the price panel writer compacts it
+snapshot_store = SnapshotStore(os.environ.get('SNAPSHOT_DIR', os.path.join(cache_dir, 'snapshots')),
+                               flush_seconds=float(os.environ.get('SNAPSHOT_FLUSH_SECONDS', 120)),
+                               retention_days=int(os.environ.get('SNAPSHOT_RETENTION_DAYS', 0)))
+if not POOL_PROCESS:
+    snapshot_store.start(compact=lambda: price_panel.is_writer)
+    atexit.register(snapshot_store.flush)
+SNAPSHOT_DEFAULT_DAYS = 30
+# A sampled fraction of these requests is profiled; slow ones keep their profile for /admin/profiles
+PROFILED_ENDPOINTS = ('analyze', 'sector_scout')
+request_profiler = RequestProfiler.from_env(PROFILED_ENDPOINTS)
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
 
 # Expanded Universe for Dynamic Discovery
 DYNAMIC_MOONSHOT_UNIVERSE = [
@@ -53,6 +123,163 @@ SECTOR_MAP = {
     "Software/SaaS": ["MSFT", "CRM", "SAP", "SNOW", "DDOG"]
 }
 
+# Tickers the autonomous scanner watches
+SCANNER_WATCHLIST = ['NVDA', 'TSLA', 'AAPL', 'MSFT', 'AMD', 'MSTR', 'COIN', 'GOOGL', 'AMZN', 'META', 'PLTR', 'IWM']
+# Scanner tickers analyzed and persisted per pool batch (one is fetched every 30s)
+SCANNER_BATCH_SIZE = int(os.environ.get('SCANNER_BATCH_SIZE', 3))
+
+def get_screener_universe():
+    """Every ticker the app tracks: sector watchlists, moonshots and the scanner list."""
+    universe = list(DYNAMIC_MOONSHOT_UNIVERSE) + SCANNER_WATCHLIST
+    for tickers in SECTOR_MAP.values():
+        universe.extend(tickers)
+    return list(dict.fromkeys(universe))
+
+def refresh_universe_analytics(force=False):
+    """
+    Pulls (mostly cached) bars for the universe and folds them into the screener,
+    RS ranking and correlation matrices; only tickers with new bars are recomputed.
+    """
+    global analytics_ready
+    if not force and time.time() - feature_matrix.last_refresh < SCREENER_REFRESH_SECONDS:
+        return 0
+    benchmark_df = market_context.get().spy_df
+    batch = orchestrator.get_many(get_screener_universe(), kinds=("price",))
+    frames = {t: r["price"] for t, r in batch.items()}
+    orchestrator.publish_price_panel(frames)
+    changed = feature_matrix.update_many(frames)
+    feature_matrix.set_extra_table(rs_engine.compute(frames, benchmark_df))
+    correlation_engine.update(frames)
+    analytics_ready = True
+    alerts_due.set()
+    return changed
+
+def sync_alert_rules():
+    """Reloads active rules from the database (other workers may have added some)."""
+    global alert_rules_loaded_at
+    rules = [r.to_dict() for r in AlertRule.query.filter_by(active=True).all()]
+    alert_engine.set_rules(rules, feature_matrix.frame)
+    alert_rules_loaded_at = time.time()
+
+def reload_alert_rules():
+    """Has the evaluator reload rules on its next pass, which it starts right away."""
+    global alert_rules_loaded_at
+    alert_rules_loaded_at = 0.0
+    alerts_due.set()
+
+def publish_score(ticker, analysis):
+    """
+    Records the ticker's master score and consensus in this worker's feature matrix and in
+    the database, where the alert evaluator (another worker, maybe) picks it up.
+    Joins the caller's transaction; the caller commits.
+    """
+    master_score = analysis.get('master_score', {}).get('value', 0)
+    bullish = "Bullish" in analysis['consensus']
+    feature_matrix.set_extra(ticker, master_score=master_score, bullish=float(bullish))
+    score = db.session.get(TickerScore, ticker)
+    if score is None:
+        db.session.add(TickerScore(ticker=ticker, master_score=master_score, bullish=bullish))
+    else:
+        score.master_score = master_score
+        score.bullish = bullish
+        score.updated_at = datetime.utcnow()
+
+def sync_ticker_scores():
+    """Pulls scores published since the last pass into this (the evaluator's) feature matrix."""
+    global scores_seen_at
+    first_pass = scores_seen_at is None
+    query = TickerScore.query if first_pass else TickerScore.query.filter(TickerScore.updated_at >= scores_seen_at)
+    known = set(feature_matrix.frame.index)
+    for score in query.all():
+        if not first_pass and score.ticker not in known:
+            # Analyzed elsewhere and outside the screener universe: its bars are in the shared cache
+            feature_matrix.update(score.ticker, orchestrator.get_stock_data(score.ticker))
+        feature_matrix.set_extra(score.ticker, master_score=score.master_score, bullish=float(score.bullish))
+        scores_seen_at = max(scores_seen_at or score.updated_at, score.updated_at)
+
+def evaluate_alerts():
+    """
+    Fires alerts for tickers whose features changed since the last pass. Only the price
+    panel writer evaluates, so one process owns rule state and alerts are not duplicated
+    per worker; other workers publish their scores through TickerScore. Fired alerts are
+    stored so /api/alerts answers the same from every worker.
+
+    Stored scores are loaded before rules are (re)primed, so rules start from what already
+    holds instead of firing for it.
+    """
+    if not price_panel.is_writer or not analytics_ready:
+        return 0
+    try:
+        sync_ticker_scores()
+        if time.time() - alert_rules_loaded_at > ALERT_RULES_RELOAD_SECONDS:
+            sync_alert_rules()
+        alerts = alert_engine.evaluate(feature_matrix)
+        if alerts:
+            db.session.add_all(FiredAlert(rule_id=a["rule_id"], name=a["name"][:100], condition=a["condition"],
+                                          ticker=a["ticker"], values=json.dumps(a["values"]), fired_at=a["fired_at"])
+                               for a in alerts)
+            db.session.flush()
+            newest = db.session.query(db.func.max(FiredAlert.id)).scalar() or 0
+            FiredAlert.query.filter(FiredAlert.id <= newest - ALERT_HISTORY_KEEP).delete()
+            db.session.commit()
+        return len(alerts)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Alert evaluation failed: {e}")
+        return 0
+
+def run_alert_evaluator():
+    """
+    Evaluates when woken by alerts_due and on a timer, so requests never wait on it and
+    scores published by other workers fire without waiting for a refresh.
+    """
+    with app.app_context():
+        while True:
+            alerts_due.wait(ALERT_EVALUATE_SECONDS)
+            alerts_due.clear()
+            if price_panel.is_writer:
+                try:
+                    # The evaluator needs the universe's features before its first pass
+                    refresh_universe_analytics()
+                except Exception as e:
+                    print(f"Alert evaluator refresh failed: {e}")
+                evaluate_alerts()
+                db.session.remove()
+
+@app.before_request
+def start_request_profile():
+    if request.endpoint in PROFILED_ENDPOINTS:
+        g.request_started = time.perf_counter()
+        g.profile_handle = request_profiler.begin(request.endpoint)
+
+@app.after_request
+def finish_request_profile(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    duration = time.perf_counter() - started
+    HTTP_LATENCY.observe(duration, request.endpoint)
+    if duration * 1000 >= request_profiler.threshold_ms:
+        SLOW_REQUESTS.inc(request.endpoint)
+    request_profiler.end(g.pop('profile_handle', None), {
+        "endpoint": request.endpoint, "path": request.path,
+        "query": request.query_string.decode(errors='replace'), "status": response.status_code
+    })
+    return response
+
+@app.teardown_request
+def release_request_profile(error=None):
+    # after_request is skipped when a view raises past the error handlers
+    handle = g.pop('profile_handle', None)
+    if handle is not None:
+        request_profiler.end(handle, {"endpoint": request.endpoint, "path": request.path,
+                                      "query": request.query_string.decode(errors='replace'), "status": 500})
+
+def admin_authorized():
+    # Header only: query strings end up in access and proxy logs
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
 @app.route('/')
 def index():
     return send_from_directory('.', 'index.html')
@@ -60,18 +287,43 @@ def index():
 @app.route('/api/analyze', methods=['GET'])
 def analyze():
     ticker = request.args.get('ticker', 'AAPL').upper().strip()
+    # ?fields=master_score,trade_plan limits the analysis; persistence always needs the summary sections
+    fields = request.args.get('fields')
+    sections = None
+    if fields:
+        sections = set(f.strip() for f in fields.split(',') if f.strip()) | set(AnalystEngine.SUMMARY_SECTIONS)
+        try:
+            engine.resolve_sections(sections)
+        except ValueError as e:
+            return jsonify({"error": str(e), "available": list(AnalystEngine.SECTION_DEPENDENCIES)}), 400
     try:
-        df = orchestrator.get_stock_data(ticker)
+        # Independent inputs are fetched concurrently; late news/options/context degrade gracefully
+        inputs, degraded = orchestrator.gather({
+            "price": lambda: orchestrator.get_stock_data(ticker),
+            "news": lambda: orchestrator.get_ticker_news(ticker),
+            "options": lambda: orchestrator.get_options_intel(ticker),
+            "context": market_context.get
+        }, timeout=ANALYZE_DEADLINE_SECONDS, defaults={"news": [], "options": {"has_options": False}})
+        
+        df = inputs["price"]
         if df is None or df.empty:
+            if "price" in degraded:
+                return jsonify({"error": f"Timed out fetching data for {ticker}"}), 504
             return jsonify({"error": f"Could not fetch data for {ticker}"}), 400
             
-        news = orchestrator.get_ticker_news(ticker)
-        options = orchestrator.get_options_intel(ticker)
-        benchmark_df = orchestrator.get_stock_data("SPY")
-        vix_df = orchestrator.get_stock_data("^VIX")
+        context = inputs["context"]
+        analysis = engine.analyze_ticker(ticker, df, inputs["news"], inputs["options"], market_context=context, sections=sections)
+        if degraded:
+            analysis['degraded_inputs'] = degraded
         
-        analysis = engine.analyze_ticker(ticker, df, news, options, benchmark_df)
-        analysis['market_climate'] = engine._analyze_market_climate(benchmark_df, vix_df)
+        # Universe-level RS rank from the last cached cross-sectional pass, if this ticker was in it
+        universe_rs = rs_engine.get(ticker)
+        if universe_rs and 'technical_indicators' in analysis:
+            analysis['technical_indicators']['relative_strength']['universe'] = universe_rs
+        
+        feature_matrix.update(ticker, df)
+        publish_score(ticker, analysis)
+        snapshot_store.record(ticker, analysis, "analyze", features=feature_matrix.row(ticker))
         
         # --- SHARED PERSISTENCE ---
         # 1. Update Global History
@@ -105,22 +357,55 @@ def analyze():
                 PersonaPick.query.filter_by(persona=persona, ticker=ticker).delete()
 
         db.session.commit()
+        alerts_due.set()
         
         return jsonify(analysis)
     except Exception as e:
         print(f"Error in analysis: {e}")
         return jsonify({"error": str(e)}), 500
 
+def load_history():
+    history = SharedHistory.query.order_by(SharedHistory.timestamp.desc()).limit(10).all()
+    return [h.to_dict() for h in history]
+
+def load_radar():
+    # Sort by master_score descending (High potential first), then timestamp
+    radar = BullishRadar.query.order_by(BullishRadar.master_score.desc(), BullishRadar.timestamp.desc()).limit(15).all()
+    return [r.to_dict() for r in radar]
+
+def load_market_intelligence():
+    leads = MarketIntelligence.query.order_by(MarketIntelligence.master_score.desc()).limit(10).all()
+    return [l.to_dict() for l in leads]
+
+# Pushes radar/intelligence/history diffs to /api/stream clients as soon as a commit touches them.
+# Every open stream pins a gthread thread: LIVE_FEED_MAX_STREAMS keeps most of --threads for REST requests
+live_feed = LiveFeed(app, os.environ.get('LIVE_FEED_DIR', os.path.join(cache_dir, 'feed')), {
+    "history": (load_history, lambda h: f"{h['ticker']}|{h['timestamp']}"),
+    "radar": (load_radar, lambda r: r['ticker']),
+    "intelligence": (load_market_intelligence, lambda l: l['ticker'])
+}, max_streams=int(os.environ.get('LIVE_FEED_MAX_STREAMS', 8)))
+live_feed.watch(SharedHistory, "history")
+live_feed.watch(BullishRadar, "radar")
+live_feed.watch(MarketIntelligence, "intelligence")
+LIVE_FEED_STREAM_SECONDS = int(os.environ.get('LIVE_FEED_STREAM_SECONDS', 300))
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """Server-sent events: 'history', 'radar' and 'intelligence' as {upsert, remove, order} diffs."""
+    body = live_feed.open_stream(LIVE_FEED_STREAM_SECONDS)
+    if body is None:
+        # Clients fall back to polling the REST endpoints
+        return jsonify({"error": "Too many live streams on this worker"}), 503, {'Retry-After': '60'}
+    return Response(body, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/history', methods=['GET'])
 def get_history():
-    history = SharedHistory.query.order_by(SharedHistory.timestamp.desc()).limit(10).all()
-    return jsonify([h.to_dict() for h in history])
+    return jsonify(load_history())
 
 @app.route('/api/radar', methods=['GET'])
 def get_radar():
-    # Sort by master_score descending (High potential first), then timestamp
-    radar = BullishRadar.query.order_by(BullishRadar.master_score.desc(), BullishRadar.timestamp.desc()).limit(15).all()
-    return jsonify([r.to_dict() for r in radar])
+    return jsonify(load_radar())
 
 @app.route('/api/persona_picks', methods=['GET'])
 def get_persona_picks():
@@ -133,48 +418,346 @@ def get_persona_picks():
 
 @app.route('/api/market_intelligence', methods=['GET'])
 def get_market_intelligence():
-    leads = MarketIntelligence.query.order_by(MarketIntelligence.master_score.desc()).limit(10).all()
-    return jsonify([l.to_dict() for l in leads])
+    return jsonify(load_market_intelligence())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text format: provider calls, cache lookups, stage/DB timings, scanner and queue gauges."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Slow sampled requests on this worker (newest first) and the profiler settings."""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({"settings": request_profiler.settings(), "profiles": request_profiler.summaries()})
+
+@app.route('/admin/profiles/<int:profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """One profile; ?format=collapsed returns folded stacks for flamegraph.pl/speedscope (sample mode)."""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        return jsonify({"error": f"Profile {profile_id} not found on this worker"}), 404
+    if request.args.get('format') == 'collapsed':
+        return Response(profile.get('collapsed') or profile.get('report', ''), mimetype='text/plain')
+    return jsonify(profile)
+
+@app.route('/api/provider_stats', methods=['GET'])
+def provider_stats():
+    """Per-host keep-alive reuse, retry and failure counts for this worker's provider transport, plus cache and frame memory."""
+    return jsonify({"mode": orchestrator.transport.mode, "hosts": orchestrator.transport.stats(),
+                    "cache": orchestrator.cache.stats(), "frames": orchestrator.memory_report()})
+
+@app.route('/api/quota', methods=['GET'])
+def quota_status():
+    """Remaining provider budget: this worker's per-minute buckets and the daily budgets shared by every worker."""
+    return jsonify(orchestrator.quota_status())
+
+@app.route('/api/screen', methods=['GET'])
+def screen():
+    """Filters the universe feature matrix, e.g. ?q=rsi < 30 and close > sma200 and rel_volume > 2"""
+    expression = request.args.get('q', '').strip()
+    if not expression:
+        return jsonify({"error": "Missing filter expression 'q'", "fields": list(feature_matrix.frame.columns)}), 400
+    sort_by = request.args.get('sort')
+    ascending = request.args.get('order', 'desc').lower() == 'asc'
+    try:
+        limit = max(1, min(int(request.args.get('limit', 50)), 500))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    try:
+        refresh_universe_analytics()
+        # Default order is by 63-day RS, when the RS table is available (the benchmark fetch can fail)
+        if sort_by is None and 'rs_63' in feature_matrix.frame.columns:
+            sort_by = 'rs_63'
+        start = time.perf_counter()
+        matches = feature_matrix.screen(expression, sort_by=sort_by, ascending=ascending, limit=limit)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    except ScreenerError as e:
+        return jsonify({"error": str(e)}), 400
+
+    matches = matches.round(2).astype(object).where(matches.notna(), None)
+    return jsonify({
+        "query": expression,
+        "universe_size": len(feature_matrix.frame),
+        "count": len(matches),
+        "elapsed_ms": round(elapsed_ms, 2),
+        "results": [{"ticker": t, **row} for t, row in matches.to_dict(orient='index').items()]
+    })
+
+@app.route('/api/patterns', methods=['GET'])
+def chart_patterns():
+    """
+    Chart-pattern occurrences. ?ticker=NVDA lists every one in the ticker's cached year of
+    bars; otherwise the universe is scanned for recent ones, e.g. ?pattern=double_bottom&within=10&confirmed=1
+    """
+    ticker = request.args.get('ticker', '').strip().upper()
+    if ticker:
+        # The price cache holds one (1y) frame per ticker, shared with analysis and the screener
+        df = orchestrator.get_stock_data(ticker)
+        if df is None or df.empty:
+            return jsonify({"error": f"No price data for {ticker}"}), 404
+        return jsonify({"ticker": ticker, "bars": len(df), "occurrences": engine.pattern_engine.scan(ticker, df)})
+
+    pattern = request.args.get('pattern', '').strip().lower()
+    if pattern and pattern not in PATTERN_KEYS:
+        return jsonify({"error": f"Unknown pattern '{pattern}'", "patterns": list(PATTERN_KEYS)}), 400
+    try:
+        within = min(int(request.args.get('within', 20)), 250)
+    except ValueError:
+        return jsonify({"error": "within must be an integer"}), 400
+    confirmed_only = request.args.get('confirmed', '0') in ('1', 'true')
+
+    start = time.perf_counter()
+    batch = orchestrator.get_many(get_screener_universe(), kinds=("price",))
+    results = []
+    for symbol, entry in batch.items():
+        for occurrence in engine.pattern_engine.recent(symbol, entry["price"], within):
+            if pattern and occurrence["name"] != PATTERN_KEYS[pattern]:
+                continue
+            if confirmed_only and not occurrence["confirmed"]:
+                continue
+            results.append({"ticker": symbol, **occurrence})
+    results.sort(key=lambda o: max(o["end"], o["confirmed_on"] or ""), reverse=True)
+    return jsonify({
+        "universe_size": len(batch),
+        "count": len(results),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        "results": results
+    })
+
+def check_webhook_url(url):
+    """
+    The server POSTs to a rule's webhook, so an arbitrary URL would let clients reach
+    internal hosts: only http(s) URLs on ALERT_WEBHOOK_HOSTS, or any with the admin token.
+    Returns an error message, or None if the URL is allowed.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return "webhook_url must be an http(s) URL"
+    if parsed.hostname.lower() not in ALERT_WEBHOOK_HOSTS and not admin_authorized():
+        return f"Webhook host '{parsed.hostname}' is not allowed (see ALERT_WEBHOOK_HOSTS, or send the admin token)"
+    return None
+
+@app.route('/api/alerts/rules', methods=['GET', 'POST'])
+def alert_rules():
+    """
+    Lists rules, or creates one from JSON {"condition": "rsi < 30", "name", "tickers": [...], "webhook_url"}.
+    Conditions use the /api/screen grammar plus master_score and bullish (1 = Bullish consensus),
+    and fire when they turn true for a ticker.
+    """
+    if request.method == 'GET':
+        return jsonify([r.to_dict() for r in AlertRule.query.order_by(AlertRule.id).all()])
+
+    data = request.get_json(silent=True) or {}
+    condition = str(data.get('condition', '')).strip()
+    if not condition:
+        return jsonify({"error": "Missing 'condition'"}), 400
+    if len(condition) > AlertRule.condition.type.length:
+        return jsonify({"error": f"condition is longer than {AlertRule.condition.type.length} characters"}), 400
+    refresh_universe_analytics()
+    try:
+        validate_condition(condition, feature_matrix.frame.columns)
+    except ScreenerError as e:
+        return jsonify({"error": str(e)}), 400
+
+    webhook_url = str(data.get('webhook_url') or '') or None
+    if webhook_url:
+        if len(webhook_url) > AlertRule.webhook_url.type.length:
+            return jsonify({"error": f"webhook_url is longer than {AlertRule.webhook_url.type.length} characters"}), 400
+        error = check_webhook_url(webhook_url)
+        if error:
+            return jsonify({"error": error}), 403
+
+    tickers = data.get('tickers') or []
+    if isinstance(tickers, str):
+        tickers = tickers.split(',')
+    tickers = ",".join(str(t).strip().upper() for t in tickers if str(t).strip())
+    if len(tickers) > AlertRule.tickers.type.length:
+        return jsonify({"error": f"tickers are longer than {AlertRule.tickers.type.length} characters in all"}), 400
+    rule = AlertRule(name=str(data.get('name') or condition)[:100], condition=condition,
+                     tickers=tickers, webhook_url=webhook_url)
+    db.session.add(rule)
+    db.session.commit()
+    reload_alert_rules()
+    return jsonify(rule.to_dict()), 201
+
+@app.route('/api/alerts/rules/<int:rule_id>', methods=['DELETE'])
+def delete_alert_rule(rule_id):
+    rule = AlertRule.query.get(rule_id)
+    if rule is None:
+        return jsonify({"error": f"No rule {rule_id}"}), 404
+    db.session.delete(rule)
+    db.session.commit()
+    reload_alert_rules()
+    return jsonify({"deleted": rule_id})
+
+@app.route('/api/alerts', methods=['GET'])
+def recent_alerts():
+    """Most recent fired alerts (newest first), plus this worker's engine and delivery counts."""
+    try:
+        limit = max(1, min(int(request.args.get('limit', 50)), 200))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    alerts = FiredAlert.query.order_by(FiredAlert.id.desc()).limit(limit).all()
+    return jsonify({"stats": {**alert_engine.stats(), "evaluator": price_panel.is_writer},
+                    "alerts": [a.to_dict() for a in alerts]})
+
+def parse_time_range():
+    """?start=/?end= as dates or ISO times (UTC); defaults to the last SNAPSHOT_DEFAULT_DAYS days."""
+    def parse(name, default):
+        value = request.args.get(name)
+        if not value:
+            return default
+        stamp = pd.Timestamp(value)
+        return stamp.tz_convert('UTC').tz_localize(None) if stamp.tzinfo else stamp
+    end = parse('end', pd.Timestamp.now(tz='UTC').tz_localize(None))
+    if request.args.get('end') and len(request.args['end']) == 10:
+        # A bare end date covers that whole day
+        end += pd.Timedelta(days=1) - pd.Timedelta(milliseconds=1)
+    return parse('start', end.normalize() - pd.Timedelta(days=SNAPSHOT_DEFAULT_DAYS)), end
+
+def snapshot_records(frame):
+    numeric = frame.columns.difference(['ts', 'ticker', 'source'])
+    frame = frame.astype({c: 'float64' for c in numeric}).round(4)
+    frame = frame.astype(object).where(frame.notna(), None)
+    records = frame.to_dict(orient='records')
+    for record in records:
+        record['time'] = pd.Timestamp(record.pop('ts'), unit='ms').isoformat()
+    return records
+
+@app.route('/api/snapshots', methods=['GET'])
+def get_snapshots():
+    """
+    Stored analysis snapshots, oldest first: ?tickers=NVDA,AMD&start=&end=&fields=master_score,rsi
+    &source=analyze|scanner|sector_scout&limit=1000 (the newest `limit` rows are kept).
+    """
+    tickers = [t.strip().upper() for t in request.args.get('tickers', request.args.get('ticker', '')).split(',') if t.strip()]
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or None
+    try:
+        limit = max(1, min(int(request.args.get('limit', 1000)), 10000))
+        start, end = parse_time_range()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid limit or time range: {e}"}), 400
+    frame = snapshot_store.query(tickers or None, start, end, fields, request.args.get('source'))
+    return jsonify({"rows": snapshot_records(frame.iloc[-limit:]), "total": len(frame),
+                    "truncated": len(frame) > limit, "start": start.isoformat(), "end": end.isoformat()})
+
+@app.route('/api/snapshots/series', methods=['GET'])
+def get_snapshot_series():
+    """
+    Downsampled history for one ticker: ?ticker=NVDA&fields=master_score&interval=1D&agg=last
+    &points=500. Without an interval the bucket is picked to fit `points`.
+    """
+    ticker = request.args.get('ticker', '').upper().strip()
+    if not ticker:
+        return jsonify({"error": "ticker is required"}), 400
+    fields = [f.strip() for f in request.args.get('fields', 'master_score').split(',') if f.strip()]
+    agg = request.args.get('agg', 'last')
+    if agg not in AGGREGATIONS:
+        return jsonify({"error": f"Unknown agg '{agg}'", "available": list(AGGREGATIONS)}), 400
+    try:
+        start, end = parse_time_range()
+        series = snapshot_store.series(ticker, fields, start, end, interval=request.args.get('interval'), agg=agg,
+                                       max_points=max(1, min(int(request.args.get('points', 500)), 5000)),
+                                       source=request.args.get('source'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    values = series.pop("values")
+    times = [t.isoformat() for t in series.pop("index")]
+    series["points"] = [{"time": t, **{f: (None if pd.isna(v) else round(float(v), 4)) for f, v in zip(fields, row)}}
+                        for t, row in zip(times, values.itertuples(index=False))]
+    return jsonify(series)
+
+@app.route('/api/correlations', methods=['GET'])
+def correlations():
+    """Data-driven clusters, crowded Bullish Radar picks and an optional sub-matrix (?tickers=A,B,C)."""
+    try:
+        threshold = float(request.args.get('threshold', 0.7))
+    except ValueError:
+        return jsonify({"error": "threshold must be a number"}), 400
+    refresh_universe_analytics()
+    if not correlation_engine.tickers:
+        return jsonify({"error": "Not enough price history to compute correlations"}), 503
+
+    radar_tickers = [r.ticker for r in BullishRadar.query.all()]
+    result = {
+        "as_of": correlation_engine.as_of,
+        "window": correlation_engine.window,
+        "universe_size": len(correlation_engine.tickers),
+        "clusters": [c for c in correlation_engine.clusters(threshold) if len(c) > 1],
+        "crowded_radar_picks": correlation_engine.crowded_pairs(radar_tickers, max(threshold, 0.8))
+    }
+
+    requested = [t.strip().upper() for t in request.args.get('tickers', '').split(',') if t.strip()]
+    if requested:
+        corr = correlation_engine.correlation()
+        present = [t for t in requested if t in corr.index]
+        result["matrix"] = {
+            "tickers": present,
+            "values": corr.loc[present, present].astype(float).round(3).to_numpy().tolist()
+        }
+    return jsonify(result)
 
 @app.route('/api/sector_scout', methods=['GET'])
 def sector_scout():
     """Ranks leaders within each sector using full 'Consulting the Greats' Logic."""
     results = {}
-    benchmark_df = orchestrator.get_stock_data("SPY")
-    for sector, tickers in SECTOR_MAP.items():
-        current_watchlist = DYNAMIC_MOONSHOT_UNIVERSE if sector == "Next-Gen Moonshots" else tickers
+    watchlists = {
+        sector: DYNAMIC_MOONSHOT_UNIVERSE if sector == "Next-Gen Moonshots" else tickers
+        for sector, tickers in SECTOR_MAP.items()
+    }
+
+    # Batch-fetch prices and news for the whole universe up front
+    universe = [t for watchlist in watchlists.values() for t in watchlist]
+    batch = orchestrator.get_many(universe, kinds=("price", "news"))
+    context = market_context.get()
+    # RS ranks come from the shared screener-universe table, so ratings don't depend on which endpoint ran last
+    refresh_universe_analytics()
+
+    # Analyze each distinct ticker once (sectors overlap), in worker processes when enabled
+    items = []
+    for ticker in dict.fromkeys(universe):
+        df = batch[ticker]["price"]
+        if df is not None and not df.empty:
+            # Upgrade: Attempting light news/options fetch for better scoring if time permits
+            items.append((ticker, df, batch[ticker]["news"], orchestrator.get_options_intel(ticker)))
+    analyses = batch_analyzer.analyze_many(items, market_context=context, sections=AnalystEngine.SUMMARY_SECTIONS)
+    analyses = {item[0]: analysis for item, analysis in zip(items, analyses)}
+    for ticker, analysis in analyses.items():
+        snapshot_store.record(ticker, analysis, "sector_scout", features=feature_matrix.row(ticker))
+
+    for sector, current_watchlist in watchlists.items():
         sector_results = []
         for ticker in current_watchlist:
-            try:
-                df = orchestrator.get_stock_data(ticker)
-                if df is not None and not df.empty:
-                    # Upgrade: Attempting light news/options fetch for better scoring if time permits
-                    # We limit news to 1 item to be fast
-                    news = orchestrator.get_ticker_news(ticker) 
-                    options = orchestrator.get_options_intel(ticker)
-                    
-                    analysis = engine.analyze_ticker(ticker, df, news, options, benchmark_df)
-                    
-                    # Extract top persona rating
-                    top_rating = "Neutral"
-                    for _, res in analysis.get('personas', {}).items():
-                        if "Strong Buy" in res['rating']:
-                            top_rating = "Strong Buy"
-                            break
-                        elif "Buy" in res['rating'] and top_rating != "Strong Buy":
-                            top_rating = "Buy"
-                            
-                    sector_results.append({
-                        "ticker": ticker,
-                        "score": analysis.get('master_score', {}).get('value', 0),
-                        "label": analysis.get('master_score', {}).get('label', 'Neutral'),
-                        "price": analysis.get('current_price', 0),
-                        "consensus": analysis.get('consensus', 'Neutral'),
-                        "top_rating": top_rating
-                    })
-            except Exception as e:
-                print(f"Scout error on {ticker}: {e}")
+            analysis = analyses.get(ticker)
+            if not analysis:
                 continue
+            if 'error' in analysis:
+                print(f"Scout error on {ticker}: {analysis['error']}")
+                continue
+
+            # Extract top persona rating
+            top_rating = "Neutral"
+            for _, res in analysis.get('personas', {}).items():
+                if "Strong Buy" in res['rating']:
+                    top_rating = "Strong Buy"
+                    break
+                elif "Buy" in res['rating'] and top_rating != "Strong Buy":
+                    top_rating = "Buy"
+                    
+            sector_results.append({
+                "ticker": ticker,
+                "score": analysis.get('master_score', {}).get('value', 0),
+                "label": analysis.get('master_score', {}).get('label', 'Neutral'),
+                "price": analysis.get('current_price', 0),
+                "consensus": analysis.get('consensus', 'Neutral'),
+                "top_rating": top_rating,
+                "rs_rating": (rs_engine.get(ticker) or {}).get('rs_rating')
+            })
         # Sort by score descending and take top 5
         sector_results.sort(key=lambda x: x['score'], reverse=True)
         results[sector] = sector_results[:5]
@@ -182,18 +765,96 @@ def sector_scout():
 
 
 # --- AUTONOMOUS SCANNER ENGINE ---
+def scan_batch(items):
+    """
+    Analyzes scanner inputs as one batch (worker processes when ANALYSIS_PROCESSES > 1) and
+    persists each lead. If the batch itself fails, each ticker is retried on its own.
+    """
+    if not items:
+        return
+    sections = AnalystEngine.SUMMARY_SECTIONS + ("trade_plan",)
+    context = None
+    try:
+        context = market_context.get()
+        analyses = batch_analyzer.analyze_many(items, market_context=context, sections=sections)
+    except Exception as e:
+        print(f"Scanner batch analysis failed, retrying per ticker: {e}")
+        analyses = []
+        for item in items:
+            try:
+                analyses.extend(batch_analyzer.analyze_many([item], market_context=context, sections=sections))
+            except Exception as e:
+                analyses.append({"ticker": item[0], "error": str(e)})
+
+    for (ticker, df, _, _), analysis in zip(items, analyses):
+        try:
+            if 'error' in analysis:
+                print(f"Scanner error on {ticker}: {analysis['error']}")
+                continue
+            feature_matrix.update(ticker, df)
+            publish_score(ticker, analysis)
+            snapshot_store.record(ticker, analysis, "scanner", features=feature_matrix.row(ticker))
+            
+            existing = MarketIntelligence.query.filter_by(ticker=ticker).first()
+            if "Bullish" in analysis['consensus'] or "Strong" in analysis['consensus']:
+                score = analysis.get('master_score', {}).get('value', 0)
+                potential = analysis.get('trade_plan', {}).get('target', 'N/A')
+                
+                if existing:
+                    existing.consensus = analysis['consensus']
+                    existing.master_score = score
+                    existing.potential_gain = potential
+                    existing.timestamp = db.func.now()
+                else:
+                    new_lead = MarketIntelligence(
+                        ticker=ticker,
+                        consensus=analysis['consensus'],
+                        master_score=score,
+                        potential_gain=potential
+                    )
+                    db.session.add(new_lead)
+                print(f"AI Detected Advantage: {ticker} (Score: {score})")
+            elif existing:
+                db.session.delete(existing)
+            db.session.commit()
+            alerts_due.set()
+                    
+        except Exception as e:
+            db.session.rollback()
+            if "no such column" in str(e).lower() or "undefined_column" in str(e).lower():
+                print(f"CRITICAL: Database out of sync! Please run: heroku pg:reset DATABASE_URL --confirm {os.environ.get('HEROKU_APP_NAME')}")
+            print(f"Scanner error on {ticker}: {e}")
+
 def run_autonomous_scanner():
     """Background thread to proactively find opportunities."""
     # List of high-impact tickers to scan
-    watchlist = ['NVDA', 'TSLA', 'AAPL', 'MSFT', 'AMD', 'MSTR', 'COIN', 'GOOGL', 'AMZN', 'META', 'PLTR', 'IWM']
+    watchlist = SCANNER_WATCHLIST
     
     print("Autonomous Intelligence: Engine initialized, waiting 10s for server boot...")
     time.sleep(10) # Safety delay for Gunicorn workers
     
+    last_cycle_end = time.time()
+    SCANNER_LAG.set_function(lambda: time.time() - last_cycle_end)
+
     with app.app_context():
         print("Autonomous Market Intelligence Scanner: LIVE")
         while True:
-            for ticker in watchlist:
+            cycle_start = time.time()
+            SCANNER_QUEUE.set(len(watchlist))
+            # Warm the price/news cache for the whole watchlist in a few batched calls;
+            # on a low provider budget skip news and slow the cycle so user requests keep their quota
+            quota_low = orchestrator.quota_low()
+            try:
+                orchestrator.get_many(watchlist, kinds=("price",) if quota_low else ("price", "news"))
+                refresh_universe_analytics()
+            except Exception as e:
+                print(f"Scanner batch prefetch failed: {e}")
+
+            # Gather inputs for tickers due a re-scan, pacing provider calls; every SCANNER_BATCH_SIZE
+            # tickers go through the analysis pool so early leads are not held back by the rest
+            items = []
+            for position, ticker in enumerate(watchlist):
+                SCANNER_QUEUE.set(len(watchlist) - position)
                 try:
                     # Check if recently updated 
                     existing = MarketIntelligence.query.filter_by(ticker=ticker).first()
@@ -205,45 +866,28 @@ def run_autonomous_scanner():
                     if df is None or df.empty:
                         continue
                         
-                    news = orchestrator.get_ticker_news(ticker)
-                    options = orchestrator.get_options_intel(ticker)
-                    benchmark_df = orchestrator.get_stock_data("SPY")
-                    analysis = engine.analyze_ticker(ticker, df, news, options, benchmark_df)
-                    
-                    if "Bullish" in analysis['consensus'] or "Strong" in analysis['consensus']:
-                        score = analysis.get('master_score', {}).get('value', 0)
-                        potential = analysis.get('trade_plan', {}).get('target', 'N/A')
-                        
-                        if existing:
-                            existing.consensus = analysis['consensus']
-                            existing.master_score = score
-                            existing.potential_gain = potential
-                            existing.timestamp = db.func.now()
-                        else:
-                            new_lead = MarketIntelligence(
-                                ticker=ticker,
-                                consensus=analysis['consensus'],
-                                master_score=score,
-                                potential_gain=potential
-                            )
-                            db.session.add(new_lead)
-                        db.session.commit()
-                        print(f"AI Detected Advantage: {ticker} (Score: {score})")
-                    else:
-                        if existing:
-                            db.session.delete(existing)
-                            db.session.commit()
-                            
+                    items.append((ticker, df, orchestrator.get_ticker_news(ticker), orchestrator.get_options_intel(ticker)))
                 except Exception as e:
-                    if "no such column" in str(e).lower() or "undefined_column" in str(e).lower():
-                        print(f"CRITICAL: Database out of sync! Please run: heroku pg:reset DATABASE_URL --confirm {os.environ.get('HEROKU_APP_NAME')}")
                     print(f"Scanner error on {ticker}: {e}")
-                
+
+                if len(items) >= SCANNER_BATCH_SIZE:
+                    scan_batch(items)
+                    items = []
                 time.sleep(30)
-            time.sleep(600)
+            scan_batch(items)
+
+            last_cycle_end = time.time()
+            SCANNER_QUEUE.set(0)
+            SCANNER_CYCLE.observe(last_cycle_end - cycle_start)
+            SCANNER_LAST_CYCLE.set(last_cycle_end)
+            time.sleep(1800 if quota_low else 600)
+
+# Every worker runs the timer; only the price panel writer evaluates
+if not POOL_PROCESS:
+    threading.Thread(target=run_alert_evaluator, daemon=True, name="alert-evaluator").start()
 
 # Start Background Scanner if not in testing/shell
-if os.environ.get('RUN_SCANNER', 'true').lower() == 'true':
+if os.environ.get('RUN_SCANNER', 'true').lower() == 'true' and not POOL_PROCESS:
     scanner_thread = threading.Thread(target=run_autonomous_scanner, daemon=True)
     scanner_thread.start()
 
@@ -0,0 +1,68 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+BENCHMARK = "SPY"
+VOLATILITY_INDEX = "^VIX"
+BENCHMARK_RETURN_HORIZONS = {"1d": 1, "1w": 5, "1m": 21, "3m": 63}
+
+
+class MarketContext:
+    """Market-wide inputs shared by every analysis in a refresh window."""
+
+    def __init__(self, spy_df: pd.DataFrame, vix_df: pd.DataFrame, climate: Dict[str, Any],
+                 benchmark_returns: Dict[str, float], computed_at: float):
+        self.spy_df = spy_df
+        self.vix_df = vix_df
+        self.climate = climate
+        self.benchmark_returns = benchmark_returns
+        self.computed_at = computed_at
+
+
+class MarketContextProvider:
+    """
+    Builds the MarketContext (SPY + VIX frames, climate verdict, benchmark returns)
+    at most once per refresh window per process; concurrent callers share one build.
+    """
+
+    def __init__(self, orchestrator, engine, refresh_seconds: int = 300):
+        self.orchestrator = orchestrator
+        self.engine = engine
+        self.refresh_seconds = refresh_seconds
+        self._context: Optional[MarketContext] = None
+        self._lock = threading.Lock()
+
+    def get(self, force_refresh: bool = False) -> MarketContext:
+        context = self._context
+        if not force_refresh and context and time.time() - context.computed_at < self.refresh_seconds:
+            return context
+
+        with self._lock:
+            # Another thread may have rebuilt it while we waited
+            context = self._context
+            if not force_refresh and context and time.time() - context.computed_at < self.refresh_seconds:
+                return context
+            self._context = self._build()
+            return self._context
+
+    def _build(self) -> MarketContext:
+        # Own small pool: this often runs inside an orchestrator.gather task, and nesting
+        # on the shared pool could starve it under load
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            spy_future = pool.submit(self.orchestrator.get_stock_data, BENCHMARK)
+            vix_future = pool.submit(self.orchestrator.get_stock_data, VOLATILITY_INDEX)
+            spy_df, vix_df = spy_future.result(), vix_future.result()
+        climate = self.engine._analyze_market_climate(spy_df, vix_df)
+        return MarketContext(spy_df, vix_df, climate, self._benchmark_returns(spy_df), time.time())
+
+    def _benchmark_returns(self, spy_df: pd.DataFrame) -> Dict[str, float]:
+        if spy_df is None or spy_df.empty:
+            return {}
+        close = spy_df['Close']
+        return {
+            label: round((float(close.iloc[-1]) / float(close.iloc[-1 - n]) - 1) * 100, 2)
+            for label, n in BENCHMARK_RETURN_HORIZONS.items() if len(close) > n
+        }
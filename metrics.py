@@ -0,0 +1,370 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# fcntl is POSIX-only; elsewhere folding dead workers' files is unlocked
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Counters and histograms of exited workers, folded together so their files can be deleted
+AGGREGATE_NAME = "metrics.aggregate.json"
+
+# Seconds; provider calls, analysis stages and DB statements all fit this range
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metric:
+    """One metric family. Children are keyed by their label values, in `labels` order."""
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            values = [[list(k), v if not isinstance(v, list) else list(v)] for k, v in self._values.items()]
+        return {"kind": self.kind, "help": self.help, "labels": list(self.labels), "values": values}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Set directly, or computed at scrape time by a function returning a value or {label tuple: value}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._function: Optional[Callable[[], Any]] = None
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = float(value)
+
+    def set_function(self, function: Callable[[], Any]):
+        self._function = function
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self._function is not None:
+            try:
+                result = self._function()
+                values = result.items() if isinstance(result, dict) else [((), result)]
+                with self._lock:
+                    self._values = {tuple(k): float(v) for k, v in values}
+            except Exception as e:
+                print(f"Metric {self.name} callback failed: {e}")
+        return super().snapshot()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        # Per-bucket (non-cumulative) counts, then sum and count
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**super().snapshot(), "buckets": list(self.buckets)}
+
+
+class Registry:
+    """
+    Metrics of this process, rendered in Prometheus text format. With share(), every
+    process also writes its snapshot to a common directory every few seconds, and
+    render(shared=True) merges them so one scrape covers every gunicorn worker:
+    counters and histograms are summed (including exited workers, so totals never go
+    backwards); gauges are reported per live worker with a pid label. A dead worker's
+    file is folded into one aggregate file and deleted, so the directory does not grow
+    with every restart and a reused pid cannot overwrite totals that were not merged yet.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._directory: Optional[str] = None
+        self._thread = None
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    # --- Cross-process sharing ---
+
+    def share(self, directory: str, interval: float = 5.0):
+        """Starts writing this process's snapshot to `directory` every `interval` seconds."""
+        self._directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # A file under our pid belongs to an exited process that had the same pid
+        own = self._snapshot_path(os.getpid())
+        if os.path.exists(own):
+            self._fold([own])
+        if self._thread is None:
+            def run():
+                while True:
+                    time.sleep(interval)
+                    self.flush()
+            self._thread = threading.Thread(target=run, daemon=True, name="metrics-flush")
+            self._thread.start()
+
+    def flush(self):
+        if self._directory is None:
+            return
+        path = self._snapshot_path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Metrics flush failed: {e}")
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self._directory, f"metrics.{pid}.json")
+
+    def _shared_snapshots(self) -> List[Tuple[int, bool, Dict[str, Any]]]:
+        snapshots = []
+        dead = []
+        for name in os.listdir(self._directory):
+            parts = name.split(".")
+            if len(parts) != 3 or parts[0] != "metrics" or parts[2] != "json" or not parts[1].isdigit():
+                continue
+            pid = int(parts[1])
+            if not _alive(pid):
+                dead.append(os.path.join(self._directory, name))
+                continue
+            snapshot = _load(os.path.join(self._directory, name))
+            if snapshot is not None:
+                snapshots.append((pid, True, snapshot))
+        if dead:
+            self._fold(dead)
+        aggregate = _load(os.path.join(self._directory, AGGREGATE_NAME))
+        if aggregate is not None:
+            snapshots.append((0, False, aggregate))
+        return snapshots
+
+    def _fold(self, paths: List[str]):
+        """Adds the counters and histograms in `paths` to the aggregate file, then deletes them."""
+        lock_fd = os.open(os.path.join(self._directory, "aggregate.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            aggregate_path = os.path.join(self._directory, AGGREGATE_NAME)
+            merged: Dict[str, Any] = {}
+            sources = [_load(aggregate_path)] + [_load(p) for p in paths]
+            for snapshot in sources:
+                if snapshot is not None:
+                    _merge(merged, snapshot, pid=None, alive=False)
+            tmp_path = f"{aggregate_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(_unmerge(merged), f)
+            os.replace(tmp_path, aggregate_path)
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        except OSError as e:
+            print(f"Metrics fold failed: {e}")
+        finally:
+            os.close(lock_fd)
+
+    # --- Rendering ---
+
+    def render(self, shared: bool = True) -> str:
+        if not shared or self._directory is None:
+            return _render(self.snapshot())
+        self.flush()
+        merged: Dict[str, Any] = {}
+        for pid, alive, snapshot in self._shared_snapshots():
+            _merge(merged, snapshot, pid, alive)
+        for family in merged.values():
+            if family["kind"] == "gauge":
+                family["labels"] = family["labels"] + ["pid"]
+        return _render(_unmerge(merged))
+
+
+def _load(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(merged: Dict[str, Any], snapshot: Dict[str, Any], pid: Optional[int], alive: bool):
+    """Sums counters and histograms into `merged` (values keyed by label tuple); gauges only from live pids."""
+    for name, family in snapshot.items():
+        target = merged.setdefault(name, {**family, "values": {}})
+        if isinstance(target["values"], list):
+            target["values"] = {tuple(k): v for k, v in target["values"]}
+        for labels, value in family["values"]:
+            if family["kind"] == "gauge":
+                if alive:
+                    target["values"][tuple(labels) + (str(pid),)] = value
+                continue
+            key = tuple(labels)
+            current = target["values"].get(key)
+            target["values"][key] = value if current is None else (
+                [a + b for a, b in zip(current, value)] if isinstance(value, list) else current + value)
+
+
+def _unmerge(merged: Dict[str, Any]) -> Dict[str, Any]:
+    """Back to the snapshot layout: values as [labels, value] pairs."""
+    return {name: {**family, "values": [[list(k), v] for k, v in family["values"].items()]}
+            for name, family in merged.items()}
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: List[str], values: List[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _render(snapshot: Dict[str, Any]) -> str:
+    lines = []
+    for name, family in snapshot.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        names = family["labels"]
+        for labels, value in family["values"]:
+            if family["kind"] != "histogram":
+                lines.append(f"{name}{_labels(names, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(family["buckets"], value):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{name}_bucket{_labels(names, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{name}_bucket{_labels(names, labels, le)} {value[-1]}")
+            lines.append(f"{name}_sum{_labels(names, labels)} {value[-2]}")
+            lines.append(f"{name}_count{_labels(names, labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Catalogue ---
+
+PROVIDER_REQUESTS = REGISTRY.counter(
+    "provider_requests_total", "Provider API calls by outcome (ok/error)", ("provider", "endpoint", "outcome"))
+PROVIDER_LATENCY = REGISTRY.histogram(
+    "provider_request_seconds", "Provider API call latency, retries included", ("provider", "endpoint"))
+CACHE_LOOKUPS = REGISTRY.counter(
+    "cache_lookups_total", "Data cache lookups by result (hit/stale/miss)", ("kind", "result"))
+STAGE_LATENCY = REGISTRY.histogram(
+    "analysis_stage_seconds", "AnalystEngine section evaluation time", ("stage",))
+SCANNER_CYCLE = REGISTRY.histogram(
+    "scanner_cycle_seconds", "Duration of one autonomous scanner pass over its watchlist",
+    buckets=(10, 30, 60, 120, 300, 600, 900, 1800, 3600))
+SCANNER_LAST_CYCLE = REGISTRY.gauge(
+    "scanner_last_cycle_end_timestamp_seconds", "Unix time the last scanner pass finished")
+SCANNER_LAG = REGISTRY.gauge(
+    "scanner_lag_seconds", "Seconds since the last scanner pass finished")
+SCANNER_QUEUE = REGISTRY.gauge(
+    "scanner_queue_depth", "Tickers left in the current scanner pass")
+BACKGROUND_QUEUE = REGISTRY.gauge(
+    "background_queue_depth", "Queued tasks per background pool", ("pool",))
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_seconds", "Latency of profiled API endpoints", ("endpoint",))
+SLOW_REQUESTS = REGISTRY.counter(
+    "slow_requests_total", "Profiled API requests over PROFILE_THRESHOLD_MS", ("endpoint",))
+DB_LATENCY = REGISTRY.histogram(
+    "db_statement_seconds", "Database statement execution time", ("operation",))
+
+
+@contextmanager
+def provider_call(provider: str, endpoint: str) -> Iterator[None]:
+    """Times one provider call and counts it as ok, or error if it raises."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        PROVIDER_LATENCY.observe(time.perf_counter() - start, provider, endpoint)
+        PROVIDER_REQUESTS.inc(provider, endpoint, outcome)
+
+
+def instrument_sqlalchemy():
+    """Times every statement on every SQLAlchemy engine, labelled by its first keyword."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_start")
+        if starts:
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+            DB_LATENCY.observe(time.perf_counter() - starts.pop(), operation)
+
+    def failed(context):
+        starts = context.connection.info.get("metrics_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    event.listen(Engine, "before_cursor_execute", before)
+    event.listen(Engine, "after_cursor_execute", after)
+    event.listen(Engine, "handle_error", failed)
@@ -0,0 +1,81 @@
+import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close']
+OHLCV_COLUMNS = OHLC_COLUMNS + ['Volume']
+# Calendar days kept for each yfinance-style period; "max" (or unknown) keeps everything
+PERIOD_DAYS = {"5d": 7, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 365, "2y": 730, "5y": 1826, "10y": 3653}
+# float32 is used for OHLC only if no price moves by more than this (well under a cent)
+FLOAT32_PRICE_TOLERANCE = 0.0005
+
+
+def normalize_ohlcv(df: Optional[pd.DataFrame], period: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Ingest schema for every price tier: OHLCV columns only, numeric, sorted unique
+    tz-naive DatetimeIndex named Date, trimmed to `period`, float32 OHLC when the
+    prices survive the cast, and uint32 volume when it fits (int64 otherwise).
+    """
+    if df is None or df.empty:
+        return df
+    missing = [c for c in OHLCV_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Price frame missing columns: {missing}")
+
+    index = pd.DatetimeIndex(pd.to_datetime(df.index))
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    out = pd.DataFrame({c: pd.to_numeric(df[c], errors="coerce").to_numpy() for c in OHLCV_COLUMNS}, index=index)
+    out = out[~out.index.duplicated(keep="last")].sort_index()
+    out = out[out['Close'].notna()]
+
+    if period == "ytd":
+        out = out[out.index >= datetime.datetime(datetime.datetime.now().year, 1, 1)]
+    elif period in PERIOD_DAYS:
+        out = out[out.index >= datetime.datetime.now() - datetime.timedelta(days=PERIOD_DAYS[period])]
+
+    prices = out[OHLC_COLUMNS].to_numpy(dtype="float64")
+    narrow = prices.astype("float32")
+    with np.errstate(invalid="ignore"):
+        error = np.nanmax(np.abs(narrow - prices)) if prices.size else 0.0
+    price_dtype = "float32" if not error > FLOAT32_PRICE_TOLERANCE else "float64"
+
+    volume = np.round(out['Volume'].fillna(0).to_numpy(dtype="float64"))
+    volume_dtype = "uint32" if volume.size and volume.min() >= 0 and volume.max() < 2 ** 32 else "int64"
+
+    columns = {c: (narrow[:, i] if price_dtype == "float32" else prices[:, i]) for i, c in enumerate(OHLC_COLUMNS)}
+    columns['Volume'] = volume.astype(volume_dtype)
+    result = pd.DataFrame(columns, index=out.index)
+    result.index.name = 'Date'
+    return result
+
+
+def widen_ohlcv(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """
+    float64/int64 view of a compact frame for analysis and serialization. float32 prices
+    are widened through their shortest decimal form, so 123.46 stays 123.46 rather than
+    becoming 123.4599990845; unsigned volume becomes int64 so differences can go negative.
+    Frames that are already wide are returned as-is.
+    """
+    if df is None or df.empty:
+        return df
+    narrow_prices = [c for c in OHLC_COLUMNS if c in df.columns and df[c].dtype == np.float32]
+    narrow_volume = 'Volume' in df.columns and pd.api.types.is_unsigned_integer_dtype(df['Volume'])
+    if not narrow_prices and not narrow_volume:
+        return df
+
+    wide = df.copy()
+    for c in narrow_prices:
+        wide[c] = df[c].to_numpy().astype(str).astype("float64")
+    if narrow_volume:
+        wide['Volume'] = df['Volume'].astype("int64")
+    return wide
+
+
+def frame_memory(df: Optional[pd.DataFrame]) -> Dict[str, Any]:
+    """Rows and bytes (data + index) held by a price frame."""
+    if df is None:
+        return {"rows": 0, "bytes": 0}
+    return {"rows": len(df), "bytes": int(df.memory_usage(index=True, deep=True).sum())}
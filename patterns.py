@@ -0,0 +1,261 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Bars on each side a swing high/low must dominate
+SWING_ORDER = 5
+# Double tops/bottoms and shoulders: how close the twin extremes must be
+TWIN_TOLERANCE = 0.03
+SHOULDER_TOLERANCE = 0.10
+# Minimum pullback between twin peaks, and head prominence over the shoulders
+MIN_DEPTH = 0.05
+MIN_HEAD_PROMINENCE = 0.03
+# Cup depth band and maximum handle retracement of the cup
+CUP_DEPTH = (0.12, 0.40)
+MAX_HANDLE_RETRACE = 0.5
+MIN_CUP_BARS = 30
+# Flags: a POLE_BARS move of at least POLE_MIN_MOVE, then FLAG_BARS of tight consolidation
+POLE_BARS = 10
+POLE_MIN_MOVE = 0.12
+FLAG_BARS = 8
+MAX_FLAG_RETRACE = 0.5
+# An occurrence ending (or confirming) this many bars before the last bar is "current"
+RECENT_BARS = 20
+
+PATTERN_INFO = {
+    "Double Top": ("Bearish", "Rejected twice at major resistance. High supply zone."),
+    "Double Bottom": ("Bullish", "Verified support at major level. Momentum is shifting up."),
+    "Head and Shoulders": ("Bearish", "Lower high after a climactic peak. Distribution under way."),
+    "Inverse Head and Shoulders": ("Bullish", "Higher low after a capitulation low. Accumulation under way."),
+    "Cup and Handle": ("Breakout Potential", "Deep accumulation bowl detected. Consolidation handle forming."),
+    "Bull Flag": ("Bullish", "Sharp advance followed by a tight pause. Continuation setup."),
+    "Bear Flag": ("Bearish", "Sharp decline followed by a weak bounce. Continuation lower likely."),
+}
+PATTERN_KEYS = {name.lower().replace(" ", "_"): name for name in PATTERN_INFO}
+
+
+def find_swings(high: np.ndarray, low: np.ndarray, order: int = SWING_ORDER) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bar indices of swing highs and lows over the whole series: a bar whose high (low) is
+    the extreme of the 2*order+1 bars around it. Ties go to the first bar of a plateau.
+    The last `order` bars cannot be swings yet, since their right side is unknown.
+    """
+    n = len(high)
+    if n < 2 * order + 1:
+        return np.array([], dtype=int), np.array([], dtype=int)
+    high_windows = sliding_window_view(high, 2 * order + 1)
+    low_windows = sliding_window_view(low, 2 * order + 1)
+    centre_high = high[order:n - order]
+    centre_low = low[order:n - order]
+    is_high = (centre_high >= high_windows.max(axis=1)) & (centre_high > high_windows[:, :order].max(axis=1))
+    is_low = (centre_low <= low_windows.min(axis=1)) & (centre_low < low_windows[:, :order].min(axis=1))
+    return np.nonzero(is_high)[0] + order, np.nonzero(is_low)[0] + order
+
+
+def alternating_pivots(high: np.ndarray, low: np.ndarray, order: int = SWING_ORDER) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Swing points merged into one high/low/high... sequence: (bar index, kind +1/-1, price).
+    Consecutive swings of the same kind collapse to the most extreme one.
+    """
+    highs, lows = find_swings(high, low, order)
+    index = np.concatenate([highs, lows])
+    kind = np.concatenate([np.ones(len(highs), dtype=int), -np.ones(len(lows), dtype=int)])
+    price = np.concatenate([high[highs], low[lows]])
+    if not len(index):
+        return index, kind, price
+
+    sort = np.lexsort((kind, index))
+    index, kind, price = index[sort], kind[sort], price[sort]
+    run = np.cumsum(np.r_[True, kind[1:] != kind[:-1]])
+    # Highest high / lowest low of each run (kind * price is maximal for both)
+    keep = pd.Series(kind * price).groupby(run).idxmax().to_numpy()
+    return index[keep], kind[keep], price[keep]
+
+
+class PatternEngine:
+    """
+    Finds chart-pattern occurrences over a ticker's full history from its swing points.
+    Tops are matched on the pivot sequence; bottoms reuse the same rules on the mirrored
+    (negated) series. Results are cached per ticker until its last bar changes.
+    """
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[tuple, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def scan(self, ticker: Optional[str], df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Every occurrence in `df`, oldest first. Cached by ticker and last bar when a ticker is given."""
+        if df is None or len(df) < 2 * SWING_ORDER + 3:
+            return []
+        key = (len(df), df.index[-1], float(df['Close'].iloc[-1]))
+        if ticker:
+            with self._lock:
+                cached = self._cache.get(ticker)
+                if cached is not None and cached[0] == key:
+                    self._cache.move_to_end(ticker)
+                    return cached[1]
+
+        occurrences = self._detect(df)
+        if ticker:
+            with self._lock:
+                self._cache[ticker] = (key, occurrences)
+                self._cache.move_to_end(ticker)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return occurrences
+
+    def recent(self, ticker: Optional[str], df: pd.DataFrame, within: int = RECENT_BARS) -> List[Dict[str, Any]]:
+        """Occurrences that ended or confirmed within the last `within` bars, newest first."""
+        if df is None or df.empty:
+            return []
+        cutoff = df.index[max(0, len(df) - 1 - within)].strftime('%Y-%m-%d')
+        current = [o for o in self.scan(ticker, df) if max(o["end"], o["confirmed_on"] or "") >= cutoff]
+        return sorted(current, key=lambda o: max(o["end"], o["confirmed_on"] or ""), reverse=True)
+
+    def _detect(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        high = df['High'].to_numpy(dtype='float64')
+        low = df['Low'].to_numpy(dtype='float64')
+        close = df['Close'].to_numpy(dtype='float64')
+        dates = df.index.strftime('%Y-%m-%d')
+
+        index, kind, price = alternating_pivots(high, low)
+        found = []
+        # sign +1 finds tops on the raw series, -1 finds bottoms on the mirrored one
+        for sign, twin, hs in ((1, "Double Top", "Head and Shoulders"), (-1, "Double Bottom", "Inverse Head and Shoulders")):
+            found += self._double(index, sign * kind, sign * price, sign * close, sign, twin)
+            found += self._head_and_shoulders(index, sign * kind, sign * price, sign * close, sign, hs)
+        found += self._cup_and_handle(index, kind, price, close)
+        found += self._flags(high, low, close, 1, "Bull Flag")
+        found += self._flags(-low, -high, -close, -1, "Bear Flag")
+
+        occurrences = []
+        for name, points, level, start, end, confirm in found:
+            status, description = PATTERN_INFO[name]
+            occurrences.append({
+                "name": name,
+                "status": status,
+                "description": description,
+                "start": dates[start],
+                "end": dates[end],
+                "confirmed": confirm is not None,
+                "confirmed_on": dates[confirm] if confirm is not None else None,
+                "level": round(float(level), 2),
+                "points": [{"date": dates[i], "price": round(float(p), 2)} for i, p in points]
+            })
+        return sorted(occurrences, key=lambda o: (o["start"], o["name"]))
+
+    def _confirm(self, close: np.ndarray, after: int, level, invalid: float) -> Optional[int]:
+        """
+        First bar after `after` whose close breaks below `level` (scalar or per-bar array),
+        unless a close above `invalid` comes first. Works on mirrored series too.
+        """
+        closes = close[after + 1:]
+        if not len(closes):
+            return None
+        levels = level[after + 1:] if isinstance(level, np.ndarray) else level
+        broke = np.nonzero(closes < levels)[0]
+        failed = np.nonzero(closes > invalid)[0]
+        if not len(broke) or (len(failed) and failed[0] < broke[0]):
+            return None
+        return after + 1 + int(broke[0])
+
+    def _double(self, index, kind, price, close, sign, name) -> List[tuple]:
+        if len(index) < 3:
+            return []
+        p0, p1, p2 = price[:-2], price[1:-1], price[2:]
+        peak = np.maximum(p0, p2)
+        valley_ref = np.minimum(p0, p2)
+        candidates = np.nonzero(
+            (kind[:-2] == 1)
+            & (np.abs(p0 - p2) <= TWIN_TOLERANCE * np.abs(peak))
+            & (valley_ref - p1 >= MIN_DEPTH * np.abs(p1))
+            & (index[2:] - index[:-2] >= 2 * SWING_ORDER)
+        )[0]
+        found = []
+        for k in candidates:
+            neckline = p1[k]
+            confirm = self._confirm(close, index[k + 2], neckline, peak[k] + TWIN_TOLERANCE * abs(peak[k]))
+            points = [(index[k + j], sign * price[k + j]) for j in range(3)]
+            found.append((name, points, sign * neckline, index[k], index[k + 2], confirm))
+        return found
+
+    def _head_and_shoulders(self, index, kind, price, close, sign, name) -> List[tuple]:
+        if len(index) < 5:
+            return []
+        ls, n1, head, n2, rs = (price[j:len(price) - 4 + j] for j in range(5))
+        shoulders = np.maximum(ls, rs)
+        candidates = np.nonzero(
+            (kind[:-4] == 1)
+            & (head - shoulders >= MIN_HEAD_PROMINENCE * np.abs(head))
+            & (np.abs(ls - rs) <= SHOULDER_TOLERANCE * np.abs(shoulders))
+            & (np.minimum(ls, rs) > np.maximum(n1, n2))
+        )[0]
+        found = []
+        bars = np.arange(len(close))
+        for k in candidates:
+            i1, i3 = index[k + 1], index[k + 3]
+            # Neckline through the two troughs, extended to every later bar
+            slope = (n2[k] - n1[k]) / (i3 - i1)
+            neckline = n1[k] + slope * (bars - i1)
+            confirm = self._confirm(close, index[k + 4], neckline, head[k])
+            points = [(index[k + j], sign * price[k + j]) for j in range(5)]
+            found.append((name, points, sign * neckline[index[k + 4]], index[k], index[k + 4], confirm))
+        return found
+
+    def _cup_and_handle(self, index, kind, price, close) -> List[tuple]:
+        if len(index) < 4:
+            return []
+        rim1, bottom, rim2, handle = (price[j:len(price) - 3 + j] for j in range(4))
+        rim = np.minimum(rim1, rim2)
+        depth = (rim - bottom) / rim
+        candidates = np.nonzero(
+            (kind[:-3] == 1)
+            & (np.abs(rim1 - rim2) <= 0.05 * np.maximum(rim1, rim2))
+            & (depth >= CUP_DEPTH[0]) & (depth <= CUP_DEPTH[1])
+            & (index[2:-1] - index[:-3] >= MIN_CUP_BARS)
+            & (rim2 - handle <= MAX_HANDLE_RETRACE * (rim2 - bottom))
+            & (index[3:] - index[2:-1] <= (index[2:-1] - index[:-3]) / 2)
+        )[0]
+        found = []
+        for k in candidates:
+            # Breakout: first close above the right rim, unless the handle low is lost first
+            confirm = self._confirm(-close, index[k + 3], -rim2[k], -handle[k])
+            points = [(index[k + j], price[k + j]) for j in range(4)]
+            found.append(("Cup and Handle", points, rim2[k], index[k], index[k + 3], confirm))
+        return found
+
+    def _flags(self, high, low, close, sign, name) -> List[tuple]:
+        """Bull flags on the raw series; bear flags on the mirrored one (high/low swapped and negated)."""
+        n = len(close)
+        if n < POLE_BARS + FLAG_BARS + 2:
+            return []
+        pole_end = np.arange(POLE_BARS, n - FLAG_BARS)
+        pole_start_close = close[pole_end - POLE_BARS]
+        pole_move = close[pole_end] - pole_start_close
+        # Max high / min low of the FLAG_BARS following each pole end
+        flag_high = sliding_window_view(high, FLAG_BARS).max(axis=1)[pole_end + 1]
+        flag_low = sliding_window_view(low, FLAG_BARS).min(axis=1)[pole_end + 1]
+        candidate = (
+            (pole_move >= POLE_MIN_MOVE * np.abs(pole_start_close))
+            & (flag_high <= close[pole_end] + 0.02 * np.abs(close[pole_end]))
+            & (close[pole_end] - flag_low <= MAX_FLAG_RETRACE * pole_move)
+        )
+        hits = np.nonzero(candidate)[0]
+        if not len(hits):
+            return []
+        # Overlapping hits describe one flag: keep the strongest pole per run of consecutive bars
+        runs = np.split(hits, np.nonzero(np.diff(hits) > 1)[0] + 1)
+        found = []
+        for run in runs:
+            k = run[np.argmax(pole_move[run])]
+            end = pole_end[k] + FLAG_BARS
+            confirm = self._confirm(-close, end, -flag_high[k], -flag_low[k])
+            start = pole_end[k] - POLE_BARS
+            points = [(start, sign * pole_start_close[k]), (pole_end[k], sign * close[pole_end[k]])]
+            found.append((name, points, sign * flag_high[k], start, end, confirm))
+        return found
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# fcntl is POSIX-only; elsewhere every process may publish
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close']
+MANIFEST_NAME = "panel.json"
+KEEP_GENERATIONS = 2
+
+
+class SharedPricePanel:
+    """
+    Price bars for the whole universe in a few memory-mapped .npy files that every
+    gunicorn worker maps read-only, so the hot universe lives once in the page cache
+    instead of once per process.
+
+    Layout (one generation): dates.<gen>.npy int64 epoch-ns, prices.<gen>.npy (4 x rows,
+    one contiguous row per OHLC field) and volume.<gen>.npy; each ticker owns
+    a [start, stop) slice. panel.json names the live generation and is swapped atomically,
+    so readers never see a half-written panel. One process (holder of writer.lock)
+    publishes; everyone else only reads.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._manifest_mtime = None
+        self._generation = None
+        self._slices: Dict[str, List[float]] = {}
+        self._dates = None
+        self._prices = None
+        self._volume = None
+        self._writer_fd = None
+        self._published_signature = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def is_writer(self) -> bool:
+        """Claims the writer role on first call; only one process ever holds it."""
+        if self._writer_fd is not None:
+            return True
+        if fcntl is None:
+            self._writer_fd = -1
+            return True
+        fd = os.open(os.path.join(self.directory, "writer.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._writer_fd = fd
+        return True
+
+    def publish(self, frames: Dict[str, pd.DataFrame], fetched_at: Dict[str, float]) -> int:
+        """Writes a new generation holding every non-empty frame. Returns the ticker count."""
+        frames = {t: df for t, df in frames.items() if df is not None and not df.empty}
+        if not frames:
+            return 0
+        signature = {t: (len(df), fetched_at.get(t)) for t, df in frames.items()}
+        if signature == self._published_signature:
+            return 0
+
+        generation = time.time_ns()
+        total = sum(len(df) for df in frames.values())
+        # The narrowest dtypes every frame shares, so compact frames stay compact
+        price_dtype = np.result_type(*(df[field].dtype for df in frames.values() for field in PRICE_FIELDS))
+        volume_dtype = np.result_type(*(df['Volume'].dtype for df in frames.values()))
+
+        dates = np.lib.format.open_memmap(self._path("dates", generation), mode="w+", dtype="int64", shape=(total,))
+        prices = np.lib.format.open_memmap(self._path("prices", generation), mode="w+", dtype=price_dtype, shape=(len(PRICE_FIELDS), total))
+        volume = np.lib.format.open_memmap(self._path("volume", generation), mode="w+", dtype=volume_dtype, shape=(total,))
+
+        slices = {}
+        start = 0
+        for ticker, df in frames.items():
+            stop = start + len(df)
+            dates[start:stop] = df.index.values.astype('datetime64[ns]').view('int64')
+            prices[:, start:stop] = df[PRICE_FIELDS].to_numpy(dtype=price_dtype).T
+            volume[start:stop] = df['Volume'].to_numpy()
+            slices[ticker] = [start, stop, fetched_at.get(ticker, time.time())]
+            start = stop
+        for array in (dates, prices, volume):
+            array.flush()
+        del dates, prices, volume
+
+        manifest = {"generation": generation, "written_at": time.time(), "tickers": slices}
+        tmp_path = os.path.join(self.directory, f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(self.directory, MANIFEST_NAME))
+        self._prune(generation)
+        self._published_signature = signature
+        return len(slices)
+
+    def get(self, ticker: str, not_before: float = 0.0) -> Optional[pd.DataFrame]:
+        """
+        Zero-copy frame for `ticker`, or None if it is not in the panel or its bars were
+        fetched before `not_before` (e.g. the mtime of a newer cache file).
+        """
+        with self._lock:
+            self._refresh_mapping()
+            entry = self._slices.get(ticker)
+            if entry is None or entry[2] < not_before:
+                return None
+            start, stop = int(entry[0]), int(entry[1])
+            dates, prices, volume = self._dates, self._prices, self._volume
+
+        index = pd.DatetimeIndex(dates[start:stop].view('datetime64[ns]'))
+        columns = {field: prices[i, start:stop] for i, field in enumerate(PRICE_FIELDS)}
+        columns['Volume'] = volume[start:stop]
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    @property
+    def tickers(self) -> List[str]:
+        with self._lock:
+            self._refresh_mapping()
+            return list(self._slices)
+
+    def _refresh_mapping(self):
+        """Remaps when the manifest changed; a stat per call keeps readers current."""
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        try:
+            mtime = os.stat(manifest_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            generation = manifest["generation"]
+            if generation != self._generation:
+                self._dates = np.load(self._path("dates", generation), mmap_mode="r")
+                self._prices = np.load(self._path("prices", generation), mmap_mode="r")
+                self._volume = np.load(self._path("volume", generation), mmap_mode="r")
+                self._generation = generation
+            self._slices = manifest["tickers"]
+            self._manifest_mtime = mtime
+        except Exception as e:
+            print(f"Price panel reload failed: {e}")
+
+    def _path(self, name: str, generation: int) -> str:
+        return os.path.join(self.directory, f"{name}.{generation}.npy")
+
+    def _prune(self, current: int):
+        # Keep the previous generation too: a reader may have just read the old manifest
+        generations = set()
+        for name in os.listdir(self.directory):
+            parts = name.split(".")
+            if len(parts) == 3 and parts[2] == "npy" and parts[1].isdigit():
+                generations.add(int(parts[1]))
+        for generation in sorted(generations)[:-KEEP_GENERATIONS]:
+            if generation == current:
+                continue
+            for name in ("dates", "prices", "volume"):
+                try:
+                    os.remove(self._path(name, generation))
+                except OSError:
+                    pass
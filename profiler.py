@@ -0,0 +1,214 @@
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+# Innermost frames kept per sampled stack
+MAX_STACK_DEPTH = 48
+
+
+class StackSampler:
+    """
+    One background thread that snapshots the stacks of registered threads every
+    `interval` seconds via sys._current_frames(). Cost is paid by the sampler, not by
+    the request, and only while at least one thread is registered.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self._targets: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id: int) -> Counter:
+        stacks = Counter()
+        with self._lock:
+            self._targets[thread_id] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="stack-sampler")
+                self._thread.start()
+        self._wake.set()
+        return stacks
+
+    def stop(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                targets = dict(self._targets)
+            if not targets:
+                self._wake.clear()
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            for thread_id, stacks in targets.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks[_stack_key(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+def _stack_key(frame) -> str:
+    """Collapsed stack, outermost first: 'main.py:analyze;analyst_engine.py:analyze_ticker;...:123' (leaf line)."""
+    parts = []
+    leaf = True
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        name = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        parts.append(f"{name}:{frame.f_lineno}" if leaf else name)
+        leaf = False
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class RequestProfiler:
+    """
+    Captures profiles of slow requests on selected endpoints.
+
+    A `sample_rate` fraction of matching requests is instrumented (at most
+    `max_concurrent` at once); when one takes longer than `threshold_ms` its profile is
+    kept in a ring of the last `keep` slow requests. mode "sample" collects stacks of
+    the request thread every `interval_ms` (cheap, safe under load); mode "cprofile"
+    records every call (exact, but slows the request, so one at a time).
+    """
+
+    def __init__(self, endpoints, threshold_ms: float = 2000, sample_rate: float = 0.1, keep: int = 20,
+                 mode: str = "sample", interval_ms: float = 10, max_concurrent: int = 2):
+        if mode not in ("sample", "cprofile"):
+            raise ValueError(f"Unknown profiler mode '{mode}'")
+        self.endpoints = set(endpoints)
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.max_concurrent = 1 if mode == "cprofile" else max_concurrent
+        self.sampler = StackSampler(interval_ms / 1000)
+        self.profiles = deque(maxlen=keep)
+        self.instrumented = 0
+        self.captured = 0
+        self._active = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, endpoints) -> "RequestProfiler":
+        """PROFILE_THRESHOLD_MS, PROFILE_SAMPLE_RATE, PROFILE_KEEP, PROFILE_MODE, PROFILE_INTERVAL_MS, PROFILE_MAX_CONCURRENT."""
+        return cls(endpoints,
+                   threshold_ms=float(os.getenv("PROFILE_THRESHOLD_MS", 2000)),
+                   sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", 0.1)),
+                   keep=int(os.getenv("PROFILE_KEEP", 20)),
+                   mode=os.getenv("PROFILE_MODE", "sample"),
+                   interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", 10)),
+                   max_concurrent=int(os.getenv("PROFILE_MAX_CONCURRENT", 2)))
+
+    def begin(self, endpoint: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Starts profiling the current request if it is selected; returns a handle for end()."""
+        if endpoint not in self.endpoints or self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        with self._lock:
+            if self._active >= self.max_concurrent:
+                return None
+            self._active += 1
+            self.instrumented += 1
+
+        handle = {"start": time.perf_counter(), "started_at": time.time(), "thread": threading.get_ident()}
+        if self.mode == "cprofile":
+            handle["profile"] = cProfile.Profile()
+            handle["profile"].enable()
+        else:
+            self.sampler.start(handle["thread"])
+        return handle
+
+    def end(self, handle: Optional[Dict[str, Any]], request_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Stops profiling; keeps and returns the profile if the request was slow."""
+        if handle is None:
+            return None
+        duration_ms = (time.perf_counter() - handle["start"]) * 1000
+        if self.mode == "cprofile":
+            handle["profile"].disable()
+        else:
+            stacks = self.sampler.stop(handle["thread"])
+        with self._lock:
+            self._active -= 1
+        if duration_ms < self.threshold_ms:
+            return None
+
+        record = {
+            "id": next(self._ids),
+            "started_at": handle["started_at"],
+            "duration_ms": round(duration_ms, 1),
+            "mode": self.mode,
+            "pid": os.getpid(),
+            **request_info
+        }
+        if self.mode == "cprofile":
+            record.update(_summarize_cprofile(handle["profile"]))
+        else:
+            record.update(_summarize_stacks(stacks))
+        with self._lock:
+            self.profiles.append(record)
+            self.captured += 1
+        return record
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Recent slow requests without their profile bodies, newest first."""
+        with self._lock:
+            profiles = list(self.profiles)
+        keys = ("id", "started_at", "duration_ms", "mode", "pid", "endpoint", "path", "query", "status", "samples")
+        return [{k: p.get(k) for k in keys} for p in reversed(profiles)]
+
+    def get(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((p for p in self.profiles if p["id"] == profile_id), None)
+
+    def settings(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "endpoints": sorted(self.endpoints), "threshold_ms": self.threshold_ms, "sample_rate": self.sample_rate,
+                "mode": self.mode, "interval_ms": self.sampler.interval * 1000, "max_concurrent": self.max_concurrent,
+                "keep": self.profiles.maxlen, "instrumented": self.instrumented, "captured": self.captured
+            }
+
+
+def _summarize_stacks(stacks: Counter, top: int = 30) -> Dict[str, Any]:
+    """Self/total sample counts per function plus collapsed stacks (flamegraph.pl / speedscope input)."""
+    total = sum(stacks.values())
+    self_counts = Counter()
+    total_counts = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        self_counts[frames[-1].rsplit(":", 1)[0]] += count
+        for name in set(f if i < len(frames) - 1 else f.rsplit(":", 1)[0] for i, f in enumerate(frames)):
+            total_counts[name] += count
+    # Hottest first by own samples; wrappers with no self time rank by their inclusive count
+    ranked = sorted(total_counts.items(), key=lambda kv: (self_counts.get(kv[0], 0), kv[1]), reverse=True)[:top]
+    functions = [{"function": name, "self": self_counts.get(name, 0), "total": count,
+                  "total_pct": round(100 * count / total, 1) if total else 0.0}
+                 for name, count in ranked]
+    return {
+        "samples": total,
+        "functions": functions,
+        "hot_lines": [{"frame": s.rsplit(";", 1)[-1], "samples": c} for s, c in stacks.most_common(10)],
+        "collapsed": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+    }
+
+
+def _summarize_cprofile(profile: cProfile.Profile, top: int = 40) -> Dict[str, Any]:
+    out = io.StringIO()
+    stats = pstats.Stats(profile, stream=out)
+    stats.sort_stats("cumulative").print_stats(top)
+    functions = []
+    for (filename, line, name), (cc, nc, tt, ct, _) in sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:top]:
+        functions.append({"function": f"{os.path.basename(filename)}:{name}:{line}", "calls": nc,
+                          "self_ms": round(tt * 1000, 2), "total_ms": round(ct * 1000, 2)})
+    return {"samples": None, "functions": functions, "report": out.getvalue()}
@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# fcntl is POSIX-only; elsewhere workers update the daily ledger unlocked
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Free-plan limits. Keys are a provider or "provider:endpoint class"; a call must fit
+# every bucket that applies to it. Twelve Data counts one credit per symbol.
+DEFAULT_QUOTAS = {
+    "fmp": {"per_minute": 300, "per_day": 250},
+    "fmp:news": {"per_day": 100},
+    "twelve_data": {"per_minute": 8, "per_day": 800},
+    "alpha_vantage": {"per_minute": 5, "per_day": 25},
+}
+WINDOWS = {"per_minute": 60, "per_day": 86400}
+LEDGER_NAME = "daily_usage.json"
+# UTC days of usage kept in the ledger
+LEDGER_KEEP_DAYS = 7
+
+
+class TokenBucket:
+    """Holds up to `capacity` tokens, refilled continuously over `period` seconds."""
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float, now: float) -> float:
+        """Seconds until `cost` tokens are available (inf if it can never fit)."""
+        self._refill(now)
+        if cost > self.capacity:
+            return float("inf")
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+
+class DailyLedger:
+    """
+    Provider calls spent per quota key and UTC day, in one JSON file every worker shares,
+    so per_day limits hold across workers, restarts and deploys. Updates read, check and
+    rewrite the file under an exclusive flock.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, LEDGER_NAME)
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _read(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def used(self) -> Dict[str, float]:
+        """Today's usage per key."""
+        return self._read().get(self.today(), {})
+
+    def spend(self, limits: List[Tuple[str, float]], cost: float) -> bool:
+        """Adds `cost` to every (key, limit) if all of them still fit today; False otherwise."""
+        lock_fd = os.open(os.path.join(self.directory, "ledger.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            data = self._read()
+            day = self.today()
+            used = data.setdefault(day, {})
+            if any(used.get(key, 0) + cost > limit for key, limit in limits):
+                return False
+            for key, _ in limits:
+                used[key] = used.get(key, 0) + cost
+            data = {d: data[d] for d in sorted(data)[-LEDGER_KEEP_DAYS:]}
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            return True
+        finally:
+            os.close(lock_fd)
+
+
+class QuotaManager:
+    """
+    Token buckets per provider key and endpoint class. acquire() spends budget before a
+    provider call: a short wait for the per-minute bucket is queued, anything longer
+    returns False so the caller can reroute to the next tier or serve cached data.
+
+    Per-minute buckets are per process, so each gunicorn worker gets 1/workers of them.
+    With a `directory`, per_day limits are counted per UTC day in a DailyLedger shared by
+    every worker and kept across restarts; without one they are per-process buckets too.
+    """
+
+    def __init__(self, quotas: Optional[Dict[str, Dict[str, float]]] = None, workers: int = 1,
+                 max_wait: float = 2.0, low_watermark: float = 0.2, directory: Optional[str] = None):
+        self.quotas = quotas if quotas is not None else DEFAULT_QUOTAS
+        self.max_wait = max_wait
+        self.low_watermark = low_watermark
+        self.ledger = DailyLedger(directory) if directory else None
+        # key -> per_day limit, when counted in the ledger
+        self._daily: Dict[str, float] = {
+            key: limits["per_day"] for key, limits in self.quotas.items() if self.ledger and "per_day" in limits
+        }
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {
+            key: {window: TokenBucket(max(1.0, limit / max(1, workers)), WINDOWS[window])
+                  for window, limit in limits.items() if not (window == "per_day" and key in self._daily)}
+            for key, limits in self.quotas.items()
+        }
+        self._denied: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, directory: Optional[str] = None) -> "QuotaManager":
+        """
+        PROVIDER_QUOTAS (JSON, merged over the defaults), QUOTA_MAX_WAIT_SECONDS,
+        WEB_CONCURRENCY (gunicorn workers sharing the keys) and QUOTA_DIR (daily ledger,
+        overriding `directory`).
+        """
+        quotas = {key: dict(limits) for key, limits in DEFAULT_QUOTAS.items()}
+        try:
+            for key, limits in json.loads(os.getenv("PROVIDER_QUOTAS", "{}")).items():
+                quotas.setdefault(key, {}).update(limits)
+        except ValueError as e:
+            print(f"Ignoring invalid PROVIDER_QUOTAS: {e}")
+        return cls(quotas, workers=int(os.getenv("WEB_CONCURRENCY", 1)),
+                   max_wait=float(os.getenv("QUOTA_MAX_WAIT_SECONDS", 2.0)),
+                   directory=os.getenv("QUOTA_DIR", directory))
+
+    def _applicable(self, provider: str, endpoint: str) -> List[TokenBucket]:
+        buckets = []
+        for key in (provider, f"{provider}:{endpoint}"):
+            buckets.extend(self._buckets.get(key, {}).values())
+        return buckets
+
+    def _daily_limits(self, provider: str, endpoint: str) -> List[Tuple[str, float]]:
+        return [(key, self._daily[key]) for key in (provider, f"{provider}:{endpoint}") if key in self._daily]
+
+    def _daily_fits(self, provider: str, endpoint: str, cost: float) -> bool:
+        limits = self._daily_limits(provider, endpoint)
+        if not limits:
+            return True
+        used = self.ledger.used()
+        return all(used.get(key, 0) + cost <= limit for key, limit in limits)
+
+    def acquire(self, provider: str, endpoint: str, cost: float = 1, max_wait: Optional[float] = None) -> bool:
+        """Spends `cost` from every applicable bucket, waiting up to max_wait. False means over budget."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        while True:
+            with self._lock:
+                buckets = self._applicable(provider, endpoint)
+                now = time.monotonic()
+                wait = max((b.wait_time(cost, now) for b in buckets), default=0.0)
+                if wait == 0.0:
+                    daily = self._daily_limits(provider, endpoint)
+                    if not daily or self.ledger.spend(daily, cost):
+                        for bucket in buckets:
+                            bucket.tokens -= cost
+                        return True
+                    # Today's budget is spent; it only comes back at the next UTC midnight
+                    denied = True
+                else:
+                    denied = wait > max_wait or not self._daily_fits(provider, endpoint, cost)
+                if denied:
+                    key = f"{provider}:{endpoint}"
+                    self._denied[key] = self._denied.get(key, 0) + 1
+                    return False
+            time.sleep(wait)
+            max_wait -= wait
+
+    def available(self, provider: str, endpoint: str = "price", cost: float = 1) -> bool:
+        """True if a call could be made now or within max_wait, without spending anything."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max((b.wait_time(cost, now) for b in self._applicable(provider, endpoint)), default=0.0)
+            return wait <= self.max_wait and self._daily_fits(provider, endpoint, cost)
+
+    def max_cost(self, provider: str, endpoint: str) -> float:
+        """Largest single call the buckets can ever admit, e.g. to size multi-symbol batches."""
+        with self._lock:
+            capacities = [b.capacity for b in self._applicable(provider, endpoint)]
+            capacities.extend(limit for _, limit in self._daily_limits(provider, endpoint))
+            return min(capacities, default=float("inf"))
+
+    def exhausted(self, providers: Iterable[str], endpoint: str = "price") -> bool:
+        """True if none of `providers` can take a call: time to lean on cached data."""
+        providers = list(providers)
+        return bool(providers) and not any(self.available(p, endpoint) for p in providers)
+
+    def remaining(self, key: str) -> Optional[float]:
+        """Smallest remaining fraction across a key's buckets and daily limit (None if unmetered)."""
+        with self._lock:
+            buckets = self._buckets.get(key) or {}
+            if not buckets and key not in self._daily:
+                return None
+            now = time.monotonic()
+            for bucket in buckets.values():
+                bucket._refill(now)
+            fractions = [b.tokens / b.capacity for b in buckets.values()]
+            if key in self._daily:
+                fractions.append(max(0.0, 1 - self.ledger.used().get(key, 0) / self._daily[key]))
+            return min(fractions)
+
+    def is_low(self, providers: Iterable[str]) -> bool:
+        """True if every metered provider in `providers` is below the low watermark."""
+        fractions = [f for f in (self.remaining(p) for p in providers) if f is not None]
+        return bool(fractions) and all(f < self.low_watermark for f in fractions)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Remaining/capacity per bucket plus how many calls were turned away per provider:endpoint."""
+        with self._lock:
+            now = time.monotonic()
+            used = self.ledger.used() if self.ledger else {}
+            buckets = {}
+            for key, windows in self._buckets.items():
+                buckets[key] = {}
+                for window, bucket in windows.items():
+                    bucket._refill(now)
+                    buckets[key][window] = {"remaining": round(bucket.tokens, 1), "capacity": round(bucket.capacity, 1)}
+                if key in self._daily:
+                    limit = self._daily[key]
+                    buckets[key]["per_day"] = {"remaining": round(max(0.0, limit - used.get(key, 0)), 1),
+                                               "capacity": round(limit, 1), "shared": True}
+            return {"buckets": buckets, "denied": dict(self._denied)}
@@ -0,0 +1,110 @@
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+RS_HORIZONS = (21, 63, 126, 252)
+# Composite weighting double-counts the most recent quarter, IBD-style
+RS_WEIGHTS = {21: 0.2, 63: 0.4, 126: 0.2, 252: 0.2}
+RS_LINE_LOOKBACK = 252
+# A 1y frame holds ~250 bars, short of 252: horizons with at least this share of their
+# bars are measured from the first bar instead of being dropped
+RS_MIN_COVERAGE = 0.95
+
+
+class RelativeStrengthEngine:
+    """
+    Cross-sectional relative strength vs a benchmark for a whole universe at once.
+    All closes are aligned with the benchmark on one date index, and every horizon,
+    percentile and RS-line high is computed as array operations over that panel.
+    The ranked table is cached until any input frame gains a bar.
+    """
+
+    def __init__(self):
+        self._table: Optional[pd.DataFrame] = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _signature_of(self, frames: Dict[str, pd.DataFrame], benchmark_df: pd.DataFrame) -> tuple:
+        bars = tuple(sorted((t, len(df), df.index[-1]) for t, df in frames.items() if df is not None and not df.empty))
+        return (len(benchmark_df), benchmark_df.index[-1], bars)
+
+    def compute(self, frames: Dict[str, pd.DataFrame], benchmark_df: pd.DataFrame) -> pd.DataFrame:
+        """Returns the ranked RS table (index: ticker), recomputing only if a bar changed."""
+        if benchmark_df is None or benchmark_df.empty:
+            return pd.DataFrame()
+
+        signature = self._signature_of(frames, benchmark_df)
+        with self._lock:
+            if signature == self._signature and self._table is not None:
+                return self._table
+
+        table = self._rank(frames, benchmark_df)
+        with self._lock:
+            self._table = table
+            self._signature = signature
+        return table
+
+    def _rank(self, frames: Dict[str, pd.DataFrame], benchmark_df: pd.DataFrame) -> pd.DataFrame:
+        closes = {t: df['Close'] for t, df in frames.items() if df is not None and not df.empty}
+        if not closes:
+            return pd.DataFrame()
+
+        # Panel of closes on the benchmark's trading days (dates x tickers)
+        bench = benchmark_df['Close'].astype('float64')
+        # Short forward-fill bridges halts and holiday mismatches without inventing history
+        panel = pd.concat(closes, axis=1).reindex(bench.index).astype('float64').ffill(limit=5)
+        prices = panel.to_numpy()
+        bench_prices = bench.to_numpy()
+        last = prices[-1]
+
+        table = pd.DataFrame(index=panel.columns)
+        table.index.name = "ticker"
+        composite = np.zeros(len(panel.columns))
+        weight_total = np.zeros(len(panel.columns))
+
+        for h in RS_HORIZONS:
+            if len(bench_prices) < h * RS_MIN_COVERAGE:
+                table[f"rs_{h}"] = np.nan
+                table[f"rs_{h}_pct"] = np.nan
+                continue
+            # Same window as AnalystEngine._calculate_relative_strength: iloc[-1] vs iloc[-h]
+            back = min(h, len(bench_prices))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ticker_perf = last / prices[-back] - 1
+            bench_perf = bench_prices[-1] / bench_prices[-back] - 1
+            rs = np.round((ticker_perf - bench_perf) * 100, 1)
+            table[f"rs_{h}"] = rs
+
+            pct = table[f"rs_{h}"].rank(pct=True) * 100
+            table[f"rs_{h}_pct"] = pct.round(1)
+            valid = ~np.isnan(pct.to_numpy())
+            composite += np.where(valid, pct.to_numpy() * RS_WEIGHTS[h], 0)
+            weight_total += np.where(valid, RS_WEIGHTS[h], 0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table["rs_rating"] = np.round(composite / weight_total, 1)
+
+        # RS line (ticker / benchmark) at a new high over the lookback window
+        rs_line = prices[-RS_LINE_LOOKBACK:] / bench_prices[-RS_LINE_LOOKBACK:, None]
+        with np.errstate(invalid="ignore"):
+            line_max = np.nanmax(np.where(np.isnan(rs_line), -np.inf, rs_line), axis=0)
+            table["rs_line_new_high"] = (rs_line[-1] >= line_max) & ~np.isnan(rs_line[-1])
+
+        table = table.sort_values("rs_rating", ascending=False, na_position="last")
+        table["rs_rank"] = np.arange(1, len(table) + 1)
+        return table
+
+    @property
+    def table(self) -> Optional[pd.DataFrame]:
+        return self._table
+
+    def get(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Cached RS row for one ticker, or None if it was not in the last computation."""
+        table = self._table
+        if table is None or ticker not in table.index:
+            return None
+        row = table.loc[ticker]
+        return {k: (None if isinstance(v, float) and np.isnan(v) else v.item() if hasattr(v, "item") else v)
+                for k, v in row.items()}
@@ -0,0 +1,289 @@
+import ast
+import operator
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from events import price_events, bars_since
+from ohlcv import widen_ohlcv
+
+
+class ScreenerError(ValueError):
+    """Raised for filter expressions the screener cannot compile."""
+
+
+def compute_features(engine, df: pd.DataFrame) -> Optional[Dict[str, float]]:
+    """
+    Reduces one ticker's price frame to the last-bar values of every indicator
+    AnalystEngine reports, using the engine's own calculations.
+    Relative strength is cross-sectional and is attached from RelativeStrengthEngine instead.
+    VPA/squeeze events are reduced to bars_since_<event> (e.g. bars_since_squeeze_fired <= 5).
+    """
+    if df is None or df.empty or len(df) < 50:
+        return None
+
+    df = widen_ohlcv(df)
+    close = df['Close']
+    current = float(close.iloc[-1])
+    volume = df['Volume']
+
+    sma20 = close.rolling(20).mean()
+    sma50 = close.rolling(50).mean().iloc[-1]
+    sma200 = close.rolling(200).mean().iloc[-1]
+    ema20 = close.ewm(span=20, adjust=False).mean().iloc[-1]
+    high_52w = df['High'].tail(252).max()
+    low_52w = df['Low'].tail(252).min()
+
+    typical = (df['High'] + df['Low'] + close) / 3
+    vwap = float((typical * volume).sum() / volume.sum()) if volume.sum() else np.nan
+    atr = float(engine._calculate_atr(df))
+    events = price_events(df)
+    squeeze = engine._calculate_squeeze(df, events)
+    macd = engine._calculate_macd(df)
+    mtf = engine._calculate_mtf_alignment(df)
+
+    return {
+        "close": current,
+        "volume": float(volume.iloc[-1]),
+        "sma20": float(sma20.iloc[-1]),
+        "sma50": float(sma50),
+        "sma200": float(sma200),
+        "ema20": float(ema20),
+        "rsi": float(engine._calculate_rsi(df)['value']),
+        "macd_hist": float(macd['value']),
+        "macd_bullish": float(macd['status'] == "Bullish"),
+        "atr": atr,
+        "atr_pct": atr / current * 100 if current else np.nan,
+        "adx": float(engine._calculate_adx(df)['value']),
+        "vwap": vwap,
+        "vwap_dev": (current - vwap) / vwap * 100 if vwap else np.nan,
+        "rel_volume": float(volume.iloc[-1] / volume.tail(20).mean()) if volume.tail(20).mean() else np.nan,
+        "zscore": float((current - sma20.iloc[-1]) / close.rolling(20).std().iloc[-1]),
+        "perf_1m": (current / float(close.iloc[-21]) - 1) * 100 if len(close) >= 21 else np.nan,
+        "perf_3m": (current / float(close.iloc[-63]) - 1) * 100 if len(close) >= 63 else np.nan,
+        "high_52w": float(high_52w),
+        "low_52w": float(low_52w),
+        "pct_from_high": (current / high_52w - 1) * 100 if high_52w else np.nan,
+        "squeeze_on": float(squeeze['status'] == "Squeeze ON"),
+        "squeeze_fired": float(squeeze['status'] == "Fired!"),
+        "mtf_bullish": float(sum(v == "Bullish" for v in mtf.values())),
+        **{f"bars_since_{name}": value for name, value in bars_since(events).items()}
+    }
+
+
+# --- Filter expression compiler ---
+
+_COMPARE_OPS = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne
+}
+_ARITH_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv
+}
+
+
+def compile_filter(expression: str, columns: List[str]) -> Callable[[pd.DataFrame], np.ndarray]:
+    """
+    Compiles e.g. "rsi < 30 and close > sma200 and rel_volume > 2" into a function
+    that evaluates the whole feature matrix as one vectorized boolean mask.
+    Only column names, numbers, comparisons, + - * /, and/or/not and parentheses are allowed.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ScreenerError(f"Invalid filter expression: {e.msg}")
+
+    allowed = set(columns)
+
+    def build(node) -> Callable[[pd.DataFrame], Any]:
+        if isinstance(node, ast.BoolOp):
+            parts = [build(v) for v in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return lambda f: combine.reduce([p(f) for p in parts])
+        if isinstance(node, ast.UnaryOp):
+            inner = build(node.operand)
+            if isinstance(node.op, ast.Not):
+                return lambda f: np.logical_not(inner(f))
+            if isinstance(node.op, ast.USub):
+                return lambda f: -inner(f)
+            raise ScreenerError("Unsupported unary operator")
+        if isinstance(node, ast.Compare):
+            operands = [build(node.left)] + [build(c) for c in node.comparators]
+            ops = []
+            for op in node.ops:
+                if type(op) not in _COMPARE_OPS:
+                    raise ScreenerError("Unsupported comparison operator")
+                ops.append(_COMPARE_OPS[type(op)])
+
+            # Chained comparisons (20 < rsi < 40) expand to pairwise ANDs
+            def compare(f):
+                values = [o(f) for o in operands]
+                return np.logical_and.reduce([op(values[i], values[i + 1]) for i, op in enumerate(ops)])
+            return compare
+        if isinstance(node, ast.BinOp):
+            if type(node.op) not in _ARITH_OPS:
+                raise ScreenerError("Unsupported arithmetic operator")
+            left, right, op = build(node.left), build(node.right), _ARITH_OPS[type(node.op)]
+            return lambda f: op(left(f), right(f))
+        if isinstance(node, ast.Name):
+            if node.id not in allowed:
+                raise ScreenerError(f"Unknown field '{node.id}'. Available: {', '.join(sorted(allowed))}")
+            name = node.id
+            return lambda f: f[name].to_numpy()
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            value = float(node.value)
+            return lambda f: value
+        raise ScreenerError(f"Unsupported syntax: {type(node).__name__}")
+
+    evaluate = build(tree.body)
+
+    def mask(frame: pd.DataFrame) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = np.broadcast_to(np.asarray(evaluate(frame), dtype=bool), (len(frame),))
+        return result
+    return mask
+
+
+def _differs(current: Dict[str, float], values: Dict[str, float]) -> bool:
+    """True if any of `values` would change `current` (NaN counts as equal to NaN)."""
+    for key, value in values.items():
+        old = current.get(key)
+        if old != value and not (old is not None and old != old and value != value):
+            return True
+    return False
+
+
+class FeatureMatrix:
+    """
+    Per-ticker feature rows kept in one DataFrame (tickers x features).
+    update() only recomputes a ticker when its last bar changes, so refreshing
+    the whole universe is cheap between new bars. Every row change bumps a version
+    so consumers (the alert engine) can ask which tickers changed since they last looked.
+    """
+
+    def __init__(self, engine, max_filters: int = 256):
+        self.engine = engine
+        self.max_filters = max_filters
+        self._rows: Dict[str, Dict[str, float]] = {}
+        self._bar_keys: Dict[str, tuple] = {}
+        self._extra: Dict[str, Dict[str, float]] = {}
+        self._frame: Optional[pd.DataFrame] = None
+        # (normalized expression, columns) -> mask function; order is least to most recently used
+        self._filters: "OrderedDict[tuple, Callable]" = OrderedDict()
+        self._version = 0
+        self._row_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.last_refresh = 0.0
+
+    def _bar_key(self, df: pd.DataFrame) -> tuple:
+        return (len(df), df.index[-1], float(df['Close'].iloc[-1]))
+
+    def update(self, ticker: str, df: pd.DataFrame) -> bool:
+        """Recomputes the ticker's row if a new bar arrived. Returns True if the row changed."""
+        if df is None or df.empty:
+            return False
+        key = self._bar_key(df)
+        if self._bar_keys.get(ticker) == key:
+            return False
+
+        features = compute_features(self.engine, df)
+        with self._lock:
+            if features is None:
+                self._rows.pop(ticker, None)
+            else:
+                self._rows[ticker] = features
+            self._bar_keys[ticker] = key
+            self._touch(ticker)
+        return True
+
+    def update_many(self, frames: Dict[str, pd.DataFrame]) -> int:
+        changed = 0
+        for ticker, df in frames.items():
+            try:
+                changed += self.update(ticker, df)
+            except Exception as e:
+                print(f"Screener feature error on {ticker}: {e}")
+        self.last_refresh = time.time()
+        return changed
+
+    def set_extra(self, ticker: str, **values: float):
+        """Attaches values computed elsewhere (e.g. master_score) to a ticker's row."""
+        with self._lock:
+            extra = self._extra.setdefault(ticker, {})
+            if _differs(extra, values):
+                extra.update(values)
+                self._touch(ticker)
+
+    def set_extra_table(self, table: pd.DataFrame):
+        """Attaches every column of a ticker-indexed table (e.g. the RS ranking) in one go."""
+        numeric = table.astype("float64")
+        with self._lock:
+            for ticker, values in numeric.to_dict(orient="index").items():
+                extra = self._extra.setdefault(ticker, {})
+                if _differs(extra, values):
+                    extra.update(values)
+                    self._touch(ticker)
+
+    def _filter(self, expression: str, columns: List[str]) -> Callable[[pd.DataFrame], np.ndarray]:
+        """Compiled mask for a normalized expression, from a bounded LRU cache."""
+        key = (expression, tuple(columns))
+        with self._lock:
+            mask_fn = self._filters.get(key)
+            if mask_fn is not None:
+                self._filters.move_to_end(key)
+                return mask_fn
+        mask_fn = compile_filter(expression, columns)
+        with self._lock:
+            self._filters[key] = mask_fn
+            while len(self._filters) > self.max_filters:
+                self._filters.popitem(last=False)
+        return mask_fn
+
+    def _touch(self, ticker: str):
+        # Caller holds the lock
+        self._version += 1
+        self._row_versions[ticker] = self._version
+        self._frame = None
+
+    def row(self, ticker: str) -> Optional[Dict[str, float]]:
+        """One ticker's features and extras, without rebuilding the frame."""
+        with self._lock:
+            row = self._rows.get(ticker)
+            return None if row is None else {**row, **self._extra.get(ticker, {})}
+
+    def changed_since(self, version: int) -> Tuple[List[str], int]:
+        """Tickers whose row changed after `version`, and the version to pass next time."""
+        with self._lock:
+            return [t for t, v in self._row_versions.items() if v > version], self._version
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            if self._frame is None:
+                rows = {t: {**r, **self._extra.get(t, {})} for t, r in self._rows.items()}
+                self._frame = pd.DataFrame.from_dict(rows, orient="index", dtype="float64")
+                self._frame.index.name = "ticker"
+            return self._frame
+
+    def screen(self, expression: str, sort_by: Optional[str] = None, ascending: bool = False, limit: int = 50) -> pd.DataFrame:
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ScreenerError(f"Invalid filter expression: {e.msg}")
+        frame = self.frame
+        # Before the first refresh there are no columns yet: check the expression's structure only
+        columns = list(frame.columns) or sorted({n.id for n in ast.walk(tree) if isinstance(n, ast.Name)})
+        mask_fn = self._filter(ast.unparse(tree), columns)
+        if frame.empty:
+            return frame
+
+        matches = frame[mask_fn(frame)]
+        if sort_by:
+            if sort_by not in frame.columns:
+                raise ScreenerError(f"Unknown sort field '{sort_by}'")
+            matches = matches.sort_values(sort_by, ascending=ascending, na_position="last")
+        return matches.head(limit)
@@ -0,0 +1,389 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Parquet needs pyarrow; without it partitions are written as compressed .npz column files
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+KEY_COLUMNS = ["ts", "ticker", "source"]
+INDICATOR_FIELDS = ("rsi", "adx", "macd", "atr", "rel_volume")
+# Snapshot field -> screener feature holding the same value (rs: 63-day RS vs SPY, as the analysis reports it)
+FEATURE_FALLBACKS = {"rsi": "rsi", "adx": "adx", "macd": "macd_hist", "atr": "atr", "rel_volume": "rel_volume", "rs": "rs_63"}
+AGGREGATIONS = ("last", "first", "mean", "min", "max", "count")
+# Candidate buckets for automatic downsampling, finest first
+AUTO_INTERVALS = ("5min", "15min", "1h", "4h", "1D", "1W", "30D")
+PARTITION_PREFIX = "date="
+EXTENSIONS = (".parquet", ".npz")
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def snapshot_row(ticker: str, analysis: Dict[str, Any], source: str, ts: Optional[float] = None,
+                 features: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    One flat row of an analysis: master score, consensus flag, price, each persona's score
+    (persona_<name>) and the latest value of the key indicators. Indicators of sections the
+    analysis skipped (summary-only scout/scanner runs) come from the ticker's screener
+    `features` row; anything still missing is NaN.
+    """
+    row = {
+        "ts": int((ts or time.time()) * 1000),
+        "ticker": ticker,
+        "source": source,
+        "master_score": (analysis.get('master_score') or {}).get('value', np.nan),
+        "bullish": float("Bullish" in analysis.get('consensus', "")),
+        "price": analysis.get('current_price', np.nan)
+    }
+    for persona, result in (analysis.get('personas') or {}).items():
+        row[f"persona_{_slug(persona)}"] = result.get('score', np.nan)
+    indicators = analysis.get('technical_indicators') or {}
+    for field in INDICATOR_FIELDS:
+        row[field] = (indicators.get(field) or {}).get('value', np.nan)
+    row["rs"] = (indicators.get('relative_strength') or {}).get('value', np.nan)
+    if features:
+        for field, feature in FEATURE_FALLBACKS.items():
+            if pd.isna(row[field]):
+                row[field] = features.get(feature, np.nan)
+    return row
+
+
+class SnapshotStore:
+    """
+    Append-only history of analysis outputs, one row per analyzed ticker, kept out of the
+    transactional database.
+
+    Rows are buffered in memory and flushed as immutable column files under
+    date=YYYY-MM-DD/ partitions (UTC), one new part per flush per process, so workers
+    never write the same file. Score columns are float32. compact() (run by a single
+    process) merges a partition's parts into one file once the day is over or too many
+    parts pile up. Readers drop the duplicates a merge in progress can briefly expose.
+    Range queries only open the partitions in range and cache closed partitions in memory.
+    """
+
+    def __init__(self, directory: str, flush_rows: int = 500, flush_seconds: float = 120,
+                 compact_parts: int = 24, retention_days: int = 0, cache_mb: float = 64):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.compact_parts = compact_parts
+        self.retention_days = retention_days
+        self.cache_bytes = int(cache_mb * 1024 * 1024)
+        self.format = "parquet" if pq is not None else "npz"
+        self._pending: List[Dict[str, Any]] = []
+        # Rows taken by a flush in progress, still visible to queries
+        self._flushing: List[Dict[str, Any]] = []
+        self._last_flush = time.time()
+        # day -> (part file names, _Partition); order is least to most recently used, bounded by cache_mb
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self.rows_written = 0
+        self.parts_written = 0
+        self.compactions = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    # --- Writing ---
+
+    def record(self, ticker: str, analysis: Dict[str, Any], source: str, features: Optional[Dict[str, float]] = None):
+        """Buffers the snapshot of one analysis (see snapshot_row); errored analyses are skipped."""
+        if not analysis or 'error' in analysis:
+            return
+        row = snapshot_row(ticker, analysis, source, features=features)
+        with self._lock:
+            self._pending.append(row)
+            due = len(self._pending) >= self.flush_rows
+        if due:
+            self.flush()
+
+    def flush(self) -> int:
+        """Writes buffered rows as one new part per date partition. Returns the row count."""
+        with self._write_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                self._flushing = rows
+                self._last_flush = time.time()
+            if not rows:
+                return 0
+            frame = _compact_frame(pd.DataFrame(rows))
+            days = pd.to_datetime(frame["ts"], unit="ms").dt.strftime('%Y-%m-%d')
+            try:
+                for day, part in frame.groupby(days.to_numpy(), sort=False):
+                    self._write_part(day, part)
+            except Exception as e:
+                # Keep the rows for the next attempt rather than losing them
+                with self._lock:
+                    self._pending = rows + self._pending
+                print(f"Snapshot flush failed: {e}")
+                return 0
+            finally:
+                with self._lock:
+                    self._flushing = []
+            self.rows_written += len(rows)
+            return len(rows)
+
+    def _write_part(self, day: str, frame: pd.DataFrame) -> str:
+        partition = os.path.join(self.directory, f"{PARTITION_PREFIX}{day}")
+        os.makedirs(partition, exist_ok=True)
+        extension = ".parquet" if self.format == "parquet" else ".npz"
+        path = os.path.join(partition, f"part-{time.time_ns()}-{os.getpid()}{extension}")
+        tmp_path = f"{path}.tmp"
+        frame = frame.sort_values(["ticker", "ts"]).reset_index(drop=True)
+        if self.format == "parquet":
+            pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp_path, compression="zstd")
+        else:
+            arrays = {c: frame[c].to_numpy(dtype=str if c in ("ticker", "source") else None) for c in frame.columns}
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+        self.parts_written += 1
+        return path
+
+    def start(self, compact: Optional[Callable[[], bool]] = None):
+        """
+        Flushes every flush_seconds in the background. compact() tells whether this process
+        owns compaction (e.g. the price panel writer); only one process should.
+        """
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(min(self.flush_seconds, 30))
+                try:
+                    if time.time() - self._last_flush >= self.flush_seconds:
+                        self.flush()
+                    if compact is not None and compact():
+                        self.compact()
+                except Exception as e:
+                    print(f"Snapshot maintenance failed: {e}")
+        self._thread = threading.Thread(target=run, daemon=True, name="snapshot-store")
+        self._thread.start()
+
+    def compact(self) -> int:
+        """
+        Merges the parts of closed days (and of today once it has compact_parts files) into
+        one file each, and drops partitions past retention_days. Returns partitions merged.
+        """
+        today = time.strftime('%Y-%m-%d', time.gmtime())
+        cutoff = (time.strftime('%Y-%m-%d', time.gmtime(time.time() - self.retention_days * 86400))
+                  if self.retention_days else None)
+        merged = 0
+        for day in self._partitions():
+            partition = os.path.join(self.directory, f"{PARTITION_PREFIX}{day}")
+            if cutoff and day < cutoff:
+                for name in self._part_names(partition) + [n for n in os.listdir(partition) if n.endswith(".tmp")]:
+                    _remove(os.path.join(partition, name))
+                _remove(partition, directory=True)
+                continue
+            names = self._part_names(partition)
+            if len(names) < 2 or (day == today and len(names) < self.compact_parts):
+                continue
+            frame = self._read_partition(partition, names)
+            if frame.empty:
+                continue
+            with self._write_lock:
+                self._write_part(day, frame)
+            # The merged part is visible before its inputs go; readers dedupe meanwhile
+            for name in names:
+                _remove(os.path.join(partition, name))
+            merged += 1
+        self.compactions += merged
+        return merged
+
+    # --- Reading ---
+
+    def _partitions(self, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        days = sorted(n[len(PARTITION_PREFIX):] for n in names if n.startswith(PARTITION_PREFIX))
+        return [d for d in days if (start is None or d >= start) and (end is None or d <= end)]
+
+    @staticmethod
+    def _part_names(partition: str) -> List[str]:
+        try:
+            return sorted(n for n in os.listdir(partition) if n.startswith("part-") and n.endswith(EXTENSIONS))
+        except OSError:
+            return []
+
+    def _read_partition(self, partition: str, names: List[str]) -> pd.DataFrame:
+        frames = []
+        for name in names:
+            path = os.path.join(partition, name)
+            try:
+                frames.append(_read_file(path))
+            except FileNotFoundError:
+                # Merged away since the listing; its rows are in the newer part
+                continue
+            except Exception as e:
+                print(f"Skipping unreadable snapshot part {path}: {e}")
+        if not frames:
+            return pd.DataFrame(columns=KEY_COLUMNS)
+        frame = pd.concat(frames, ignore_index=True, sort=False)
+        return frame.drop_duplicates(KEY_COLUMNS, ignore_index=True)
+
+    def _load(self, day: str) -> "_Partition":
+        """One partition's rows, cached until its set of part files changes."""
+        partition = os.path.join(self.directory, f"{PARTITION_PREFIX}{day}")
+        names = self._part_names(partition)
+        signature = tuple(names)
+        with self._lock:
+            cached = self._cache.get(day)
+            if cached is not None and cached[0] == signature:
+                self._cache.move_to_end(day)
+                return cached[1]
+        loaded = _Partition(self._read_partition(partition, names))
+        if len(self._part_names(partition)) != len(names):
+            # A merge finished while reading: rows are complete (deduped) but do not cache
+            return loaded
+        with self._lock:
+            old = self._cache.pop(day, None)
+            self._cache_bytes += loaded.nbytes - (old[1].nbytes if old else 0)
+            self._cache[day] = (signature, loaded)
+            while self._cache_bytes > self.cache_bytes and len(self._cache) > 1:
+                self._cache_bytes -= self._cache.popitem(last=False)[1][1].nbytes
+        return loaded
+
+    def query(self, tickers: Optional[Iterable[str]] = None, start: Optional[pd.Timestamp] = None,
+              end: Optional[pd.Timestamp] = None, fields: Optional[List[str]] = None,
+              source: Optional[str] = None) -> pd.DataFrame:
+        """
+        Snapshots between start and end (UTC, inclusive) for `tickers` (all if None),
+        oldest first, with the key columns plus `fields` (all if None). Includes rows this
+        process has not flushed yet.
+        """
+        start_ms = int(start.value // 1_000_000) if start is not None else None
+        end_ms = int(end.value // 1_000_000) if end is not None else None
+        tickers = sorted(set(tickers)) if tickers else None
+
+        days = self._partitions(start.strftime('%Y-%m-%d') if start is not None else None,
+                                end.strftime('%Y-%m-%d') if end is not None else None)
+        pieces = [piece for day in days for piece in self._load(day).select(tickers, start_ms, end_ms)]
+        with self._lock:
+            pending = self._pending + self._flushing
+        if pending:
+            pieces.extend(_Partition(_compact_frame(pd.DataFrame(pending))).select(tickers, start_ms, end_ms))
+
+        columns = KEY_COLUMNS + (fields if fields is not None else
+                                 sorted({c for p in pieces for c in p} - set(KEY_COLUMNS)))
+        if not pieces:
+            return pd.DataFrame(columns=columns)
+        frame = pd.DataFrame({
+            column: np.concatenate([p[column] if column in p else np.full(len(p["ts"]), np.nan, dtype="float32")
+                                    for p in pieces])
+            for column in columns
+        })
+        if source:
+            frame = frame[frame["source"] == source]
+        if pending:
+            # Rows being flushed can already be on disk
+            frame = frame.drop_duplicates(KEY_COLUMNS)
+        return frame.sort_values("ts", kind="stable").reset_index(drop=True)
+
+    def series(self, ticker: str, fields: List[str], start: Optional[pd.Timestamp] = None,
+               end: Optional[pd.Timestamp] = None, interval: Optional[str] = None, agg: str = "last",
+               max_points: int = 500, source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Time series of `fields` for one ticker, bucketed by `interval` ('1h', '1D', ...)
+        with `agg`. Without an interval, raw rows are returned if they fit in max_points,
+        otherwise the finest AUTO_INTERVALS bucket that does.
+        """
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation '{agg}' (use one of {', '.join(AGGREGATIONS)})")
+        frame = self.query([ticker], start, end, fields, source)
+        values = frame[fields].astype("float64")
+        values.index = pd.to_datetime(frame["ts"].astype("int64"), unit="ms")
+        if interval is None and len(values) > max_points:
+            span = values.index[-1] - values.index[0]
+            interval = next((i for i in AUTO_INTERVALS if span / pd.Timedelta(i) <= max_points), AUTO_INTERVALS[-1])
+        if interval is not None:
+            try:
+                values = values.resample(interval).agg(agg).dropna(how="all")
+            except ValueError:
+                raise ValueError(f"Invalid interval '{interval}'")
+            values = values.iloc[-max_points:]
+        return {"ticker": ticker, "fields": fields, "interval": interval, "agg": agg if interval else None,
+                "rows": len(frame), "index": values.index, "values": values}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+            cached = len(self._cache)
+            cache_bytes = self._cache_bytes
+        return {"format": self.format, "partitions": len(self._partitions()), "pending_rows": pending,
+                "rows_written": self.rows_written, "parts_written": self.parts_written,
+                "compactions": self.compactions, "cached_partitions": cached, "cache_bytes": cache_bytes}
+
+
+class _Partition:
+    """
+    Rows of one partition as numpy columns sorted by (ticker, ts), with each ticker's
+    [start, stop) slice, so a ticker/time query is a dict lookup and two binary searches.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        frame = frame.sort_values(["ticker", "ts"], kind="stable")
+        self.columns = {c: frame[c].to_numpy(dtype=str if c in ("ticker", "source") else None) for c in frame.columns}
+        tickers = self.columns.get("ticker", np.array([], dtype=str))
+        names, starts = np.unique(tickers, return_index=True)
+        stops = np.r_[starts[1:], len(tickers)]
+        self.slices = {name: (int(a), int(b)) for name, a, b in zip(names, starts, stops)}
+        self.nbytes = sum(array.nbytes for array in self.columns.values())
+
+    def select(self, tickers: Optional[List[str]], start_ms: Optional[int], end_ms: Optional[int]) -> List[Dict[str, np.ndarray]]:
+        """Column slices per matching ticker within [start_ms, end_ms]."""
+        ts = self.columns.get("ts")
+        pieces = []
+        for ticker in (tickers if tickers is not None else self.slices):
+            bounds = self.slices.get(ticker)
+            if bounds is None:
+                continue
+            lo, hi = bounds
+            if start_ms is not None:
+                lo += int(np.searchsorted(ts[lo:hi], start_ms, side="left"))
+            if end_ms is not None:
+                hi = bounds[0] + int(np.searchsorted(ts[bounds[0]:hi], end_ms, side="right"))
+            if hi > lo:
+                pieces.append({c: array[lo:hi] for c, array in self.columns.items()})
+        return pieces
+
+
+def _compact_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """int64 ms timestamps, string keys and float32 values."""
+    frame = frame.copy()
+    frame["ts"] = frame["ts"].astype("int64")
+    for column in frame.columns:
+        if column not in KEY_COLUMNS:
+            frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("float32")
+    return frame
+
+
+def _read_file(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError("pyarrow is not installed")
+        return pq.read_table(path).to_pandas()
+    with np.load(path) as data:
+        return pd.DataFrame({name: data[name] for name in data.files})
+
+
+def _remove(path: str, directory: bool = False):
+    try:
+        os.rmdir(path) if directory else os.remove(path)
+    except OSError:
+        pass
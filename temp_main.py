@@ -4,7 +4,7 @@ from flask import Flask, request, jsonify, send_from_directory
 from collaborative_models import db, SharedHistory, BullishRadar, PersonaPick, Stock
 from analyst_engine import AnalystEngine
 from data_orchestrator import DataOrchestrator
-from utils import fetch_current_price, process_excel
+from utils import fetch_current_price, fetch_current_prices, process_excel
 
 app = Flask(__name__, static_folder='.', static_url_path='')
 
@@ -144,23 +144,27 @@ def upload_file():
     tickers = process_excel(file_path)
     print(f"DEBUG: Extracted {len(tickers)} tickers for Strategy {strategy}")
     
-    added_stocks_objects = []
-    for ticker in tickers:
-        ticker = ticker.upper()
-        price_data = fetch_current_price(ticker)
-        if price_data:
-            new_stock = Stock(
-                ticker=ticker,
-                strategy=strategy,
-                entry_price=price_data['price'],
-                current_price=price_data['price'],
-                daily_change=price_data['daily_change']
-            )
-            db.session.add(new_stock)
-            added_stocks_objects.append(new_stock)
-            
+    # Resolve every price in a few batched downloads; failures are reported, not fatal
+    prices, failures = fetch_current_prices(tickers)
+    
+    added_stocks_objects = [
+        Stock(
+            ticker=ticker,
+            strategy=strategy,
+            entry_price=price_data['price'],
+            current_price=price_data['price'],
+            daily_change=price_data['daily_change']
+        )
+        for ticker, price_data in prices.items()
+    ]
+    # Single flush: SQLAlchemy batches these into one multi-row INSERT
+    db.session.add_all(added_stocks_objects)
     db.session.commit()
-    return jsonify([s.to_dict() for s in added_stocks_objects])
+    
+    return jsonify({
+        'added': [s.to_dict() for s in added_stocks_objects],
+        'failed': [{'ticker': t, 'error': err} for t, err in sorted(failures.items())]
+    })
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
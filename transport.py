@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Query parameters that carry credentials and must never reach a fixture file
+SECRET_PARAMS = {"apikey", "apiKey", "token", "key"}
+# Provider responses worth retrying: rate limiting and transient server faults
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TransportError(Exception):
+    """Raised by a transport when a provider call fails (HTTP error, missing fixture, simulated fault)."""
+
+
+def fixture_key(url: str) -> str:
+    """Stable fixture name for a URL: host + path + sorted query without credentials."""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if k not in SECRET_PARAMS)
+    canonical = f"{parts.path}?{urlencode(query)}"
+    return os.path.join(parts.netloc.replace(":", "_"), hashlib.sha1(canonical.encode()).hexdigest() + ".json")
+
+
+def redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, "***" if k in SECRET_PARAMS else v) for k, v in parse_qsl(parts.query)]
+    return parts._replace(query=urlencode(query)).geturl()
+
+
+class HttpTransport:
+    """
+    Live transport: every provider call goes over the network.
+    DataOrchestrator only talks to providers through get_json, so swapping the
+    transport swaps every tier at once.
+
+    One pooled session keeps connections alive per host, and 429/5xx or connection
+    failures are retried with exponential backoff plus full jitter, honouring
+    Retry-After. A Retry-After longer than backoff_max is not waited out: the call
+    fails so the orchestrator can fall through to the next tier.
+    """
+    mode = "live"
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 16, max_retries: int = 2,
+                 backoff_base: float = 0.25, backoff_max: float = 4.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        # pool_connections: hosts kept pooled; pool_maxsize: keep-alive sockets per host
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._retries: Dict[str, int] = {}
+        self._failures: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+
+    def get_json(self, url: str, timeout: float = 10) -> Any:
+        return self._request("GET", url, timeout).json()
+
+    def post_json(self, url: str, body: Any, timeout: float = 10) -> Any:
+        """POSTs `body` as JSON with the same pooling and retry policy; returns the decoded reply, if any."""
+        resp = self._request("POST", url, timeout, json=body)
+        return resp.json() if resp.content else None
+
+    def _request(self, method: str, url: str, timeout: float, **kwargs) -> requests.Response:
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            try:
+                resp = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = self._backoff(attempt, None)
+                if delay is None:
+                    self._count(self._failures, host)
+                    raise TransportError(f"{type(e).__name__} from {host}")
+            else:
+                if resp.status_code < 400:
+                    return resp
+                delay = self._backoff(attempt, resp) if resp.status_code in RETRY_STATUSES else None
+                if delay is None:
+                    self._count(self._failures, host)
+                    raise TransportError(f"HTTP {resp.status_code} from {host}")
+            self._count(self._retries, host)
+            time.sleep(delay)
+            attempt += 1
+
+    def _backoff(self, attempt: int, resp: Optional[requests.Response]) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None if the call should fail now."""
+        if attempt >= self.max_retries:
+            return None
+        retry_after = self._retry_after(resp) if resp is not None else None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.backoff_max else None
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, resp: requests.Response) -> Optional[float]:
+        value = resp.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _count(self, counter: Dict[str, int], host: str):
+        with self._stats_lock:
+            counter[host] = counter.get(host, 0) + 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-host request, connection and retry counts from the pooled session."""
+        hosts: Dict[str, Dict[str, Any]] = {}
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{pool.host}:{pool.port}" if pool.port else pool.host
+            entry = hosts.setdefault(host, {"requests": 0, "connections": 0})
+            entry["requests"] += pool.num_requests
+            entry["connections"] += pool.num_connections
+        with self._stats_lock:
+            for host in set(self._retries) | set(self._failures):
+                entry = hosts.setdefault(host, {"requests": 0, "connections": 0})
+                entry["retries"] = self._retries.get(host, 0)
+                entry["failures"] = self._failures.get(host, 0)
+        for entry in hosts.values():
+            entry.setdefault("retries", 0)
+            entry.setdefault("failures", 0)
+            reused = entry["requests"] - entry["connections"]
+            entry["reuse_ratio"] = round(reused / entry["requests"], 3) if entry["requests"] else None
+        return hosts
+
+
+class RecordingTransport(HttpTransport):
+    """Live transport that also captures every successful response as a replay fixture."""
+    mode = "record"
+
+    def __init__(self, fixtures_dir: str = "fixtures", **http_options):
+        super().__init__(**http_options)
+        self.fixtures_dir = fixtures_dir
+        self._lock = threading.Lock()
+
+    def get_json(self, url: str, timeout: float = 10) -> Any:
+        data = super().get_json(url, timeout)
+        path = os.path.join(self.fixtures_dir, fixture_key(url))
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump({"url": redact_url(url), "recorded_at": time.time(), "body": data}, f)
+        return data
+
+
+class ReplayTransport:
+    """
+    Serves recorded fixtures from disk, never touching the network.
+    latency_ms/jitter_ms and error_rate simulate a slow or flaky provider.
+    """
+    mode = "replay"
+
+    def __init__(self, fixtures_dir: str = "fixtures", latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.fixtures_dir = fixtures_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def get_json(self, url: str, timeout: float = 10) -> Any:
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.error_rate
+
+        if delay > timeout:
+            time.sleep(timeout)
+            raise TransportError(f"Simulated timeout for {urlsplit(url).netloc}")
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise TransportError(f"Simulated provider error for {urlsplit(url).netloc}")
+
+        path = os.path.join(self.fixtures_dir, fixture_key(url))
+        if not os.path.exists(path):
+            raise TransportError(f"No fixture for {redact_url(url)}")
+        with open(path, 'r') as f:
+            return json.load(f)["body"]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {}
+
+
+def build_transport_from_env() -> HttpTransport:
+    """
+    DATA_TRANSPORT=live|record|replay selects the transport.
+    Replay honours REPLAY_LATENCY_MS, REPLAY_JITTER_MS, REPLAY_ERROR_RATE and REPLAY_SEED.
+    Live/record honour HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE and HTTP_BACKOFF_MAX.
+    """
+    mode = os.getenv("DATA_TRANSPORT", "live").lower()
+    fixtures_dir = os.getenv("DATA_FIXTURES_DIR", "fixtures")
+    http_options = dict(
+        pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", 10)),
+        pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", 16)),
+        max_retries=int(os.getenv("HTTP_MAX_RETRIES", 2)),
+        backoff_base=float(os.getenv("HTTP_BACKOFF_BASE", 0.25)),
+        backoff_max=float(os.getenv("HTTP_BACKOFF_MAX", 4.0))
+    )
+
+    if mode == "record":
+        return RecordingTransport(fixtures_dir, **http_options)
+    if mode == "replay":
+        seed = os.getenv("REPLAY_SEED")
+        return ReplayTransport(
+            fixtures_dir,
+            latency_ms=float(os.getenv("REPLAY_LATENCY_MS", 0)),
+            jitter_ms=float(os.getenv("REPLAY_JITTER_MS", 0)),
+            error_rate=float(os.getenv("REPLAY_ERROR_RATE", 0)),
+            seed=int(seed) if seed else None
+        )
+    return HttpTransport(**http_options)
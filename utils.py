@@ -2,6 +2,8 @@ import yfinance as yf
 import pandas as pd
 import re
 import os
+import csv
+from concurrent.futures import ThreadPoolExecutor
 
 def fetch_current_price(ticker):
     try:
@@ -27,50 +29,157 @@ def fetch_current_price(ticker):
         print(f"Error fetching price for {ticker}: {e}")
         return None
 
+def _summarize_closes(closes):
+    closes = closes.dropna()
+    if closes.empty:
+        return None
+
+    current_price = float(closes.iloc[-1])
+    daily_change = 0.0
+    if len(closes) >= 2:
+        prev_close = float(closes.iloc[-2])
+        daily_change = float(((current_price - prev_close) / prev_close) * 100)
+
+    return {
+        'price': current_price,
+        'daily_change': daily_change
+    }
+
+def _download_price_batch(batch):
+    """One yf.download call for a batch; returns ({ticker: price_data}, {ticker: error})."""
+    prices, failures = {}, {}
+    try:
+        data = yf.download(batch, period="5d", group_by='ticker', auto_adjust=True,
+                           threads=False, progress=False)
+    except Exception as e:
+        return prices, {t: str(e) for t in batch}
+
+    for ticker in batch:
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    failures[ticker] = "No price data returned"
+                    continue
+                closes = data[ticker]['Close']
+            else:
+                closes = data['Close']
+
+            price_data = _summarize_closes(closes)
+            if price_data:
+                prices[ticker] = price_data
+            else:
+                failures[ticker] = "No price data returned"
+        except Exception as e:
+            failures[ticker] = str(e)
+    return prices, failures
+
+def fetch_current_prices(tickers, batch_size=100, max_workers=4):
+    """
+    Bulk version of fetch_current_price: resolves all tickers in a few batched
+    yf.download calls, at most max_workers in flight.
+    Returns (prices, failures) where failures maps ticker -> error message.
+    """
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+
+    prices, failures = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for batch_prices, batch_failures in pool.map(_download_price_batch, batches):
+            prices.update(batch_prices)
+            failures.update(batch_failures)
+    return prices, failures
+
+# Upload parsing: rows per chunk and bytes used to sniff the CSV delimiter
+CHUNK_ROWS = 100_000
+SNIFF_BYTES = 64 * 1024
+TICKER_PATTERN = r'[A-Z0-9.]{1,8}'
+NUMERIC_PATTERN = r'[0-9.]+'
+RAW_TICKER_REGEX = re.compile(r'(?:^|[,\s"\'])([A-Z0-9.]{1,8})(?=[,\s"\']|$)')
+
+def _sniff_delimiter(file_path):
+    """Detects the CSV delimiter from a small sample so the full read can use the C parser."""
+    with open(file_path, 'r', errors='ignore', newline='') as f:
+        sample = f.read(SNIFF_BYTES)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+    except csv.Error:
+        return ','
+
+def _iter_csv_chunks(file_path):
+    return pd.read_csv(file_path, sep=_sniff_delimiter(file_path), engine='c', dtype=str,
+                       chunksize=CHUNK_ROWS, on_bad_lines='skip', encoding_errors='ignore')
+
+def _iter_excel_chunks(file_path):
+    """Streams .xlsx sheets row-wise in read-only mode; other formats fall back to a full read."""
+    if not file_path.lower().endswith(('.xlsx', '.xlsm')):
+        yield pd.read_excel(file_path, dtype=str)
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+
+        chunk = []
+        for row in rows:
+            chunk.append(row[:len(columns)])
+            if len(chunk) >= CHUNK_ROWS:
+                yield pd.DataFrame(chunk, columns=columns, dtype=str)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns, dtype=str)
+    finally:
+        workbook.close()
+
+def _extract_chunk_tickers(chunk, ignore_set):
+    """Vectorized per-column ticker match for one chunk."""
+    found = set()
+    for col in chunk.columns:
+        # Skip if header is in ignore list
+        if str(col).upper().strip() in ignore_set:
+            continue
+
+        # Dedupe before matching: broker exports repeat the same few hundred symbols
+        values = pd.Series(chunk[col].dropna().unique(), dtype=str).str.strip()
+        values = values[values.str.fullmatch(TICKER_PATTERN) & ~values.str.fullmatch(NUMERIC_PATTERN)]
+        if values.empty:
+            continue
+        found.update(t for t in values.str.upper().unique() if t not in ignore_set)
+    return found
+
 def process_excel(file_path):
-    """Smart ticker extraction with multi-stage fallback."""
+    """Smart ticker extraction with multi-stage fallback, streamed in bounded-size chunks."""
     ignore_list = ['SYMBOL', 'TICKER', 'PRICE', 'CHANGE', 'VOL', 'VOLUME', 'TOTAL', 'DATE', 'STRATEGY']
+    ignore_set = set(ignore_list)
     extracted_tickers = set()
 
-    # Stage 1: Pandas with robust delimiter detection & jagged line skipping
+    # Stage 1: Pandas C parser (delimiter sniffed from a sample), jagged lines skipped
     try:
-        # For CSVs, let pandas detect the separator (comma, tab, semicolon)
         if file_path.lower().endswith('.csv'):
-            df = pd.read_csv(file_path, sep=None, engine='python', on_bad_lines='skip')
+            chunks = _iter_csv_chunks(file_path)
         else:
-            df = pd.read_excel(file_path)
+            chunks = _iter_excel_chunks(file_path)
 
         # Smart Ticker Search: Scan all columns for ticker-like strings
-        # Look for columns where at least 30% of rows look like tickers
-        ticker_regex = r'^[A-Z0-9.]{1,8}$'
-        
-        for col in df.columns:
-            # Skip if header is in ignore list
-            col_str = str(col).upper().strip()
-            if col_str in ignore_list:
-                continue
-                
-            col_data = df[col].dropna().astype(str).str.strip().unique()
-            matches = [t for t in col_data if re.match(ticker_regex, t) and t.upper() not in ignore_list]
-            
-            # If we found a significant number of matches, this is likely a ticker column
-            if len(matches) > 0:
-                for t in matches:
-                    extracted_tickers.add(t.upper())
+        for chunk in chunks:
+            extracted_tickers.update(_extract_chunk_tickers(chunk, ignore_set))
 
     except Exception as e:
         print(f"Pandas parsing failed: {e}. Falling back to raw text extraction.")
 
-    # Stage 2: Raw Text Extraction Fallback (Foolproof)
+    # Stage 2: Raw Text Extraction Fallback (Foolproof), one line at a time
     try:
         if not extracted_tickers:
             with open(file_path, 'r', errors='ignore') as f:
-                content = f.read()
-                # Find uppercase blocks 1-8 chars long bounded by whitespace, quotes, or commas
-                raw_matches = re.findall(r'(?:^|[,\s"\'])([A-Z0-9.]{1,8})(?=[,\s"\']|$)', content)
-                for t in raw_matches:
-                    if t.upper() not in ignore_list and not t.isdigit():
-                        extracted_tickers.add(t.upper())
+                for line in f:
+                    # Find uppercase blocks 1-8 chars long bounded by whitespace, quotes, or commas
+                    for t in RAW_TICKER_REGEX.findall(line):
+                        if t.upper() not in ignore_set and not t.isdigit():
+                            extracted_tickers.add(t.upper())
     except Exception as e:
         print(f"Raw text extraction failed: {e}")
 